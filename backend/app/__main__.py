@@ -0,0 +1,130 @@
+"""
+Command line entry point.
+
+    python -m app scan ../data/sample_odds.json [--min-ev 0.5] [--json]
+    python -m app arb payload.json.gz [--min-profit 0] [--no-middles]
+    python -m app backtest <payload dir> [...]      (see app.core.backtest)
+    python -m app serve [--port 8000]
+
+`scan` and `arb` read an Odds API payload (a list of games, or a recorded
+`{"fetched_at": ..., "data": [...]}`; gzipped or not, `-` for stdin) and
+only import the scan core, not the web or database stack, so a run takes a
+fraction of a second.
+"""
+import argparse
+import gzip
+import sys
+import time
+from typing import List, Optional
+
+from app.core import fast_json
+from app.core.config import parse_weights, settings
+from app.core.math_logic import DEVIG_METHODS
+
+
+def load_payload(path: str) -> list:
+    """Games of an Odds API payload file (`-` reads stdin)"""
+    raw = sys.stdin.buffer.read() if path == "-" else open(path, "rb").read()
+    if raw[:2] == b"\x1f\x8b":
+        raw = gzip.decompress(raw)
+    data = fast_json.loads(raw)
+    return data["data"] if isinstance(data, dict) else data
+
+
+def _scan(args) -> int:
+    from app.core.scanner import scan_odds_data
+
+    started = time.perf_counter()
+    data = load_payload(args.path)
+    sharp_weights = parse_weights(args.sharp_books) if args.sharp_books else settings.SHARP_BOOKS
+    opportunities = scan_odds_data(data, args.min_ev, args.devig, sharp_weights)[:args.limit]
+    elapsed = time.perf_counter() - started
+
+    if args.json:
+        sys.stdout.buffer.write(fast_json.dumps(opportunities) + b"\n")
+        return 0
+    print(f"{'MATCH':<35} | {'BOOK':<12} | {'BET':<24} | {'ODDS':>6} | {'EV%':>6} | {'STAKE ($1k)'}")
+    print("-" * 110)
+    for opp in opportunities:
+        print(
+            f"{opp.match_name[:35]:<35} | {opp.target_book[:12]:<12} | {opp.selection[:24]:<24} | "
+            f"{opp.target_odds_decimal:>6.2f} | {opp.ev_percent:>5.2f}% | ${opp.kelly_stake_suggested:6.2f}"
+        )
+    print("-" * 110)
+    print(f"✓ {len(opportunities)} opportunities in {len(data)} games ({elapsed * 1000:.0f} ms).")
+    return 0
+
+
+def _arb(args) -> int:
+    from app.core.arbitrage import scan_arbitrage
+
+    data = load_payload(args.path)
+    opportunities = scan_arbitrage(
+        data, min_profit=args.min_profit, stake=args.stake,
+        include_middles=not args.no_middles, max_middle_loss=args.max_middle_loss,
+    )[:args.limit]
+
+    if args.json:
+        sys.stdout.buffer.write(fast_json.dumps(opportunities) + b"\n")
+        return 0
+    for opp in opportunities:
+        legs = "  /  ".join(f"{leg.selection} @ {leg.odds_decimal:.2f} {leg.book} (${leg.stake:.2f})" for leg in opp.legs)
+        print(f"{opp.kind:<6} {opp.profit_percent:>6.2f}%  {opp.match_name} {opp.market}: {legs}")
+    print(f"✓ {len(opportunities)} opportunities in {len(data)} games.")
+    return 0
+
+
+def _backtest(args) -> int:
+    from app.core.backtest import main as backtest_main
+
+    backtest_main(args.rest)
+    return 0
+
+
+def _serve(args) -> int:
+    import uvicorn
+
+    uvicorn.run("app.main:app", host=args.host, port=args.port, workers=args.workers)
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app", description="Value Bet Finder command line.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    scan = commands.add_parser("scan", help="Scan an odds payload for +EV bets")
+    scan.add_argument("path", help="Odds API payload (JSON, optionally gzipped; - for stdin)")
+    scan.add_argument("--min-ev", type=float, default=0.0, help="Minimum EV percentage")
+    scan.add_argument("--devig", choices=DEVIG_METHODS, default=settings.DEVIG_METHOD, help="Devig method")
+    scan.add_argument("--sharp-books", default=None, help='Consensus weights, "book:weight,..." (default: SHARP_BOOKS)')
+    scan.add_argument("--limit", type=int, default=None, help="Print at most this many, best first")
+    scan.add_argument("--json", action="store_true", help="Print the opportunities as JSON")
+    scan.set_defaults(run=_scan)
+
+    arb = commands.add_parser("arb", help="Scan an odds payload for arbitrages and middles")
+    arb.add_argument("path", help="Odds API payload (JSON, optionally gzipped; - for stdin)")
+    arb.add_argument("--min-profit", type=float, default=0.0, help="Minimum guaranteed profit percentage")
+    arb.add_argument("--stake", type=float, default=settings.ARB_STAKE, help="Total stake split across the legs")
+    arb.add_argument("--no-middles", action="store_true", help="Only arbitrages")
+    arb.add_argument("--max-middle-loss", type=float, default=settings.MAX_MIDDLE_LOSS_PERCENT,
+                     help="Most a middle may lose when it misses (%% of the stake)")
+    arb.add_argument("--limit", type=int, default=None, help="Print at most this many, best first")
+    arb.add_argument("--json", action="store_true", help="Print the opportunities as JSON")
+    arb.set_defaults(run=_arb)
+
+    backtest = commands.add_parser("backtest", help="Replay recorded odds (arguments of app.core.backtest)", add_help=False)
+    backtest.add_argument("rest", nargs=argparse.REMAINDER)
+    backtest.set_defaults(run=_backtest)
+
+    serve = commands.add_parser("serve", help="Run the API server")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8000)
+    serve.add_argument("--workers", type=int, default=1)
+    serve.set_defaults(run=_serve)
+
+    args = parser.parse_args(argv)
+    return args.run(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,235 @@
+"""
+Cross-book arbitrage and middle scan.
+
+Runs over the same `MarketIndex` as the EV scan, without a sharp reference:
+every book's price counts. One pass over the index keeps the best decimal
+price of every (game, line) across books; the best lines are then grouped
+two ways:
+
+- arbs: the complementary outcomes of one line (both sides of a spread or
+  total at the same number, every outcome of a moneyline, Over / Under of one
+  player's prop line). When every outcome is priced and the implied
+  probabilities of the best prices sum to less than 1, staking each outcome
+  in proportion to its implied probability returns the same amount whichever
+  wins: total stake / sum, a guaranteed profit.
+- middles: spreads and totals where the two sides are taken at different
+  numbers (Over 210.5 with Under 213.5, home -3.5 with away +5.5). If the
+  result lands between the numbers both bets win; otherwise one does and the
+  split loses at most (1 - 1 / sum) of the stake.
+
+Both groupings are vectorized (sort, unique, bincount); only the hits are
+materialized as `ArbOpportunity` objects.
+"""
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from app.core.market_index import MarketIndex, build_market_index
+from app.core.scanner import market_key_to_name, opportunity_id, selection_name
+from app.models.schemas import ArbLeg, ArbOpportunity
+
+ARB = "arb"
+MIDDLE = "middle"
+
+# Side of a line with a point: A covers above its bound (home spread, Over), B below it (away spread, Under)
+_SIDE_A, _SIDE_B, _NO_SIDE = 0, 1, -1
+
+
+def _american(price: float, decimal: float) -> int:
+    """American odds of a row: the published price when it is American, else converted"""
+    if abs(price) >= 100:
+        return int(price)
+    if decimal >= 2.0:
+        return int(round((decimal - 1) * 100))
+    return int(round(-100 / (decimal - 1)))
+
+
+def _group_ids(*columns: np.ndarray) -> np.ndarray:
+    """Dense id per distinct tuple of integer columns"""
+    if columns[0].size == 0:
+        return np.zeros(0, dtype=np.int64)
+    _, inverse = np.unique(np.stack(columns, axis=1), axis=0, return_inverse=True)
+    return inverse.reshape(-1)
+
+
+def _pairs_within(group_a: np.ndarray, group_b: np.ndarray, n_groups: int):
+    """
+    Every (i, j) with group_a[i] == group_b[j], as two index arrays, without
+    a Python loop over groups. `group_b` must be sorted.
+    """
+    counts_b = np.bincount(group_b, minlength=n_groups)
+    start_b = np.cumsum(counts_b) - counts_b
+    per_a = counts_b[group_a]
+    a = np.repeat(np.arange(group_a.size), per_a)
+    offsets = np.arange(a.size) - np.repeat(np.cumsum(per_a) - per_a, per_a)
+    return a, start_b[group_a[a]] + offsets
+
+
+def scan_arbitrage_index(
+    index: MarketIndex,
+    min_profit: float = 0.0,
+    stake: float = 100.0,
+    include_middles: bool = True,
+    max_middle_loss: float = 3.0,
+) -> List[ArbOpportunity]:
+    """
+    Find arbs and middles in an indexed payload.
+
+    Args:
+        index: Output of `build_market_index(data, require_sharp=False)`
+        min_profit: Only arbs returning strictly more than this (in % of the stake)
+        stake: Total stake the legs' stakes are split from
+        include_middles: Also return middles
+        max_middle_loss: Only middles losing at most this (in % of the stake, below 100) when the result misses the middle
+
+    Returns:
+        Arbs by profit (highest first), then middles by loss on a miss
+        (smallest first) and width (widest first)
+    """
+    frame = index.frame
+    if frame.size == 0:
+        return []
+    dec = index.decimal
+
+    # 1. Best price of every (game, line) across books
+    rows = np.flatnonzero(frame.is_primary & (dec > 1.0))
+    if rows.size == 0:
+        return []
+    keys = index.key[rows]
+    order = np.lexsort((-dec[rows], keys))
+    sorted_keys = keys[order]
+    first = np.ones(sorted_keys.size, dtype=bool)
+    first[1:] = sorted_keys[1:] != sorted_keys[:-1]
+    best = rows[order[first]]
+
+    # 2. Per-line attributes, coded so the grouping below is integer work
+    names: Dict[str, int] = {}
+    descriptions: Dict[Optional[str], int] = {None: -1}
+    line_name = np.empty(len(frame.line_keys), dtype=np.int64)
+    line_description = np.empty(len(frame.line_keys), dtype=np.int64)
+    for l, (_, _, name, description) in enumerate(frame.line_keys):
+        line_name[l] = names.setdefault(name, len(names))
+        line_description[l] = descriptions.setdefault(description, len(descriptions))
+    home = np.array([names.get(game.get("home_team"), -2) for game in frame.games], dtype=np.int64)
+    away = np.array([names.get(game.get("away_team"), -2) for game in frame.games], dtype=np.int64)
+
+    game = frame.game_idx[best]
+    market = frame.market_idx[best]
+    line = frame.line_idx[best]
+    name = line_name[line]
+    description = line_description[line]
+    point = frame.point[best]
+    odds = dec[best]
+    has_point = ~np.isnan(point)
+    is_home, is_away = name == home[game], name == away[game]
+    is_over, is_under = name == names.get("Over", -3), name == names.get("Under", -3)
+    side = np.where(has_point & (is_over | is_home), _SIDE_A, np.where(has_point & (is_under | is_away), _SIDE_B, _NO_SIDE))
+    slot_size = np.bincount(frame.slot)[frame.slot[best]]
+
+    titles = [book["title"] for book in frame.books]
+    timestamp = datetime.now().isoformat()
+
+    def legs(best_positions: List[int], inverse_sum: float) -> List[ArbLeg]:
+        built = []
+        for i in best_positions:
+            row = int(best[i])
+            outcome = frame.outcomes[row]
+            decimal = float(odds[i])
+            built.append(ArbLeg.model_construct(
+                book=titles[frame.book_idx[row]],
+                market=market_key_to_name(frame.market_keys[market[i]], outcome),
+                selection=selection_name(outcome),
+                point=outcome.get("point"),
+                odds_decimal=round(decimal, 3),
+                odds_american=_american(outcome["price"], decimal),
+                stake=round(stake / decimal / inverse_sum, 2),
+            ))
+        return built
+
+    def opportunity(kind: str, positions: List[int], inverse_sum: float, width: Optional[float] = None) -> ArbOpportunity:
+        g = frame.games[game[positions[0]]]
+        key = (kind, g["id"]) + tuple(
+            (frame.line_keys[line[i]], frame.books[frame.book_idx[best[i]]]["key"]) for i in positions
+        )
+        # Every field is computed here with the right type, so skip validation
+        return ArbOpportunity.model_construct(
+            id=opportunity_id(key),
+            kind=kind,
+            match_name=f"{g['home_team']} vs {g['away_team']}",
+            sport=g["sport_key"],
+            market=frame.market_keys[market[positions[0]]],
+            commence_time=g.get("commence_time"),
+            legs=legs(positions, inverse_sum),
+            implied_sum=round(inverse_sum, 5),
+            profit_percent=round((1 / inverse_sum - 1) * 100, 3),
+            middle_width=width,
+            middle_profit_percent=round((2 / inverse_sum - 1) * 100, 3) if width is not None else None,
+            total_stake=stake,
+            timestamp=timestamp,
+        )
+
+    # 3. Arbs: complementary outcomes share (game, market, description, home-side point)
+    home_point = np.where(has_point, np.where(is_away, -point, point), np.inf)
+    _, point_code = np.unique(home_point, return_inverse=True)
+    candidates = np.flatnonzero(~has_point | (side != _NO_SIDE))
+    group = _group_ids(game[candidates], market[candidates], description[candidates], point_code.reshape(-1)[candidates])
+    n_groups = int(group.max()) + 1 if group.size else 0
+    outcomes = np.bincount(group, minlength=n_groups)
+    inverse_sum = np.bincount(group, weights=1.0 / odds[candidates], minlength=n_groups)
+    expected = np.zeros(n_groups, dtype=np.int64)
+    # Two sides per point; a moneyline has as many outcomes as its largest market entry
+    np.maximum.at(expected, group, np.where(has_point[candidates], 2, slot_size[candidates]))
+    pointed = np.bincount(group, weights=has_point[candidates], minlength=n_groups) > 0
+    side_a = np.bincount(group, weights=side[candidates] == _SIDE_A, minlength=n_groups)
+    complete = (outcomes >= 2) & (outcomes == expected) & (~pointed | (side_a == 1))
+    with np.errstate(divide="ignore"):
+        profit = (1.0 / inverse_sum - 1.0) * 100
+    arb_groups = np.flatnonzero(complete & (inverse_sum < 1.0) & (profit > min_profit))
+
+    arbs = []
+    if arb_groups.size:
+        members: Dict[int, List[int]] = {}
+        wanted = np.isin(group, arb_groups)
+        for g, i in zip(group[wanted].tolist(), candidates[wanted].tolist()):
+            members.setdefault(g, []).append(i)
+        arbs = [opportunity(ARB, members[g], float(inverse_sum[g])) for g in arb_groups.tolist()]
+        arbs.sort(key=lambda opp: -opp.profit_percent)
+    if not include_middles:
+        return arbs
+
+    # 4. Middles: side A at a lower bound than side B's upper bound, same game, market and description
+    sided = np.flatnonzero(side != _NO_SIDE)
+    family = _group_ids(game[sided], market[sided], description[sided])
+    n_families = int(family.max()) + 1 if family.size else 0
+    # A (home / Over) covers when the result is above its bound, B (away / Under) below its bound
+    bound = np.where(is_home[sided], -point[sided], point[sided])
+    a_rows = np.flatnonzero(side[sided] == _SIDE_A)
+    b_rows = np.flatnonzero(side[sided] == _SIDE_B)
+    b_rows = b_rows[np.argsort(family[b_rows], kind="stable")]
+    a, b = _pairs_within(family[a_rows], family[b_rows], n_families)
+    a, b = a_rows[a], b_rows[b]
+    width = bound[b] - bound[a]
+    pair_sum = 1.0 / odds[sided[a]] + 1.0 / odds[sided[b]]
+    # Loss on a miss is 1 - 1 / sum of the stake
+    hit = np.flatnonzero((width > 0) & (pair_sum <= 1.0 / (1.0 - max_middle_loss / 100)))
+
+    middles = [
+        opportunity(MIDDLE, [int(sided[a[i]]), int(sided[b[i]])], float(pair_sum[i]), round(float(width[i]), 2))
+        for i in hit.tolist()
+    ]
+    middles.sort(key=lambda opp: (-opp.profit_percent, -opp.middle_width))
+    return arbs + middles
+
+
+def scan_arbitrage(
+    data: list,
+    min_profit: float = 0.0,
+    stake: float = 100.0,
+    include_middles: bool = True,
+    max_middle_loss: float = 3.0,
+) -> List[ArbOpportunity]:
+    """`scan_arbitrage_index` over a raw Odds API payload (every game, sharp book or not)"""
+    return scan_arbitrage_index(
+        build_market_index(data, require_sharp=False), min_profit, stake, include_middles, max_middle_loss,
+    )
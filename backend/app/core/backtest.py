@@ -0,0 +1,416 @@
+"""
+Offline replay and backtest over recorded Odds API payloads.
+
+Recorded payloads are JSON files (optionally gzipped) laid out as
+`<root>/<sport>/.../<timestamp>.json[.gz]`, where the file name is an epoch
+or ISO timestamp; this is the layout `OddsStore` writes with
+`keep_payloads=True`. A file holds either a raw payload (list of games) or
+`{"fetched_at": epoch, "data": [...]}`.
+
+Each (sport, day) partition is replayed in timestamp order in a worker
+process through the same index, consensus fair line and scanner the API
+uses. The first sighting of every +EV opportunity before kickoff is "bet"
+with a fractional-Kelly stake on a flat bankroll, which keeps partitions
+independent. Workers also report the last pre-kickoff fair probability of
+every line they saw; the parent merges those into closing lines to compute
+CLV, grades bets against optional final scores for ROI, and measures
+drawdown over the realized P&L in settlement order.
+
+Usage:
+    python -m app.core.backtest <payload dir> [--scores scores.json] [--workers 8]
+"""
+import argparse
+import gzip
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from app.core import fast_json
+from app.core.fair_price import get_fair_lines
+from app.core.grading import LOST, PUSH, WON, final_scores, grade, profit
+from app.core.market_index import DEFAULT_SHARP_WEIGHTS, build_market_index
+from app.core.math_logic import DEVIG_METHODS, kelly_criterion
+from app.core.scanner import row_key, scan_index_rows
+
+# (event id, market key, point, book key, selection, description)
+BetKey = Tuple[str, str, Optional[float], str, str, Optional[str]]
+# (event id, market key, point, selection, description)
+LineId = Tuple[str, str, Optional[float], str, Optional[str]]
+
+
+@dataclass
+class BacktestConfig:
+    min_ev: float = 0.0
+    bankroll: float = 1000.0
+    kelly_fraction: float = 0.25
+    devig_method: str = "multiplicative"
+    sharp_weights: Dict[str, float] = field(default_factory=lambda: dict(DEFAULT_SHARP_WEIGHTS))
+
+
+@dataclass
+class SimulatedBet:
+    key: BetKey
+    sport: str
+    match_name: str
+    commence_time: Optional[float]
+    placed_at: float
+    odds: float
+    fair_prob: float
+    ev_percent: float
+    stake: float
+    three_way: bool = False  # The game's moneyline has a Draw outcome
+    closing_prob: Optional[float] = None
+    result: Optional[str] = None
+    profit: Optional[float] = None
+
+    @property
+    def line(self) -> LineId:
+        event, market, point, _, selection, description = self.key
+        return (event, market, point, selection, description)
+
+    @property
+    def clv(self) -> Optional[float]:
+        """EV of the bet's price against the closing fair line (0.02 = 2%)"""
+        if self.closing_prob is None:
+            return None
+        return self.odds * self.closing_prob - 1
+
+
+@dataclass
+class PartitionResult:
+    sport: str
+    day: str
+    snapshots: int
+    bets: List[SimulatedBet]
+    # Line -> (fetched_at, fair prob) of its last pre-kickoff sighting
+    closing: Dict[LineId, Tuple[float, float]]
+
+
+# --- Discovery ---
+
+# Metadata files `OddsStore` keeps next to recorded payloads
+_STORE_FILES = {"latest.json", "tables.json"}
+
+
+def _parse_timestamp(value: str) -> Optional[float]:
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return parsed.timestamp()
+
+
+def _day(ts: float) -> str:
+    return datetime.fromtimestamp(ts, timezone.utc).strftime("%Y-%m-%d")
+
+
+def discover(root: str) -> Dict[Tuple[str, str], List[Tuple[float, str]]]:
+    """
+    Group recorded payload files by (sport, UTC day), each sorted by time.
+    The sport is the first directory under `root`; the time comes from the
+    file name, falling back to its modification time.
+    """
+    root_path = Path(root)
+    partitions: Dict[Tuple[str, str], List[Tuple[float, str]]] = {}
+    for path in root_path.rglob("*"):
+        if not (path.name.endswith(".json") or path.name.endswith(".json.gz")) or path.name in _STORE_FILES:
+            continue
+        relative = path.relative_to(root_path).parts
+        sport = relative[0] if len(relative) > 1 else "unknown"
+        ts = _parse_timestamp(path.name.split(".json")[0])
+        if ts is None:
+            ts = path.stat().st_mtime
+        partitions.setdefault((sport, _day(ts)), []).append((ts, str(path)))
+    for files in partitions.values():
+        files.sort()
+    return partitions
+
+
+def load_payload(path: str) -> Tuple[List[Dict[str, Any]], Optional[float]]:
+    """Read one recorded file: (games, fetched_at if the file records it)"""
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rb") as f:
+        stored = fast_json.loads(f.read())
+    if isinstance(stored, dict):
+        return stored.get("data", []), stored.get("fetched_at")
+    return stored, None
+
+
+def load_scores(path: Optional[str]) -> Dict[str, Dict[str, float]]:
+    """
+    Final scores by event id from an Odds API `/scores` dump (a JSON file or
+    a directory of them). Events that are not completed are skipped.
+    """
+    if not path:
+        return {}
+    files = [Path(path)] if Path(path).is_file() else sorted(Path(path).rglob("*.json"))
+    scores = {}
+    for file in files:
+        for event in json.loads(file.read_text()):
+            final = final_scores(event)
+            if final is not None:
+                scores[event["id"]] = final
+    return scores
+
+
+# --- Replay ---
+
+def _commence(game: Dict[str, Any]) -> Optional[float]:
+    value = game.get("commence_time")
+    return _parse_timestamp(value) if value else None
+
+
+def _has_draw(game: Dict[str, Any]) -> bool:
+    """Whether any book prices a Draw in the game's moneyline (3-way soccer "h2h")"""
+    return any(
+        outcome.get("name") == "Draw"
+        for book in game.get("bookmakers", [])
+        for market in book.get("markets", [])
+        if market.get("key") in ("h2h", "h2h_3_way")
+        for outcome in market.get("outcomes", [])
+    )
+
+
+def replay_partition(sport: str, day: str, files: List[Tuple[float, str]], config: BacktestConfig) -> PartitionResult:
+    """
+    Replay one (sport, day) partition in time order.
+
+    Args:
+        sport: Sport key of the partition
+        day: UTC day of the partition
+        files: (timestamp, path) pairs sorted by timestamp
+        config: Stake sizing and scan settings
+
+    Returns:
+        Bets placed and closing-line candidates seen in the partition
+    """
+    bets: Dict[BetKey, SimulatedBet] = {}
+    closing: Dict[LineId, Tuple[float, float]] = {}
+    snapshots = 0
+
+    for file_ts, path in files:
+        try:
+            data, fetched_at = load_payload(path)
+        except (OSError, ValueError) as e:
+            print(f"⚠️  Skipping unreadable payload {path}: {e}")
+            continue
+        fetched_at = fetched_at if fetched_at is not None else file_ts
+        snapshots += 1
+
+        index = build_market_index(data, sharp_keys=config.sharp_weights)
+        frame = index.frame
+        commence = [_commence(game) for game in frame.games]
+        pregame = [start is None or fetched_at < start for start in commence]
+
+        # Closing line candidates: every fair line of games not yet started
+        fair_lines = get_fair_lines(index, config.sharp_weights, config.devig_method)
+        for key, prob in zip(fair_lines.key.tolist(), fair_lines.prob.tolist()):
+            g, l = divmod(key, index.n_lines)
+            if pregame[g]:
+                market, point, name, description = frame.line_keys[l]
+                closing[(frame.games[g]["id"], market, point, name, description)] = (fetched_at, prob)
+
+        # Bets: first pre-kickoff sighting of each opportunity
+        hits = scan_index_rows(
+            index, config.min_ev, devig_method=config.devig_method, sharp_weights=config.sharp_weights,
+        )
+        for row, opp in hits:
+            g = int(frame.game_idx[row])
+            key = row_key(frame, row)
+            if not pregame[g] or key in bets:
+                continue
+            stake = config.bankroll * kelly_criterion(opp.fair_prob, opp.target_odds_decimal, config.kelly_fraction)
+            if stake <= 0:
+                continue
+            bets[key] = SimulatedBet(
+                key=key,
+                sport=opp.sport,
+                match_name=opp.match_name,
+                commence_time=commence[g],
+                placed_at=fetched_at,
+                odds=opp.target_odds_decimal,
+                fair_prob=opp.fair_prob,
+                ev_percent=opp.ev_percent,
+                stake=round(stake, 2),
+                three_way=_has_draw(frame.games[g]),
+            )
+
+    return PartitionResult(sport, day, snapshots, list(bets.values()), closing)
+
+
+# --- Report ---
+
+@dataclass
+class BacktestReport:
+    config: BacktestConfig
+    partitions: int
+    snapshots: int
+    bets: List[SimulatedBet]
+    elapsed_seconds: float
+
+    def summary(self) -> Dict[str, Any]:
+        staked = sum(bet.stake for bet in self.bets)
+        with_close = [bet for bet in self.bets if bet.clv is not None]
+        graded = [bet for bet in self.bets if bet.profit is not None]
+        graded_staked = sum(bet.stake for bet in graded)
+        realized = sum(bet.profit for bet in graded)
+
+        # Drawdown of realized P&L in settlement order, on top of the bankroll
+        equity = peak = self.config.bankroll
+        max_drawdown = max_drawdown_pct = 0.0
+        for bet in sorted(graded, key=lambda b: (b.commence_time or b.placed_at, b.placed_at)):
+            equity += bet.profit
+            peak = max(peak, equity)
+            if peak - equity > max_drawdown:
+                max_drawdown = peak - equity
+                max_drawdown_pct = max_drawdown / peak * 100
+
+        by_sport: Dict[str, int] = {}
+        for bet in self.bets:
+            by_sport[bet.sport] = by_sport.get(bet.sport, 0) + 1
+
+        return {
+            "partitions": self.partitions,
+            "snapshots": self.snapshots,
+            "elapsed_seconds": round(self.elapsed_seconds, 2),
+            "bets": len(self.bets),
+            "bets_by_sport": by_sport,
+            "staked": round(staked, 2),
+            "expected_profit": round(sum(bet.stake * bet.ev_percent / 100 for bet in self.bets), 2),
+            "clv": {
+                "bets": len(with_close),
+                "avg_clv_percent": round(sum(bet.clv for bet in with_close) / len(with_close) * 100, 3) if with_close else None,
+                "beat_close_rate": round(sum(bet.clv > 0 for bet in with_close) / len(with_close), 4) if with_close else None,
+                # Stake-weighted EV at the closing line: the ROI the bets "should" return
+                "closing_roi_percent": round(
+                    sum(bet.stake * bet.clv for bet in with_close) / sum(bet.stake for bet in with_close) * 100, 3
+                ) if with_close else None,
+            },
+            "realized": {
+                "graded": len(graded),
+                "won": sum(bet.result == WON for bet in graded),
+                "lost": sum(bet.result == LOST for bet in graded),
+                "push": sum(bet.result == PUSH for bet in graded),
+                "staked": round(graded_staked, 2),
+                "profit": round(realized, 2),
+                "roi_percent": round(realized / graded_staked * 100, 3) if graded_staked else None,
+                "max_drawdown": round(max_drawdown, 2),
+                "max_drawdown_percent": round(max_drawdown_pct, 3),
+            },
+        }
+
+
+def run_backtest(
+    root: str,
+    scores: Optional[Dict[str, Dict[str, float]]] = None,
+    config: Optional[BacktestConfig] = None,
+    workers: Optional[int] = None,
+    sports: Optional[Iterable[str]] = None,
+) -> BacktestReport:
+    """
+    Replay every recorded payload under `root` and simulate the flagged bets.
+
+    Args:
+        root: Directory of recorded payloads (see module docstring)
+        scores: Event id -> team -> final score, for grading (see `load_scores`)
+        config: Scan and stake settings
+        workers: Worker processes (default: CPU count; 1 runs inline)
+        sports: Only replay these sports
+
+    Returns:
+        BacktestReport
+    """
+    started = time.perf_counter()
+    config = config or BacktestConfig()
+    partitions = discover(root)
+    if sports is not None:
+        wanted = set(sports)
+        partitions = {key: files for key, files in partitions.items() if key[0] in wanted}
+
+    workers = workers or os.cpu_count() or 1
+    results: List[PartitionResult] = []
+    if workers == 1 or len(partitions) <= 1:
+        results = [replay_partition(sport, day, files, config) for (sport, day), files in partitions.items()]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(partitions))) as pool:
+            futures = [
+                pool.submit(replay_partition, sport, day, files, config)
+                for (sport, day), files in partitions.items()
+            ]
+            results = [future.result() for future in as_completed(futures)]
+
+    # Merge: earliest placement of each bet, latest pre-kickoff sighting of each line
+    bets: Dict[BetKey, SimulatedBet] = {}
+    closing: Dict[LineId, Tuple[float, float]] = {}
+    for result in results:
+        for bet in result.bets:
+            current = bets.get(bet.key)
+            if current is None or bet.placed_at < current.placed_at:
+                bets[bet.key] = bet
+        for line, seen in result.closing.items():
+            if line not in closing or seen[0] > closing[line][0]:
+                closing[line] = seen
+
+    scores = scores or {}
+    for bet in bets.values():
+        seen = closing.get(bet.line)
+        bet.closing_prob = seen[1] if seen else None
+        final = scores.get(bet.key[0])
+        if final is not None:
+            bet.result = grade(bet.key[1], bet.key[4], bet.key[2], final, bet.three_way)
+            bet.profit = profit(bet.result, bet.stake, bet.odds)
+
+    return BacktestReport(
+        config=config,
+        partitions=len(results),
+        snapshots=sum(result.snapshots for result in results),
+        # Partitions finish in any order: tie-break on the bet key so reports are reproducible
+        bets=sorted(bets.values(), key=lambda bet: (bet.placed_at, repr(bet.key))),
+        elapsed_seconds=time.perf_counter() - started,
+    )
+
+
+def main(argv: Optional[List[str]] = None):
+    from app.core.config import parse_weights, settings
+
+    parser = argparse.ArgumentParser(description="Replay recorded odds through the EV scanner and simulate the bets.")
+    parser.add_argument("root", help="Directory of recorded payloads (<root>/<sport>/.../<timestamp>.json[.gz])")
+    parser.add_argument("--scores", help="Odds API /scores JSON file or directory, for ROI")
+    parser.add_argument("--sports", help="Comma-separated sport keys to replay")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--min-ev", type=float, default=0.0, help="Minimum EV percentage")
+    parser.add_argument("--bankroll", type=float, default=1000.0, help="Flat bankroll for stake sizing")
+    parser.add_argument("--kelly", type=float, default=0.25, help="Kelly multiplier")
+    parser.add_argument("--devig", choices=DEVIG_METHODS, default=settings.DEVIG_METHOD, help="Devig method")
+    parser.add_argument("--sharp-books", default=None, help='Consensus weights, "book:weight,..." (default: SHARP_BOOKS)')
+    parser.add_argument("--bets", help="Also write every simulated bet to this JSON file")
+    args = parser.parse_args(argv)
+
+    config = BacktestConfig(
+        min_ev=args.min_ev, bankroll=args.bankroll, kelly_fraction=args.kelly, devig_method=args.devig,
+        sharp_weights=parse_weights(args.sharp_books) if args.sharp_books else dict(settings.SHARP_BOOKS),
+    )
+    report = run_backtest(
+        args.root,
+        scores=load_scores(args.scores),
+        config=config,
+        workers=args.workers,
+        sports=args.sports.split(",") if args.sports else None,
+    )
+    print(json.dumps(report.summary(), indent=2))
+    if args.bets:
+        with open(args.bets, "w") as f:
+            json.dump([{**asdict(bet), "clv": bet.clv} for bet in report.bets], f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
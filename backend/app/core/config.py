@@ -1,15 +1,37 @@
 import os
 from typing import Optional
-from dotenv import load_dotenv
 
-load_dotenv()
+try:
+    from dotenv import load_dotenv
+except ImportError:  # pragma: no cover - optional outside the server (CLI, notebooks)
+    load_dotenv = None
+
+# The one place .env is read; everything else goes through `settings`
+if load_dotenv is not None:
+    load_dotenv()
+
+
+def parse_weights(raw: str) -> dict:
+    """Parse "book:weight,book:weight" (a bare book key means weight 1)"""
+    weights = {}
+    for item in raw.split(","):
+        key, _, weight = item.strip().partition(":")
+        if key:
+            weights[key] = float(weight) if weight else 1.0
+    return weights
+
 
 class Settings:
     """Application configuration settings"""
     
     # API Configuration
     ODDS_API_KEY: Optional[str] = os.getenv("ODDS_API_KEY")
-    ODDS_API_BASE_URL: str = "https://api.the-odds-api.com/v4/sports"
+    ODDS_API_BASE_URL: str = os.getenv("ODDS_API_BASE_URL", "https://api.the-odds-api.com/v4/sports")
+    # Pooled connections of the shared upstream client
+    HTTP_MAX_CONNECTIONS: int = int(os.getenv("HTTP_MAX_CONNECTIONS", "20"))
+    # Cached upstream payloads: whole sports, and single events (player props)
+    ODDS_CACHE_MAX_ENTRIES: int = int(os.getenv("ODDS_CACHE_MAX_ENTRIES", "64"))
+    EVENT_CACHE_MAX_ENTRIES: int = int(os.getenv("EVENT_CACHE_MAX_ENTRIES", "512"))
     
     # Database Configuration
     DATABASE_URL: Optional[str] = os.getenv("DATABASE_URL")
@@ -18,6 +40,16 @@ class Settings:
     if not DATABASE_URL:
         DATABASE_URL = "sqlite:///./bets.db"
     
+    # Async engine pool (PostgreSQL; SQLite uses the driver's own pool)
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "10"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+    DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+    # Largest POST /bets/bulk body and /history page
+    MAX_BULK_BETS: int = int(os.getenv("MAX_BULK_BETS", "5000"))
+    HISTORY_PAGE_SIZE: int = int(os.getenv("HISTORY_PAGE_SIZE", "500"))
+    MAX_HISTORY_PAGE_SIZE: int = int(os.getenv("MAX_HISTORY_PAGE_SIZE", "5000"))
+    
     # CORS Configuration
     FRONTEND_URL: str = os.getenv("FRONTEND_URL", "http://localhost:3000")
     ALLOWED_ORIGINS: list = [
@@ -53,11 +85,120 @@ class Settings:
     DEFAULT_MARKETS: str = "h2h,spreads,totals"
     ODDS_FORMAT: str = "decimal"
     
-    # Rate Limiting (for future implementation)
-    MAX_REQUESTS_PER_MINUTE: int = 10
+    # Sharp books blended into the consensus fair line, with weights
+    # (e.g. "pinnacle:1.0,circasports:0.5"). Games priced by only some of
+    # them fall back to the ones present. Pinnacle alone by default.
+    SHARP_BOOKS: dict = parse_weights(os.getenv("SHARP_BOOKS", "pinnacle:1.0"))
+    
+    # Devig method for sharp lines (multiplicative, additive, power, shin, odds_ratio)
+    DEVIG_METHOD: str = os.getenv("DEVIG_METHOD", "multiplicative")
+    
+    # Upstream Fetching
+    FETCH_CONCURRENCY: int = int(os.getenv("FETCH_CONCURRENCY", "5"))
+    
+    # Background Poller (each poll costs markets x regions API credits)
+    ENABLE_POLLER: bool = os.getenv("ENABLE_POLLER", "true").lower() in ("1", "true", "yes")
+    POLL_INTERVAL_SECONDS: float = float(os.getenv("POLL_INTERVAL_SECONDS", "600"))
+    POLL_INTERVALS: dict = dict.fromkeys(SUPPORTED_SPORTS, POLL_INTERVAL_SECONDS)
+
+    # Multi-worker state (see app.services.shared_state): "memory" for one
+    # process, "file" for `uvicorn --workers N` (one leader polls, the others
+    # read its snapshots). Defaults to "file" when WEB_CONCURRENCY > 1.
+    STATE_BACKEND: str = os.getenv("STATE_BACKEND", "file" if int(os.getenv("WEB_CONCURRENCY", "1")) > 1 else "memory")
+    STATE_DIR: Optional[str] = os.getenv("STATE_DIR")  # default: /dev/shm/value-bet-finder
+    STATE_FOLLOW_INTERVAL_SECONDS: float = float(os.getenv("STATE_FOLLOW_INTERVAL_SECONDS", "1.0"))
+    LEADER_RETRY_SECONDS: float = float(os.getenv("LEADER_RETRY_SECONDS", "5.0"))
+
+    # Player props, fetched per event (billed per event) for events starting
+    # within PROP_WINDOW_HOURS and merged into the sport's main markets.
+    # PROP_MARKETS="sport:market|market,..." overrides the defaults below.
+    ENABLE_PROPS: bool = os.getenv("ENABLE_PROPS", "false").lower() in ("1", "true", "yes")
+    PROP_MARKETS: dict = {
+        "basketball_nba": "player_points,player_rebounds,player_assists,player_threes",
+        "basketball_ncaab": "player_points,player_rebounds,player_assists",
+        "americanfootball_nfl": "player_pass_yds,player_rush_yds,player_reception_yds,player_receptions",
+        "icehockey_nhl": "player_points,player_shots_on_goal",
+        "baseball_mlb": "batter_hits,batter_total_bases,pitcher_strikeouts",
+    }
+    if os.getenv("PROP_MARKETS"):
+        PROP_MARKETS = {
+            sport: markets.replace("|", ",")
+            for sport, _, markets in (item.strip().partition(":") for item in os.getenv("PROP_MARKETS").split(","))
+            if sport and markets
+        }
+    PROP_WINDOW_HOURS: float = float(os.getenv("PROP_WINDOW_HOURS", "6"))
+    PROP_POLL_INTERVAL_SECONDS: float = float(os.getenv("PROP_POLL_INTERVAL_SECONDS", "900"))
+    
+    # Bet settlement: pending bets are graded against final scores from the
+    # Odds API /scores endpoint, or from SETTLEMENT_SCORES_PATH (a /scores
+    # dump file or a directory of them) when set
+    ENABLE_SETTLEMENT: bool = os.getenv("ENABLE_SETTLEMENT", "true").lower() in ("1", "true", "yes")
+    SETTLEMENT_INTERVAL_SECONDS: float = float(os.getenv("SETTLEMENT_INTERVAL_SECONDS", "3600"))
+    SETTLEMENT_BATCH_SIZE: int = int(os.getenv("SETTLEMENT_BATCH_SIZE", "5000"))
+    SETTLEMENT_SCORES_PATH: Optional[str] = os.getenv("SETTLEMENT_SCORES_PATH")
+    
+    # Odds History (every published payload, columnar on disk)
+    ENABLE_ODDS_STORE: bool = os.getenv("ENABLE_ODDS_STORE", "true").lower() in ("1", "true", "yes")
+    # Outside the checkout by default, so dev runs never write into the repo
+    ODDS_STORE_DIR: str = os.getenv("ODDS_STORE_DIR") or os.path.join(
+        os.getenv("XDG_DATA_HOME") or os.path.join(os.path.expanduser("~"), ".local", "share"),
+        "value-bet-finder", "odds_history",
+    )
+    # Also keep every raw payload (gzipped) for offline replay / backtests
+    ODDS_STORE_KEEP_PAYLOADS: bool = os.getenv("ODDS_STORE_KEEP_PAYLOADS", "false").lower() in ("1", "true", "yes")
+    
+    # Parlay search latency budget per request
+    PARLAY_TIME_BUDGET_SECONDS: float = float(os.getenv("PARLAY_TIME_BUDGET_SECONDS", "0.25"))
+    
+    # Stake allocation (simultaneous Kelly); exposures are shares of the bankroll
+    BANKROLL: float = float(os.getenv("BANKROLL", "1000"))
+    KELLY_FRACTION: float = float(os.getenv("KELLY_FRACTION", "0.25"))
+    MAX_GAME_EXPOSURE: float = float(os.getenv("MAX_GAME_EXPOSURE", "0.1"))
+    MAX_BOOK_EXPOSURE: float = float(os.getenv("MAX_BOOK_EXPOSURE", "0.25"))
+    MAX_TOTAL_EXPOSURE: float = float(os.getenv("MAX_TOTAL_EXPOSURE", "0.5"))
+    STAKE_SCENARIOS: int = int(os.getenv("STAKE_SCENARIOS", "4000"))
+    MAX_STAKE_CANDIDATES: int = int(os.getenv("MAX_STAKE_CANDIDATES", "500"))
+
+    # Arbitrage / middles feed: default total stake split across the legs, and
+    # the most a middle may lose (% of the stake) when the result misses it
+    ARB_STAKE: float = float(os.getenv("ARB_STAKE", "100"))
+    MAX_MIDDLE_LOSS_PERCENT: float = float(os.getenv("MAX_MIDDLE_LOSS_PERCENT", "3.0"))
+    
+    # Startup budget: imports plus the startup hook, until the server takes
+    # requests (database setup runs in the background, after it)
+    STARTUP_BUDGET_SECONDS: float = float(os.getenv("STARTUP_BUDGET_SECONDS", "2.0"))
+    
+    # Streaming (SSE)
+    STREAM_HEARTBEAT_SECONDS: float = 15.0
+    STREAM_MAX_QUEUE: int = 64
+    
+    # Observability: Prometheus /metrics, and a sampling profiler toggled at
+    # runtime through /debug/profiler/start and /debug/profiler/stop
+    ENABLE_METRICS: bool = os.getenv("ENABLE_METRICS", "true").lower() in ("1", "true", "yes")
+    ENABLE_PROFILER: bool = os.getenv("ENABLE_PROFILER", "false").lower() in ("1", "true", "yes")
+    PROFILER_HZ: float = float(os.getenv("PROFILER_HZ", "100"))
+    # Start sampling at startup (only with ENABLE_PROFILER)
+    PROFILER_AUTOSTART: bool = os.getenv("PROFILER_AUTOSTART", "false").lower() in ("1", "true", "yes")
+    
+    # Upstream quota: at most MAX_REQUESTS_PER_MINUTE calls (token bucket), and
+    # poll intervals planned so the credits last until the monthly reset.
+    # Below QUOTA_RESERVE_CREDITS only sports with live or imminent games poll.
+    MAX_REQUESTS_PER_MINUTE: int = int(os.getenv("MAX_REQUESTS_PER_MINUTE", "10"))
+    MIN_POLL_INTERVAL_SECONDS: float = float(os.getenv("MIN_POLL_INTERVAL_SECONDS", "60"))
+    MAX_POLL_INTERVAL_SECONDS: float = float(os.getenv("MAX_POLL_INTERVAL_SECONDS", "3600"))
+    QUOTA_RESERVE_CREDITS: int = int(os.getenv("QUOTA_RESERVE_CREDITS", "50"))
+    QUOTA_RESET_DAY: int = int(os.getenv("QUOTA_RESET_DAY", "1"))
     
     def validate(self) -> list[str]:
-        """Validate configuration and return list of warnings/errors"""
+        """
+        Validate configuration and return list of warnings.
+        Raises ValueError for settings the app cannot run with.
+        """
+        from app.core.math_logic import DEVIG_METHODS
+
+        if self.DEVIG_METHOD not in DEVIG_METHODS:
+            raise ValueError(f"DEVIG_METHOD '{self.DEVIG_METHOD}' is not one of {', '.join(DEVIG_METHODS)}")
+        
         issues = []
         
         if not self.ODDS_API_KEY or len(self.ODDS_API_KEY) < 10:
@@ -1,6 +1,16 @@
-from sqlmodel import SQLModel, create_engine, Session
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+from typing import Awaitable, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+import asyncio
 import os
 
+from app.core.config import settings
+from app.models import tables  # noqa: F401 - registers the tables on SQLModel.metadata
+
 # Default to SQLite for local, use DATABASE_URL for Production (Render provides this)
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./bets.db")
 
@@ -8,13 +18,117 @@ DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./bets.db")
 if DATABASE_URL.startswith("postgres://"):
     DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql://", 1)
 
-connect_args = {"check_same_thread": False} if "sqlite" in DATABASE_URL else {}
 
-engine = create_engine(DATABASE_URL, connect_args=connect_args)
+def async_url(url: str) -> tuple[str, dict]:
+    """
+    Async driver URL for a sync database URL, plus driver connect args.
+    SQLite goes through aiosqlite, PostgreSQL through asyncpg (which takes
+    `ssl` instead of libpq's `sslmode` query parameter).
+    """
+    if url.startswith("sqlite:"):
+        return url.replace("sqlite:", "sqlite+aiosqlite:", 1), {"check_same_thread": False}
+    scheme, netloc, path, query, fragment = urlsplit(url)
+    scheme = "postgresql+asyncpg" if scheme in ("postgresql", "postgresql+psycopg2") else scheme
+    params = dict(parse_qsl(query))
+    connect_args = {}
+    sslmode = params.pop("sslmode", None)
+    if sslmode and sslmode != "disable":
+        connect_args["ssl"] = sslmode
+    return urlunsplit((scheme, netloc, path, urlencode(params), fragment)), connect_args
+
+
+ASYNC_DATABASE_URL, connect_args = async_url(DATABASE_URL)
+
+if "sqlite" in ASYNC_DATABASE_URL:
+    engine = create_async_engine(ASYNC_DATABASE_URL, connect_args=connect_args)
+else:
+    # Connections are checked before use and recycled before the server
+    # (or a proxy in between) drops them as idle
+    engine = create_async_engine(
+        ASYNC_DATABASE_URL,
+        connect_args=connect_args,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=True,
+    )
+
+# Rows stay readable after commit without another round trip
+async_session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+
+# Schema setup runs in the background so the server takes requests without
+# waiting on the database (see defer_setup); sessions wait for it
+_setup: Optional[asyncio.Task] = None
+
+
+def defer_setup(setup: Awaitable) -> asyncio.Task:
+    """
+    Run `setup` (schema creation, backfills) as a background task. It
+    should handle its own errors: sessions wait for it, then proceed.
+    """
+    global _setup
+    _setup = asyncio.ensure_future(setup)
+    return _setup
+
 
-def get_session():
-    with Session(engine) as session:
+async def wait_until_ready():
+    """Wait for the deferred setup, if any is still running"""
+    if _setup is not None and not _setup.done():
+        # Shielded: a cancelled request must not cancel the setup
+        await asyncio.shield(_setup)
+
+
+async def get_session():
+    await wait_until_ready()
+    async with async_session() as session:
         yield session
 
-def create_db_and_tables():
-    SQLModel.metadata.create_all(engine)
+
+def _add_missing_columns(connection):
+    """Add nullable columns introduced after a table was created (create_all never alters tables)"""
+    inspector = inspect(connection)
+    preparer = connection.dialect.identifier_preparer
+    for table in SQLModel.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing or not column.nullable:
+                continue
+            column_type = column.type.compile(dialect=connection.dialect)
+            connection.execute(text(
+                f"ALTER TABLE {preparer.format_table(table)} ADD COLUMN {preparer.format_column(column)} {column_type}"
+            ))
+            print(f"✓ Added column {table.name}.{column.name}")
+
+
+def _create_all(connection):
+    _add_missing_columns(connection)
+    SQLModel.metadata.create_all(connection)
+    # create_all only indexes tables it creates; add indexes introduced later
+    for table in SQLModel.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(connection, checkfirst=True)
+
+
+async def create_db_and_tables(attempts: int = 3):
+    for attempt in range(attempts):
+        try:
+            async with engine.begin() as connection:
+                await connection.run_sync(_create_all)
+            return
+        except DBAPIError:
+            # Another worker created a table or index between our check and
+            # CREATE; the next attempt sees it and skips it
+            if attempt == attempts - 1:
+                raise
+            await asyncio.sleep(0.2 * (attempt + 1))
+
+
+async def close_db():
+    if _setup is not None and not _setup.done():
+        _setup.cancel()
+        await asyncio.gather(_setup, return_exceptions=True)
+    await engine.dispose()
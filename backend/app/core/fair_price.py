@@ -0,0 +1,165 @@
+"""
+Consensus fair prices from several sharp books.
+
+Each sharp book's markets are devigged on their own, then every line
+(game, market, point, outcome, description) gets the weighted average of the
+fair probabilities of the sharp books that priced it. Weights are
+renormalized over the books actually present, so a game one book has not
+priced falls back to the others instead of being dropped.
+
+The result is computed once per index and devig method and memoized on the
+`MarketIndex`, so the EV scan and anything else reading the same payload
+share one computation.
+"""
+from dataclasses import dataclass
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from app.core.market_index import MarketIndex
+from app.core.math_logic import devig_implied
+
+
+@dataclass
+class FairLines:
+    """
+    Consensus fair probability for every line at least one sharp book priced.
+    Arrays are aligned and sorted by `key` (the index's packed game/line key).
+    """
+    key: np.ndarray            # unique (game, line) keys
+    prob: np.ndarray           # consensus fair probability
+    books_mask: np.ndarray     # bit i set when sharp_keys[i] contributed
+    primary_group: np.ndarray  # devig group of the highest-weighted contributing book
+    group_rows: np.ndarray     # sharp rows, ordered so each devig group is a contiguous slice
+    group_start: np.ndarray
+    group_end: np.ndarray
+    sharp_keys: Tuple[str, ...]
+
+    @property
+    def size(self) -> int:
+        return len(self.key)
+
+    def find(self, keys: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Locate index keys among the fair lines.
+
+        Returns:
+            (positions, found): `positions[i]` is valid where `found[i]` is True
+        """
+        pos = np.searchsorted(self.key, keys)
+        pos = np.minimum(pos, max(self.size - 1, 0))
+        found = (self.key[pos] == keys) if self.size else np.zeros(len(keys), dtype=bool)
+        return pos, found
+
+    def sources(self, i: int) -> List[str]:
+        """Sharp book keys behind line `i`, highest weight first"""
+        mask = int(self.books_mask[i])
+        return [key for bit, key in enumerate(self.sharp_keys) if mask >> bit & 1]
+
+    def group_slice(self, i: int) -> np.ndarray:
+        """Sharp rows of the primary book's market for line `i` (for display)"""
+        g = int(self.primary_group[i])
+        return self.group_rows[self.group_start[g]:self.group_end[g]]
+
+
+def normalize_weights(weights: Dict[str, float]) -> Tuple[Tuple[str, ...], np.ndarray]:
+    """Order sharp books by weight (highest first), dropping non-positive weights"""
+    items = sorted(((k, float(w)) for k, w in weights.items() if w > 0), key=lambda kw: -kw[1])
+    return tuple(k for k, _ in items), np.array([w for _, w in items], dtype=np.float64)
+
+
+def compute_fair_lines(index: MarketIndex, weights: Dict[str, float], devig_method: str = "multiplicative") -> FairLines:
+    """
+    Devig every sharp book's markets and blend them into consensus lines.
+
+    Args:
+        index: Indexed payload
+        weights: Sharp book key -> weight
+        devig_method: Any of `math_logic.DEVIG_METHODS`
+
+    Returns:
+        FairLines for the whole slate
+    """
+    frame = index.frame
+    sharp_keys, weight_values = normalize_weights(weights)
+    empty = np.zeros(0, dtype=np.int64)
+    nothing = FairLines(empty, np.zeros(0), empty, empty, empty, empty, empty, sharp_keys)
+
+    # Sharp ordinal of every book code (-1 = not a sharp source)
+    ordinal_of = {key: i for i, key in enumerate(sharp_keys)}
+    book_ordinal = np.array([ordinal_of.get(book["key"], -1) for book in frame.books], dtype=np.int64)
+    if frame.size == 0 or not len(sharp_keys):
+        return nothing
+    row_ordinal = book_ordinal[frame.book_idx]
+    sharp_rows = np.flatnonzero(frame.is_sharp & (row_ordinal >= 0))
+    if sharp_rows.size == 0:
+        return nothing
+
+    # 1. Devig groups: one book's market entry split by (description, |point|),
+    # so each prop player / alternate line is its own set. Need two outcomes.
+    n_pairs = int(frame.pair_idx.max()) + 1
+    _, group, group_sizes = np.unique(
+        frame.slot[sharp_rows] * n_pairs + frame.pair_idx[sharp_rows],
+        return_inverse=True, return_counts=True,
+    )
+    multi = group_sizes[group] >= 2
+    sharp_rows, group = sharp_rows[multi], group[multi]
+    if sharp_rows.size == 0:
+        return nothing
+    group = np.unique(group, return_inverse=True)[1]
+    n_groups = int(group.max()) + 1
+    by_group = np.argsort(group, kind="stable")
+    sharp_rows, group = sharp_rows[by_group], group[by_group]
+    group_start = np.searchsorted(group, np.arange(n_groups), side="left")
+    group_end = np.searchsorted(group, np.arange(n_groups), side="right")
+
+    # 2. Per-book fair probabilities for the whole slate in one batched call
+    dec = index.decimal[sharp_rows]
+    with np.errstate(divide="ignore"):
+        ip = np.where(dec > 0, 1 / dec, 0.0)
+    fair = devig_implied(ip, group, devig_method, n_groups=n_groups)
+
+    # When a group repeats a line the later entry wins (matches the scalar reference)
+    line_key = index.key[sharp_rows]
+    dedup = np.lexsort((-np.arange(sharp_rows.size), line_key, group))
+    keep = np.ones(dedup.size, dtype=bool)
+    keep[1:] = (group[dedup][1:] != group[dedup][:-1]) | (line_key[dedup][1:] != line_key[dedup][:-1])
+    sel = dedup[keep]
+    rows, grp, line_key, fair = sharp_rows[sel], group[sel], line_key[sel], fair[sel]
+    ordinal = row_ordinal[rows]
+    weight = weight_values[ordinal]
+
+    # 3. Weighted consensus per line, renormalized over the books present
+    keys, inverse = np.unique(line_key, return_inverse=True)
+    n_keys = len(keys)
+    total_weight = np.bincount(inverse, weights=weight, minlength=n_keys)
+    prob = np.bincount(inverse, weights=weight * fair, minlength=n_keys) / total_weight
+    books_mask = np.zeros(n_keys, dtype=np.int64)
+    np.bitwise_or.at(books_mask, inverse, np.left_shift(1, ordinal))
+
+    # Primary (highest-weighted) book per line; ties go to the earliest payload entry
+    pick = np.lexsort((grp, ordinal, inverse))
+    first = np.ones(pick.size, dtype=bool)
+    first[1:] = inverse[pick][1:] != inverse[pick][:-1]
+    primary_group = np.empty(n_keys, dtype=np.int64)
+    primary_group[inverse[pick][first]] = grp[pick][first]
+
+    return FairLines(
+        key=keys,
+        prob=prob,
+        books_mask=books_mask,
+        primary_group=primary_group,
+        group_rows=sharp_rows,
+        group_start=group_start,
+        group_end=group_end,
+        sharp_keys=sharp_keys,
+    )
+
+
+def get_fair_lines(index: MarketIndex, weights: Dict[str, float], devig_method: str = "multiplicative") -> FairLines:
+    """`compute_fair_lines`, memoized on the index per (weights, devig method)"""
+    cache_key = ("fair_lines", tuple(sorted(weights.items())), devig_method)
+    fair_lines = index.cache.get(cache_key)
+    if fair_lines is None:
+        fair_lines = index.cache[cache_key] = compute_fair_lines(index, weights, devig_method)
+    return fair_lines
@@ -0,0 +1,72 @@
+"""
+JSON encoding and decoding for large payloads.
+
+Uses orjson when it is installed and falls back to the standard library
+otherwise; both paths produce the same documents (compact separators, UTF-8
+bytes). Pydantic models are encoded from their field dict, which skips
+pydantic's serializer but gives byte-identical output for the plain models
+this API returns.
+"""
+import json
+from typing import Any, Dict, Iterable, List, Sequence, Type, Union
+
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+BACKEND = "orjson" if orjson is not None else "json"
+
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, BaseModel):
+        return obj.__dict__
+    if hasattr(obj, "item"):  # numpy scalars
+        return obj.item()
+    if hasattr(obj, "tolist"):  # numpy arrays
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def loads(data: Union[bytes, bytearray, memoryview, str]) -> Any:
+    """Decode a JSON document"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps(obj: Any) -> bytes:
+    """Encode `obj` as compact UTF-8 JSON (models, numpy values included)"""
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default)
+    return json.dumps(obj, default=_default, separators=(",", ":"), ensure_ascii=False).encode()
+
+
+def dumps_each(models: Iterable[BaseModel]) -> List[bytes]:
+    """Encode models one by one, e.g. to cache and join them later"""
+    if orjson is not None:
+        encode = orjson.dumps
+        return [encode(model.__dict__, default=_default) for model in models]
+    return [model.__pydantic_serializer__.to_json(model) for model in models]
+
+
+def join_array(encoded: Sequence[bytes]) -> bytes:
+    """JSON array of already encoded elements"""
+    return b"[" + b",".join(encoded) + b"]"
+
+
+def columns(models: Sequence[BaseModel], model: Type[BaseModel]) -> Dict[str, list]:
+    """Field name -> list of values, in the model's field order"""
+    fields = list(model.model_fields)
+    return {name: [m.__dict__[name] for m in models] for name in fields}
+
+
+def dumps_columns(models: Sequence[BaseModel], model: Type[BaseModel]) -> bytes:
+    """
+    Compact array-of-columns document for machine clients:
+    `{"count": n, "columns": {"field": [v0, v1, ...], ...}}`. Field names are
+    written once instead of once per row.
+    """
+    return dumps({"count": len(models), "columns": columns(models, model)})
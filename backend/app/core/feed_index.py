@@ -0,0 +1,191 @@
+"""
+Filtered, sorted and paged reads of one opportunity list.
+
+`/ev/feed` answers "top 20 at DraftKings in totals" without touching the
+rest of the slate. Per sort key, a `FeedIndex` keeps the opportunities in
+order (built on first use, once per snapshot), plus the same order split
+per book and per market type. A query:
+
+1. picks the narrowest prebuilt list for its book / market filters (a
+   `heapq.merge` of several when it names more than one book or market);
+2. bisects to its cursor, so a page starts where the previous one ended;
+3. walks the list applying the remaining filters until the page is full,
+   stopping early at the EV threshold when sorted by EV.
+
+Work and response size grow with the page, not with the slate.
+"""
+import heapq
+import re
+from bisect import bisect_right
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from app.models.schemas import BetOpportunity
+
+# Sort key -> field, highest first
+SORT_FIELDS = {
+    "ev": "ev_percent",
+    "odds": "target_odds_decimal",
+    "kelly": "kelly_fraction",
+}
+# Query spellings of each market type (see `market_type`)
+MARKET_ALIASES = {
+    "h2h": "moneyline", "ml": "moneyline", "moneyline": "moneyline",
+    "spreads": "spread", "spread": "spread",
+    "totals": "total", "total": "total",
+    "props": "prop", "prop": "prop", "player_prop": "prop", "player prop": "prop",
+}
+
+# (-value, id): ascending order is value descending, ties by id
+SortKey = Tuple[float, str]
+
+
+def market_type(market: str) -> str:
+    """Type of a feed market name: moneyline, spread, total, prop, or the name itself"""
+    if market == "Moneyline":
+        return "moneyline"
+    if market.startswith("Spread"):
+        return "spread"
+    if market.startswith("Total"):
+        return "total"
+    if market == "Player Prop":
+        return "prop"
+    return market.lower()
+
+
+def book_key(book: str) -> str:
+    """Comparable form of a book's title or key ("William Hill (US)" ~ "williamhill_us")"""
+    return re.sub(r"[^0-9a-z]", "", book.lower())
+
+
+@dataclass(frozen=True)
+class FeedQuery:
+    sort: str = "ev"
+    books: Tuple[str, ...] = ()  # book_key values
+    markets: Tuple[str, ...] = ()  # market types
+    search: Optional[str] = None  # lower-cased substring of the selection or match
+    min_ev: float = 0.0
+    min_odds: Optional[float] = None
+    max_odds: Optional[float] = None
+    min_kelly: Optional[float] = None  # compared to kelly_fraction (quarter Kelly)
+    limit: Optional[int] = None
+    after: Optional[SortKey] = None  # cursor: sort key of the last item of the previous page
+
+    @classmethod
+    def parse(
+        cls,
+        sort: str = "ev",
+        books: Optional[str] = None,
+        markets: Optional[str] = None,
+        search: Optional[str] = None,
+        **filters,
+    ) -> "FeedQuery":
+        """Build a query from comma-separated book / market lists as they come in the URL"""
+        def split(raw: Optional[str]) -> List[str]:
+            return [item.strip() for item in raw.split(",") if item.strip()] if raw else []
+        return cls(
+            sort=sort,
+            books=tuple(dict.fromkeys(book_key(book) for book in split(books))),
+            markets=tuple(dict.fromkeys(MARKET_ALIASES.get(market.lower(), market.lower()) for market in split(markets))),
+            search=search.lower() if search else None,
+            **filters,
+        )
+
+    @property
+    def is_plain(self) -> bool:
+        """Only an EV threshold: the whole EV-sorted list, served from memoized bodies"""
+        return (
+            self.sort == "ev" and not self.books and not self.markets and self.search is None
+            and self.min_odds is None and self.max_odds is None and self.min_kelly is None
+            and self.limit is None and self.after is None
+        )
+
+    def matches(self, opp: BetOpportunity) -> bool:
+        if opp.ev_percent <= self.min_ev:
+            return False
+        if self.min_odds is not None and opp.target_odds_decimal < self.min_odds:
+            return False
+        if self.max_odds is not None and opp.target_odds_decimal > self.max_odds:
+            return False
+        if self.min_kelly is not None and opp.kelly_fraction < self.min_kelly:
+            return False
+        if self.books and book_key(opp.target_book) not in self.books:
+            return False
+        if self.markets and market_type(opp.market) not in self.markets:
+            return False
+        if self.search is not None and self.search not in opp.selection.lower() and self.search not in opp.match_name.lower():
+            return False
+        return True
+
+
+class _Order:
+    """Positions into the opportunity list in one sort order, with their sort keys for bisecting"""
+
+    def __init__(self):
+        self.keys: List[SortKey] = []
+        self.positions: List[int] = []
+
+    def append(self, key: SortKey, position: int):
+        self.keys.append(key)
+        self.positions.append(position)
+
+    def after(self, key: Optional[SortKey]) -> Iterator[Tuple[SortKey, int]]:
+        start = bisect_right(self.keys, key) if key is not None else 0
+        # A generator rather than slices: a page reads only what it walks past
+        return ((self.keys[i], self.positions[i]) for i in range(start, len(self.keys)))
+
+
+class FeedIndex:
+    """Sorted views of an opportunity list, one set per sort key, built on first use"""
+
+    def __init__(self, opportunities: Sequence[BetOpportunity]):
+        self.opportunities = opportunities
+        # sort -> (all, per book key, per market type)
+        self._orders: Dict[str, Tuple[_Order, Dict[str, _Order], Dict[str, _Order]]] = {}
+
+    def _build(self, sort: str) -> Tuple[_Order, Dict[str, _Order], Dict[str, _Order]]:
+        built = self._orders.get(sort)
+        if built is None:
+            field = SORT_FIELDS[sort]
+            keys = [(-getattr(opp, field), opp.id or "") for opp in self.opportunities]
+            everything, by_book, by_market = _Order(), {}, {}
+            for position in sorted(range(len(keys)), key=keys.__getitem__):
+                opp, key = self.opportunities[position], keys[position]
+                everything.append(key, position)
+                by_book.setdefault(book_key(opp.target_book), _Order()).append(key, position)
+                by_market.setdefault(market_type(opp.market), _Order()).append(key, position)
+            built = self._orders[sort] = (everything, by_book, by_market)
+        return built
+
+    def _candidates(self, query: FeedQuery) -> Iterable[Tuple[SortKey, int]]:
+        everything, by_book, by_market = self._build(query.sort)
+        lists = [everything]
+        if query.books:
+            lists = [by_book[book] for book in query.books if book in by_book]
+        if query.markets:
+            markets = [by_market[market] for market in query.markets if market in by_market]
+            if not query.books or sum(len(o.keys) for o in markets) < sum(len(o.keys) for o in lists):
+                lists = markets
+        if len(lists) == 1:
+            return lists[0].after(query.after)
+        # Several lists, each in sort order: a lazy k-way merge
+        return heapq.merge(*(o.after(query.after) for o in lists))
+
+    def query(self, query: FeedQuery) -> Tuple[List[int], Optional[SortKey]]:
+        """
+        Positions of the page of `query`, and the cursor of the next page
+        (None on the last page).
+        """
+        by_ev = query.sort == "ev"
+        page: List[int] = []
+        last: Optional[SortKey] = None
+        for key, position in self._candidates(query):
+            if by_ev and -key[0] <= query.min_ev:
+                break  # sorted by EV: nothing further clears the threshold
+            if not query.matches(self.opportunities[position]):
+                continue
+            if query.limit is not None and len(page) == query.limit:
+                return page, last
+            page.append(position)
+            last = key
+        return page, None
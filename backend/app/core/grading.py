@@ -0,0 +1,126 @@
+"""
+Bet grading from final scores.
+
+Scores use The Odds API `/scores` shape: a completed event carries
+`scores: [{"name": team, "score": "102"}, ...]`. Moneylines, spreads and
+totals can be graded from those; player props and other markets cannot.
+"""
+from typing import Any, Dict, Optional, Tuple
+
+WON = "Won"
+LOST = "Lost"
+PUSH = "Push"
+
+# Sports whose "h2h" market is three-way (home / Draw / away)
+THREE_WAY_SPORT_PREFIXES = ("soccer_",)
+
+
+def has_draw(sport: Optional[str]) -> bool:
+    """Whether a sport's moneyline has a Draw outcome, for bets saved without their market"""
+    return bool(sport) and sport.startswith(THREE_WAY_SPORT_PREFIXES)
+
+
+def final_scores(event: Dict[str, Any]) -> Optional[Dict[str, float]]:
+    """Team -> final score for a completed event, None while it is not final"""
+    if not event.get("completed") or not event.get("scores"):
+        return None
+    try:
+        return {s["name"]: float(s["score"]) for s in event["scores"]}
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+# Feed display names (see app.core.scanner.market_key_to_name) -> market keys
+_DISPLAY_PREFIXES = (("Spread ", "spreads"), ("Total ", "totals"))
+
+
+def parse_market(market: Optional[str], point: Optional[float] = None) -> Tuple[Optional[str], Optional[float]]:
+    """
+    Market key and line of a saved bet. Accepts Odds API keys ("spreads")
+    as well as feed display names ("Moneyline", "Spread -3.5", "Total 210.5").
+
+    Returns:
+        (market key, point); (None, None) when the market is unknown
+    """
+    if not market:
+        return None, None
+    if market == "Moneyline":
+        return "h2h", None
+    for prefix, key in _DISPLAY_PREFIXES:
+        if market.startswith(prefix):
+            try:
+                return key, float(market[len(prefix):])
+            except ValueError:
+                return key, point
+    return market, point
+
+
+def grade(
+    market_key: str,
+    selection: str,
+    point: Optional[float],
+    scores: Dict[str, float],
+    three_way: bool = False,
+) -> Optional[str]:
+    """
+    Grade one bet.
+
+    Args:
+        market_key: Odds API market key ("h2h", "spreads", "totals")
+        selection: Outcome name (team, "Draw", "Over" or "Under")
+        point: Spread or total line, None for moneylines
+        scores: Team -> final score
+        three_way: The moneyline has a Draw outcome (soccer "h2h"), so a
+            team bet loses on a draw instead of pushing
+
+    Returns:
+        WON, LOST or PUSH; None when the market or selection cannot be graded
+    """
+    if len(scores) != 2:
+        return None
+    (team_a, score_a), (team_b, score_b) = scores.items()
+
+    if market_key in ("h2h", "h2h_3_way"):
+        if selection == "Draw":
+            return WON if score_a == score_b else LOST
+        if selection not in scores:
+            return None
+        if score_a == score_b:
+            # A tie settles a two-way moneyline as a push; where the market
+            # has a Draw outcome, the draw won and every team bet lost
+            return LOST if three_way or market_key == "h2h_3_way" else PUSH
+        winner = team_a if score_a > score_b else team_b
+        return WON if selection == winner else LOST
+
+    if market_key == "spreads":
+        if selection not in scores or point is None:
+            return None
+        other = team_b if selection == team_a else team_a
+        return _settle(scores[selection] + point - scores[other])
+
+    if market_key == "totals":
+        if point is None or selection not in ("Over", "Under"):
+            return None
+        margin = score_a + score_b - point
+        return _settle(margin if selection == "Over" else -margin)
+
+    return None
+
+
+def _settle(margin: float) -> str:
+    if margin > 0:
+        return WON
+    if margin < 0:
+        return LOST
+    return PUSH
+
+
+def profit(result: Optional[str], stake: float, decimal_odds: float) -> Optional[float]:
+    """Profit of a graded bet (None when ungraded)"""
+    if result == WON:
+        return stake * (decimal_odds - 1)
+    if result == LOST:
+        return -stake
+    if result == PUSH:
+        return 0.0
+    return None
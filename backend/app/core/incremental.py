@@ -0,0 +1,180 @@
+"""
+Incremental EV scanning.
+
+Between polls most of an Odds API payload is unchanged. `IncrementalScanner`
+remembers, per event, the `last_update` of every bookmaker it has seen and
+rescans only what moved:
+
+- a changed (or new/missing) sharp book invalidates the whole event, since
+  it feeds the consensus fair line every comparison uses;
+- a changed soft book invalidates only that book's entries for the event;
+- events that disappear from the payload drop all their entries.
+
+Dirty entries from every event are batched into a single vectorized scan.
+Each update returns a `ScanDelta` describing which opportunities appeared,
+changed or disappeared, keyed by (event id, market key, point, book,
+selection, description).
+"""
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from app.core.market_index import DEFAULT_SHARP_WEIGHTS, build_market_index
+from app.core.scanner import row_key, scan_index_rows
+from app.models.schemas import BetOpportunity
+
+OppKey = Tuple[str, str, Optional[float], str, str, Optional[str]]
+
+_IGNORED_FIELDS = {"timestamp"}
+
+# Bookmaker field set when per-event prop markets were merged into the entry
+# (see app.services.props); it versions those markets separately from the
+# book's own `last_update`
+PROPS_VERSION_KEY = "props_last_update"
+
+
+@dataclass
+class ScanDelta:
+    """
+    Opportunities that appeared, changed or disappeared in one update.
+    `replaced[i]` is the previous version of `changed[i]`.
+    """
+    added: List[BetOpportunity] = field(default_factory=list)
+    changed: List[BetOpportunity] = field(default_factory=list)
+    replaced: List[BetOpportunity] = field(default_factory=list)
+    removed: List[BetOpportunity] = field(default_factory=list)
+    events_rescanned: int = 0
+    events_unchanged: int = 0
+
+    @property
+    def is_empty(self) -> bool:
+        return not (self.added or self.changed or self.removed)
+
+    def summary(self) -> Dict[str, int]:
+        return {
+            "added": len(self.added),
+            "changed": len(self.changed),
+            "removed": len(self.removed),
+            "events_rescanned": self.events_rescanned,
+            "events_unchanged": self.events_unchanged,
+        }
+
+
+def _book_version(book: Dict[str, Any]) -> Any:
+    """
+    Change marker for a bookmaker entry: its `last_update` timestamp when the
+    feed provides one, otherwise the markets themselves (compared by value),
+    plus the version of any merged prop markets.
+    """
+    version = book.get("last_update") or book.get("markets")
+    props = book.get(PROPS_VERSION_KEY)
+    return version if props is None else (version, props)
+
+
+class IncrementalScanner:
+    """
+    Keeps the previous scan of one feed and recomputes only changed entries.
+    """
+
+    def __init__(
+        self,
+        min_ev_threshold: float = 0.0,
+        sharp_weights: Optional[Dict[str, float]] = None,
+        devig_method: str = "multiplicative",
+    ):
+        self.min_ev_threshold = min_ev_threshold
+        self.sharp_weights = dict(sharp_weights or DEFAULT_SHARP_WEIGHTS)
+        self.devig_method = devig_method
+        self._versions: Dict[str, Dict[str, Any]] = {}
+        self._results: Dict[OppKey, BetOpportunity] = {}
+        self._by_event: Dict[str, Set[OppKey]] = {}
+
+    def __len__(self) -> int:
+        return len(self._results)
+
+    def opportunities(self) -> List[BetOpportunity]:
+        """Current opportunities sorted by EV, highest first"""
+        return sorted(self._results.values(), key=lambda opp: opp.ev_percent, reverse=True)
+
+    def update(self, data: list) -> ScanDelta:
+        """
+        Apply a new payload and rescan what changed since the previous one.
+
+        Args:
+            data: Games as returned by The Odds API
+
+        Returns:
+            The resulting ScanDelta
+        """
+        delta = ScanDelta()
+        dirty_games: List[Dict[str, Any]] = []
+        # event id -> book keys to rescan (None means the whole event)
+        scopes: Dict[str, Optional[Set[str]]] = {}
+        seen: Set[str] = set()
+
+        # 1. Diff bookmaker versions per event
+        for game in data:
+            event_id = game["id"]
+            seen.add(event_id)
+            bookmakers = game.get("bookmakers", [])
+            current = {book["key"]: _book_version(book) for book in bookmakers}
+            previous = self._versions.get(event_id)
+
+            if previous == current:
+                delta.events_unchanged += 1
+                continue
+
+            self._versions[event_id] = current
+            delta.events_rescanned += 1
+            if previous is None or any(previous.get(key) != current.get(key) for key in self.sharp_weights):
+                scopes[event_id] = None
+                dirty_games.append(game)
+            else:
+                changed = {key for key in current.keys() | previous.keys() if current.get(key) != previous.get(key)}
+                scopes[event_id] = changed
+                dirty_games.append({
+                    **game,
+                    "bookmakers": [b for b in bookmakers if b["key"] in self.sharp_weights or b["key"] in changed],
+                })
+
+        # 2. Drop events that left the feed
+        for event_id in set(self._versions) - seen:
+            del self._versions[event_id]
+            for key in self._by_event.pop(event_id, ()):
+                delta.removed.append(self._results.pop(key))
+
+        if not dirty_games:
+            return delta
+
+        # 3. One batched scan over everything that moved
+        index = build_market_index(dirty_games, sharp_keys=self.sharp_weights)
+        fresh: Dict[OppKey, BetOpportunity] = {
+            row_key(index.frame, row): opp
+            for row, opp in scan_index_rows(
+                index, self.min_ev_threshold, devig_method=self.devig_method, sharp_weights=self.sharp_weights,
+            )
+        }
+
+        # 4. Entries in a rescanned scope that did not come back are gone
+        for event_id, scope in scopes.items():
+            keys = self._by_event.get(event_id)
+            if not keys:
+                continue
+            stale = [k for k in keys if k not in fresh and (scope is None or k[3] in scope)]
+            for key in stale:
+                keys.discard(key)
+                delta.removed.append(self._results.pop(key))
+
+        # 5. Merge fresh results, keeping the original object when nothing moved
+        for key, opp in fresh.items():
+            old = self._results.get(key)
+            if old is None:
+                delta.added.append(opp)
+            elif old.model_dump(exclude=_IGNORED_FIELDS) != opp.model_dump(exclude=_IGNORED_FIELDS):
+                delta.changed.append(opp)
+                delta.replaced.append(old)
+            else:
+                continue
+            self._results[key] = opp
+            self._by_event.setdefault(key[0], set()).add(key)
+
+        return delta
@@ -0,0 +1,239 @@
+"""
+Ingest stage for the scanners.
+
+Turns an Odds API payload into a compact columnar `OddsFrame` (one row per
+offered outcome) and a `MarketIndex` over it, keyed per game by
+(market key, point, outcome name, description) -> per-book price.
+
+Keying on the point means alternate spreads/totals only ever meet the sharp
+line at the same number, and every lookup is a hash plus a binary search
+instead of a linear scan over a book's markets.
+"""
+from dataclasses import dataclass
+from typing import Any, Collection, Dict, List, Optional, Tuple
+
+import numpy as np
+
+SHARP_BOOK_KEY = "pinnacle"
+# Sharp book key -> weight in the consensus fair line (see `app.core.fair_price`)
+DEFAULT_SHARP_WEIGHTS: Dict[str, float] = {SHARP_BOOK_KEY: 1.0}
+
+# (market key, point, outcome name, description)
+LineKey = Tuple[str, Optional[float], str, Optional[str]]
+
+
+def ensure_decimal_array(prices: np.ndarray) -> np.ndarray:
+    """
+    Vectorized version of the scanner's price normalization: values that look
+    American (|p| >= 100 or negative) are converted, anything else is assumed
+    to already be decimal.
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    american = (np.abs(prices) >= 100) | (prices < 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        converted = np.where(prices > 0, 1 + (prices / 100), 1 + (100 / np.abs(prices)))
+    return np.where(american, converted, prices)
+
+
+@dataclass
+class OddsFrame:
+    """
+    Columnar view of an Odds API payload. Every array has one entry per
+    outcome row, in payload order (game -> book -> market -> outcome).
+    """
+    game_idx: np.ndarray      # index into `games`
+    market_idx: np.ndarray    # index into `market_keys`
+    book_idx: np.ndarray      # index into `books`
+    line_idx: np.ndarray      # index into `line_keys`
+    pair_idx: np.ndarray      # (description, |point|): outcomes priced against each other within a market
+    price: np.ndarray         # raw price as published (decimal or American)
+    point: np.ndarray         # line (NaN when the outcome has none)
+    slot: np.ndarray          # unique id of the (game, book, market) entry the row belongs to
+    is_sharp: np.ndarray      # row belongs to one of the sharp books of its game
+    is_primary: np.ndarray    # row belongs to the first market of its key within that book
+    games: List[Dict[str, Any]]
+    books: List[Dict[str, Any]]
+    market_keys: List[str]
+    line_keys: List[LineKey]
+    outcomes: List[Dict[str, Any]]  # raw outcome dicts, used only to materialize hits
+
+    @property
+    def size(self) -> int:
+        return len(self.price)
+
+
+def flatten_odds(data: list, sharp_keys: Collection[str] = (SHARP_BOOK_KEY,), require_sharp: bool = True) -> OddsFrame:
+    """
+    Flatten a list of games into an `OddsFrame`.
+
+    Args:
+        data: Games as returned by The Odds API
+        sharp_keys: Bookmaker keys treated as sharp references
+        require_sharp: Drop games none of the sharp books has priced. Any
+            additional bookmakers repeating a sharp key are always dropped
+            (only the first one is the reference).
+    """
+    if isinstance(sharp_keys, str):
+        sharp_keys = (sharp_keys,)
+    sharp_keys = frozenset(sharp_keys)
+    # Per (game, book, market) entry ("slot"); expanded to rows with np.repeat
+    slot_game: List[int] = []
+    slot_market: List[int] = []
+    slot_book: List[int] = []
+    slot_sharp: List[bool] = []
+    slot_primary: List[bool] = []
+    slot_size: List[int] = []
+    # Per outcome row
+    line_idx: List[int] = []
+    pair_idx: List[int] = []
+    prices: List[float] = []
+    points: List[float] = []
+
+    games: List[Dict[str, Any]] = []
+    books: List[Dict[str, Any]] = []
+    book_codes: Dict[str, int] = {}
+    market_codes: Dict[str, int] = {}
+    line_codes: Dict[LineKey, int] = {}
+    pair_codes: Dict[Tuple[Optional[str], Optional[float]], int] = {}
+    raw_outcomes: List[Dict[str, Any]] = []
+    nan = float("nan")
+
+    for game in data:
+        bookmakers = game.get("bookmakers", [])
+        if require_sharp and not any(b["key"] in sharp_keys for b in bookmakers):
+            continue
+        g = len(games)
+        games.append(game)
+
+        seen_sharp = set()
+        for book in bookmakers:
+            is_sharp = book["key"] in sharp_keys
+            if is_sharp:
+                if book["key"] in seen_sharp:
+                    continue
+                seen_sharp.add(book["key"])
+
+            b = book_codes.get(book["key"])
+            if b is None:
+                b = book_codes[book["key"]] = len(books)
+                books.append(book)
+
+            seen_keys = set()
+            for market in book["markets"]:
+                key = market["key"]
+                m = market_codes.get(key)
+                if m is None:
+                    m = market_codes[key] = len(market_codes)
+                outcomes = market["outcomes"]
+                slot_game.append(g)
+                slot_market.append(m)
+                slot_book.append(b)
+                slot_sharp.append(is_sharp)
+                slot_primary.append(key not in seen_keys)
+                slot_size.append(len(outcomes))
+                seen_keys.add(key)
+                raw_outcomes.extend(outcomes)
+
+                for outcome in outcomes:
+                    point = outcome.get("point")
+                    description = outcome.get("description")
+                    line = (key, point, outcome["name"], description)
+                    l = line_codes.get(line)
+                    if l is None:
+                        l = line_codes[line] = len(line_codes)
+                    pair = (description, abs(point) if point is not None else None)
+                    p = pair_codes.get(pair)
+                    if p is None:
+                        p = pair_codes[pair] = len(pair_codes)
+
+                    line_idx.append(l)
+                    pair_idx.append(p)
+                    prices.append(outcome["price"])
+                    points.append(point if point is not None else nan)
+
+    sizes = np.asarray(slot_size, dtype=np.int64)
+
+    def per_row(values, dtype) -> np.ndarray:
+        return np.repeat(np.asarray(values, dtype=dtype), sizes)
+
+    return OddsFrame(
+        game_idx=per_row(slot_game, np.int64),
+        market_idx=per_row(slot_market, np.int64),
+        book_idx=per_row(slot_book, np.int64),
+        line_idx=np.asarray(line_idx, dtype=np.int64),
+        pair_idx=np.asarray(pair_idx, dtype=np.int64),
+        price=np.asarray(prices, dtype=np.float64),
+        point=np.asarray(points, dtype=np.float64),
+        slot=np.repeat(np.arange(len(sizes), dtype=np.int64), sizes),
+        is_sharp=per_row(slot_sharp, bool),
+        is_primary=per_row(slot_primary, bool),
+        games=games,
+        books=books,
+        market_keys=list(market_codes),
+        line_keys=list(line_codes),
+        outcomes=raw_outcomes,
+    )
+
+
+class MarketIndex:
+    """
+    Per-game price index over an `OddsFrame`.
+
+    `key[row]` packs (game, line) into one integer, so the scanners join sharp
+    and soft rows with a single vectorized binary search, and point lookups by
+    (event id, market key, point, outcome, description) are a dict hit plus a
+    `searchsorted`.
+
+    `cache` holds values derived from the index (e.g. consensus fair lines)
+    so every consumer of the same payload shares one computation.
+    """
+
+    def __init__(self, frame: OddsFrame):
+        self.frame = frame
+        self.cache: Dict[Any, Any] = {}
+        self.decimal = ensure_decimal_array(frame.price)
+        self.n_lines = max(len(frame.line_keys), 1)
+        self.key = frame.game_idx * self.n_lines + frame.line_idx
+        self._order = np.argsort(self.key, kind="stable")
+        self._sorted_key = self.key[self._order]
+        self._game_codes = {game["id"]: g for g, game in enumerate(frame.games)}
+        self._line_codes = {line: l for l, line in enumerate(frame.line_keys)}
+
+    @property
+    def size(self) -> int:
+        return self.frame.size
+
+    def rows(
+        self,
+        event_id: str,
+        market_key: str,
+        point: Optional[float],
+        name: str,
+        description: Optional[str] = None,
+    ) -> np.ndarray:
+        """Frame rows (one per book) offering this exact line, in payload order"""
+        g = self._game_codes.get(event_id)
+        l = self._line_codes.get((market_key, point, name, description))
+        if g is None or l is None:
+            return np.zeros(0, dtype=np.int64)
+        k = g * self.n_lines + l
+        lo = np.searchsorted(self._sorted_key, k, side="left")
+        hi = np.searchsorted(self._sorted_key, k, side="right")
+        return self._order[lo:hi]
+
+    def prices(
+        self,
+        event_id: str,
+        market_key: str,
+        point: Optional[float],
+        name: str,
+        description: Optional[str] = None,
+    ) -> Dict[str, float]:
+        """Decimal price per bookmaker key for one line of one game"""
+        rows = self.rows(event_id, market_key, point, name, description)
+        return {self.frame.books[self.frame.book_idx[r]]["key"]: float(self.decimal[r]) for r in rows.tolist()}
+
+
+def build_market_index(data: list, sharp_keys: Collection[str] = (SHARP_BOOK_KEY,), require_sharp: bool = True) -> MarketIndex:
+    """Flatten a payload and index it (see `flatten_odds` for the arguments)"""
+    return MarketIndex(flatten_odds(data, sharp_keys=sharp_keys, require_sharp=require_sharp))
@@ -1,4 +1,6 @@
-from typing import List, Tuple, Optional
+from typing import List, Literal, Optional, Sequence, Tuple
+
+import numpy as np
 
 def to_decimal(odds: int) -> float:
     """
@@ -95,3 +97,168 @@ def kelly_criterion(fair_prob: float, decimal_odds: float, fraction: float = 1.0
         return 0.0
         
     return f_star * fraction
+
+
+# --- N-way devig (scalar and batched) ---
+
+DevigMethod = Literal["multiplicative", "additive", "power", "shin", "odds_ratio"]
+DEVIG_METHODS: Tuple[str, ...] = ("multiplicative", "additive", "power", "shin", "odds_ratio")
+
+_SOLVER_ITERATIONS = 100
+_SOLVER_TOLERANCE = 1e-13
+
+
+def remove_vig(decimal_odds: Sequence[float], method: str = "multiplicative") -> List[float]:
+    """
+    Remove vig from a single market with any number of outcomes.
+    
+    Args:
+        decimal_odds: Decimal odds for every outcome of the market
+        method: One of DEVIG_METHODS
+        
+    Returns:
+        Fair probabilities in the same order (all 0.0 if the market is invalid)
+    """
+    implied = np.array([implied_prob(o) for o in decimal_odds], dtype=np.float64)
+    groups = np.zeros(len(implied), dtype=np.int64)
+    return devig_implied(implied, groups, method).tolist()
+
+
+def devig_implied(
+    implied: np.ndarray,
+    groups: np.ndarray,
+    method: str = "multiplicative",
+    n_groups: Optional[int] = None,
+) -> np.ndarray:
+    """
+    Remove vig from many markets at once.
+    
+    Markets are ragged: `implied` is a flat array of implied probabilities and
+    `groups[i]` is the market (0..n_groups-1) entry i belongs to. Iterative
+    methods solve their per-market parameter with a bracketed solver that runs
+    over every market simultaneously, so the cost grows with the number of
+    iterations, not the number of markets.
+    
+    Methods:
+        multiplicative: p = pi / S
+        additive:       p = pi - (S - 1) / n  (clipped at 0, renormalized)
+        power:          p = pi ** k,  with k such that sum(p) = 1
+        shin:           Shin (1993) insider-trading model, solved for z
+        odds_ratio:     p / (1 - p) = (pi / (1 - pi)) / c,  with c such that sum(p) = 1
+    
+    Args:
+        implied: Implied probabilities (1 / decimal odds)
+        groups: Market index for each entry
+        method: One of DEVIG_METHODS
+        n_groups: Number of markets (defaults to groups.max() + 1)
+        
+    Returns:
+        Fair probabilities aligned with `implied`. Markets with fewer than two
+        outcomes or an implied probability outside (0, 1) get 0.0.
+    """
+    if method not in DEVIG_METHODS:
+        raise ValueError(f"Unknown devig method '{method}'. Expected one of {', '.join(DEVIG_METHODS)}")
+    
+    ip = np.asarray(implied, dtype=np.float64)
+    g = np.asarray(groups, dtype=np.int64)
+    if ip.size == 0:
+        return np.zeros(0, dtype=np.float64)
+    if n_groups is None:
+        n_groups = int(g.max()) + 1
+    
+    def group_sum(values: np.ndarray) -> np.ndarray:
+        return np.bincount(g, weights=values, minlength=n_groups)
+    
+    size = np.bincount(g, minlength=n_groups)
+    bad = np.bincount(g, weights=((ip <= 0) | (ip >= 1)).astype(np.float64), minlength=n_groups)
+    valid = (size >= 2) & (bad == 0)
+    # Keep the solvers finite on invalid rows; their output is zeroed below
+    ip = np.where(valid[g], ip, 0.5)
+    total = group_sum(ip)
+    
+    if method == "multiplicative":
+        fair = ip / total[g]
+    
+    elif method == "additive":
+        fair = np.maximum(ip - (total[g] - 1) / size[g], 0.0)
+        fair = fair / group_sum(fair)[g]
+    
+    elif method == "power":
+        log_ip = np.log(ip)
+        k = _solve_decreasing(
+            lambda k: group_sum(np.exp(k[g] * log_ip)) - 1,
+            lo=np.zeros(n_groups), hi=np.ones(n_groups),
+        )
+        fair = np.exp(k[g] * log_ip)
+    
+    elif method == "shin":
+        # Shin's z is only defined for an overround (S > 1); other markets fall back to multiplicative
+        ratio = ip * ip / total[g]
+        
+        def shin_probs(z: np.ndarray) -> np.ndarray:
+            zg = z[g]
+            return (np.sqrt(zg * zg + 4 * (1 - zg) * ratio) - zg) / (2 * (1 - zg))
+        
+        z = _solve_decreasing(
+            lambda z: group_sum(shin_probs(z)) - 1,
+            lo=np.zeros(n_groups), hi=np.full(n_groups, 1 - 1e-9), expand=False,
+        )
+        fair = np.where(total[g] > 1, shin_probs(z), ip / total[g])
+    
+    else:  # odds_ratio
+        def or_probs(c: np.ndarray) -> np.ndarray:
+            return ip / (c[g] * (1 - ip) + ip)
+        
+        c = _solve_decreasing(
+            lambda c: group_sum(or_probs(c)) - 1,
+            lo=np.zeros(n_groups), hi=np.ones(n_groups),
+        )
+        fair = or_probs(c)
+    
+    return np.where(valid[g], fair, 0.0)
+
+
+def _solve_decreasing(residual, lo: np.ndarray, hi: np.ndarray, expand: bool = True) -> np.ndarray:
+    """
+    Vectorized root finder for per-market decreasing functions.
+    
+    Uses the Illinois variant of regula falsi: it keeps a sign-changing
+    bracket like bisection (so it cannot diverge) but converges
+    superlinearly, typically in under ten passes over the slate.
+    
+    Args:
+        residual: Maps a per-market parameter array to per-market residuals
+        lo: Lower bracket (residual assumed >= 0)
+        hi: Initial upper bracket; doubled until the residual is <= 0 when `expand`
+        expand: Whether to grow `hi` to bracket the root
+        
+    Returns:
+        Per-market parameter at which the residual crosses zero
+    """
+    f_lo = residual(lo)
+    f_hi = residual(hi)
+    if expand:
+        for _ in range(64):
+            above = f_hi > 0
+            if not above.any():
+                break
+            lo, f_lo = np.where(above, hi, lo), np.where(above, f_hi, f_lo)
+            hi = np.where(above, hi * 2, hi)
+            f_hi = residual(hi)
+    
+    x = 0.5 * (lo + hi)
+    last_positive = np.zeros(lo.shape, dtype=np.int8)  # +1 / -1: which end moved last
+    for _ in range(_SOLVER_ITERATIONS):
+        span = f_lo - f_hi
+        x = np.where(span > 0, lo + f_lo * (hi - lo) / np.where(span > 0, span, 1.0), 0.5 * (lo + hi))
+        f_x = residual(x)
+        if np.all(np.abs(f_x) < _SOLVER_TOLERANCE):
+            break
+        positive = f_x > 0
+        # Illinois step: when the same end is retained twice, halve its residual
+        f_hi = np.where(positive & (last_positive == 1), 0.5 * f_hi, f_hi)
+        f_lo = np.where(~positive & (last_positive == -1), 0.5 * f_lo, f_lo)
+        lo, f_lo = np.where(positive, x, lo), np.where(positive, f_x, f_lo)
+        hi, f_hi = np.where(positive, hi, x), np.where(positive, f_hi, f_x)
+        last_positive = np.where(positive, 1, -1).astype(np.int8)
+    return x
@@ -0,0 +1,209 @@
+"""
+Parlay optimizer.
+
+A parlay of independent legs wins with probability prod(p_i) and pays
+prod(d_i), so its EV is prod(p_i * d_i) - 1. In log space both the objective
+(sum of log(p_i * d_i), the "edge") and the odds (sum of log(d_i)) are
+additive, which makes the search a knapsack-like DP over games:
+
+- games are visited one at a time and each state either skips the game or
+  adds one of its legs (so there is never more than one leg per game);
+- small pools (at most `exact_states` partial parlays in total) are searched
+  exhaustively, so the result is the true best;
+- larger ones are bucketed by (number of legs, log-odds bucket) and each
+  bucket keeps its Pareto frontier on (edge, log-odds): a state survives
+  unless another has at least its edge and odds at least as useful (higher
+  below the target, lower once past it, where they only eat into
+  `max_odds`), with a global beam width as a hard cap;
+- the search stops early when it exceeds its time budget, returning the best
+  parlays found over the games visited so far (best games first).
+"""
+import math
+import time
+from dataclasses import dataclass
+from typing import Dict, Hashable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.models.schemas import BetOpportunity
+
+
+@dataclass(frozen=True)
+class Parlay:
+    legs: Tuple[BetOpportunity, ...]
+    odds_decimal: float
+    win_probability: float
+
+    @property
+    def ev(self) -> float:
+        """Expected profit per unit staked"""
+        return self.win_probability * self.odds_decimal - 1
+
+
+def game_key(opp: BetOpportunity) -> Hashable:
+    """Legs sharing this key are correlated and never combined"""
+    return (opp.sport, opp.match_name)
+
+
+def optimize_parlays(
+    candidates: Sequence[BetOpportunity],
+    min_odds: float = 20.0,
+    max_odds: Optional[float] = None,
+    max_legs: int = 6,
+    top_k: int = 1,
+    beam_width: int = 2048,
+    bucket_width: float = 0.1,
+    time_budget: float = 0.25,
+    exact_states: int = 50_000,
+) -> List[Parlay]:
+    """
+    Find the parlays with the highest true EV that reach the target odds.
+
+    Args:
+        candidates: Legs to choose from (uses `target_odds_decimal` and `fair_prob`)
+        min_odds: Minimum combined decimal odds
+        max_odds: Maximum combined decimal odds (unbounded when None)
+        max_legs: Maximum number of legs
+        top_k: Number of parlays to return
+        beam_width: Maximum number of partial parlays kept between games
+        bucket_width: Width of a log-odds bucket; smaller keeps more variety
+        time_budget: Seconds after which no further games are considered
+        exact_states: Search without pruning when the pool has at most this
+            many partial parlays
+
+    Returns:
+        Up to `top_k` parlays with at least two legs, highest EV first
+    """
+    deadline = time.perf_counter() + time_budget
+    log_min = math.log(min_odds)
+    log_max = math.log(max_odds) if max_odds else math.inf
+
+    legs = [
+        opp for opp in candidates
+        if opp.target_odds_decimal > 1 and 0 < opp.fair_prob < 1
+        and math.log(opp.target_odds_decimal) <= log_max
+    ]
+    if not legs or max_legs < 2 or top_k < 1:
+        return []
+    odds = np.array([opp.target_odds_decimal for opp in legs], dtype=np.float64)
+    prob = np.array([opp.fair_prob for opp in legs], dtype=np.float64)
+    leg_log_odds = np.log(odds)
+    leg_edge = np.log(prob) + leg_log_odds
+
+    # Games in order of their best leg, so a truncated search saw the best ones
+    by_game: Dict[Hashable, List[int]] = {}
+    for i, opp in enumerate(legs):
+        by_game.setdefault(game_key(opp), []).append(i)
+    games = sorted(by_game.values(), key=lambda idx: -leg_edge[idx].max())
+
+    # Buckets above the target are merged into the last one
+    n_buckets = max(int(math.ceil(log_min / bucket_width)) + 1, 1)
+    per_cell = max(top_k, 2)
+
+    # Partial parlays by number of legs, over every game: small enough, no pruning
+    counts = [1] + [0] * max_legs
+    for game in games:
+        for j in range(max_legs, 0, -1):
+            counts[j] += counts[j - 1] * len(game)
+    exact = sum(counts) <= exact_states
+
+    # Partial parlays; `node` points into the (parent, leg) tables for the path
+    edge = np.zeros(1)
+    log_odds = np.zeros(1)
+    n_legs = np.zeros(1, dtype=np.int64)
+    node = np.full(1, -1, dtype=np.int64)
+    node_parent: List[int] = []
+    node_leg: List[int] = []
+
+    for game in games:
+        if time.perf_counter() > deadline:
+            break
+        idx = np.asarray(game, dtype=np.int64)
+        open_states = np.flatnonzero(n_legs < max_legs)
+        if open_states.size == 0:
+            break
+
+        # Expand every open state with every leg of this game
+        parent = np.repeat(open_states, idx.size)
+        leg = np.tile(idx, open_states.size)
+        child_edge = edge[parent] + leg_edge[leg]
+        child_log_odds = log_odds[parent] + leg_log_odds[leg]
+        fits = child_log_odds <= log_max + 1e-12
+        parent, leg, child_edge, child_log_odds = parent[fits], leg[fits], child_edge[fits], child_log_odds[fits]
+
+        all_edge = np.concatenate([edge, child_edge])
+        all_log_odds = np.concatenate([log_odds, child_log_odds])
+        all_n = np.concatenate([n_legs, n_legs[parent] + 1])
+        is_child = np.arange(all_edge.size) >= edge.size
+
+        if exact:
+            keep = np.arange(all_edge.size)
+        else:
+            keep = _prune(all_edge, all_log_odds, all_n, n_buckets, bucket_width, log_min, per_cell, beam_width)
+
+        # Register survivors that are new children in the path tables
+        new_node = np.concatenate([node, np.full(child_edge.size, -1, dtype=np.int64)])
+        kept_children = keep[is_child[keep]]
+        child_pos = kept_children - edge.size
+        new_node[kept_children] = np.arange(len(node_parent), len(node_parent) + kept_children.size)
+        node_parent.extend(node[parent[child_pos]].tolist())
+        node_leg.extend(leg[child_pos].tolist())
+
+        edge, log_odds, n_legs, node = all_edge[keep], all_log_odds[keep], all_n[keep], new_node[keep]
+
+    done = np.flatnonzero((log_odds >= log_min - 1e-12) & (n_legs >= 2))
+    best = done[np.argsort(-edge[done], kind="stable")][:top_k]
+
+    parlays = []
+    for state in best.tolist():
+        path = []
+        current = int(node[state])
+        while current >= 0:
+            path.append(node_leg[current])
+            current = node_parent[current]
+        path.reverse()
+        parlays.append(Parlay(
+            legs=tuple(legs[i] for i in path),
+            odds_decimal=float(np.prod(odds[path])),
+            win_probability=float(np.prod(prob[path])),
+        ))
+    return parlays
+
+
+def _prune(
+    edge: np.ndarray,
+    log_odds: np.ndarray,
+    n_legs: np.ndarray,
+    n_buckets: int,
+    bucket_width: float,
+    log_min: float,
+    per_cell: int,
+    beam_width: int,
+) -> np.ndarray:
+    """
+    States to keep: per (legs, log-odds bucket) cell, its Pareto frontier on
+    (edge, log-odds) plus its `per_cell` best by edge; then at most
+    `beam_width`, taking each cell's best before any cell's runner-up.
+    """
+    bucket = np.minimum((log_odds / bucket_width).astype(np.int64), n_buckets - 1)
+    cell = n_legs * n_buckets + bucket
+    # Useful odds: higher below the target; past it, lower leaves more room under max_odds
+    useful = np.where(log_odds >= log_min - 1e-12, -log_odds, log_odds)
+    order = np.lexsort((-useful, -edge, cell))
+    sorted_cell = cell[order]
+    starts = np.flatnonzero(np.r_[True, sorted_cell[1:] != sorted_cell[:-1]])
+    segment = np.repeat(np.arange(starts.size), np.diff(np.r_[starts, order.size]))
+    rank = np.arange(order.size) - starts[segment]
+
+    # Best edge first within a cell: on the frontier when its odds beat every
+    # state before it. Dense ranks keep the per-cell running max exact.
+    _, useful_rank = np.unique(useful[order], return_inverse=True)
+    key = segment * (int(useful_rank.max()) + 1) + useful_rank
+    running = np.maximum.accumulate(key)
+    frontier = np.r_[True, key[1:] > running[:-1]]
+
+    selected = frontier | (rank < per_cell)
+    keep, keep_rank = order[selected], rank[selected]
+    if keep.size > beam_width:
+        keep = keep[np.lexsort((-edge[keep], keep_rank))[:beam_width]]
+    return keep
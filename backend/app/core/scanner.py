@@ -0,0 +1,229 @@
+"""
+Columnar scan engine.
+
+Consumes the `MarketIndex` built by `app.core.market_index` (one row per
+offered outcome, keyed per game by market, point, outcome and description)
+and the consensus fair lines from `app.core.fair_price`, and computes EV and
+Kelly for the whole slate in batched array operations. Sharp markets may have
+any number of outcomes and can be devigged with any method from
+`math_logic.DEVIG_METHODS`. Only rows that clear the EV threshold are
+materialized as `BetOpportunity` objects.
+
+`process_odds_data` in `app.main` is kept as the scalar reference path; with
+Pinnacle as the only sharp book, on two-way markets where every book posts the
+sharp line's point, the multiplicative method produces identical
+opportunities (timestamps aside), except that prop selections here name the
+player and line (`selection_name`) where the reference keeps the outcome name.
+"""
+import hashlib
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.fair_price import get_fair_lines
+from app.core.market_index import (
+    DEFAULT_SHARP_WEIGHTS,
+    MarketIndex,
+    OddsFrame,
+    build_market_index,
+)
+from app.models.schemas import BetOpportunity
+
+
+def market_key_to_name(key: str, outcome: dict) -> str:
+    """Map an Odds API market key to the display name used in the feed."""
+    if key == "h2h": return "Moneyline"
+    if key == "spreads": return f"Spread {outcome.get('point', '')}"
+    if key == "totals": return f"Total {outcome.get('point', '')}"
+    if key.startswith(("player_", "batter_", "pitcher_")): return "Player Prop"
+    return key
+
+
+def selection_name(outcome: dict) -> str:
+    """Outcome as shown in the feed; props name the player and the line ("LeBron James Over 25.5")."""
+    description = outcome.get("description")
+    if not description:
+        return outcome["name"]
+    point = outcome.get("point")
+    return f"{description} {outcome['name']}" if point is None else f"{description} {outcome['name']} {point:g}"
+
+
+def row_key(frame: OddsFrame, row: int) -> Tuple[str, str, Optional[float], str, str, Optional[str]]:
+    """
+    Stable identity of an offered outcome across payloads:
+    (event id, market key, point, book key, selection, description).
+    """
+    outcome = frame.outcomes[row]
+    return (
+        frame.games[frame.game_idx[row]]["id"],
+        frame.market_keys[frame.market_idx[row]],
+        outcome.get("point"),
+        frame.books[frame.book_idx[row]]["key"],
+        outcome["name"],
+        outcome.get("description"),
+    )
+
+
+def opportunity_id(key: tuple) -> str:
+    """Short stable id for a `row_key`, used by clients to track an opportunity across refreshes"""
+    return hashlib.blake2b("|".join(map(str, key)).encode(), digest_size=8).hexdigest()
+
+
+def scan_index(
+    index: MarketIndex,
+    min_ev_threshold: float = 0.0,
+    bankroll: float = 1000.0,
+    kelly_multiplier: float = 0.25,
+    devig_method: str = "multiplicative",
+    sharp_weights: Optional[Dict[str, float]] = None,
+) -> list[BetOpportunity]:
+    """
+    Run the EV scan over an indexed payload.
+
+    Args:
+        index: Output of `build_market_index`
+        min_ev_threshold: Only rows with EV strictly above this (in %) are returned
+        bankroll: Bankroll used for the suggested stake
+        kelly_multiplier: Fraction of full Kelly to recommend
+        devig_method: Any of `math_logic.DEVIG_METHODS`
+        sharp_weights: Sharp book key -> consensus weight (Pinnacle only by default)
+
+    Returns:
+        Opportunities sorted by EV, highest first
+    """
+    return [
+        opp for _, opp in
+        scan_index_rows(index, min_ev_threshold, bankroll, kelly_multiplier, devig_method, sharp_weights)
+    ]
+
+
+def scan_index_rows(
+    index: MarketIndex,
+    min_ev_threshold: float = 0.0,
+    bankroll: float = 1000.0,
+    kelly_multiplier: float = 0.25,
+    devig_method: str = "multiplicative",
+    sharp_weights: Optional[Dict[str, float]] = None,
+) -> List[Tuple[int, BetOpportunity]]:
+    """
+    Same as `scan_index`, but pairs each opportunity with the frame row it was
+    built from so callers can key results (see `row_key`).
+    """
+    frame = index.frame
+    if frame.size == 0:
+        return []
+
+    # 1. Consensus fair line of every sharp-priced line (memoized on the index)
+    fair_lines = get_fair_lines(index, sharp_weights or DEFAULT_SHARP_WEIGHTS, devig_method)
+    if fair_lines.size == 0:
+        return []
+
+    # 2. Join every soft-book row to the fair line at the same key
+    dec = index.decimal
+    soft_rows = np.flatnonzero(~frame.is_sharp & frame.is_primary)
+    match, found = fair_lines.find(index.key[soft_rows])
+    offer_rows, match = soft_rows[found], match[found]
+    if offer_rows.size == 0:
+        return []
+    p = fair_lines.prob[match]
+    offered = dec[offer_rows]
+
+    # 3. EV and Kelly for the whole slate
+    ev = np.where((p > 0) & (offered > 0), (p * offered - 1) * 100, 0.0)
+    hit = np.flatnonzero(ev > min_ev_threshold)
+    if hit.size == 0:
+        return []
+
+    offer_rows, match, p, offered, ev = offer_rows[hit], match[hit], p[hit], offered[hit], ev[hit]
+    b = offered - 1
+    with np.errstate(divide="ignore", invalid="ignore"):
+        f_star = np.where(offered > 1, ((b * p) - (1 - p)) / b, 0.0)
+    kelly = np.maximum(f_star, 0.0) * kelly_multiplier
+
+    # 4. Materialize hits only, in the same order the reference scan produces
+    ev_rounded = [round(x, 2) for x in ev.tolist()]
+    hit_group = fair_lines.primary_group[match]
+    ordering = np.lexsort((offer_rows, hit_group, -np.asarray(ev_rounded)))
+
+    titles = {book["key"]: book["title"] for book in frame.books}
+    timestamp = datetime.now().isoformat()
+    # Display fields shared by every hit on the same fair line / set of sharp books
+    sharp_names: Dict[int, str] = {}
+    sharp_odds: Dict[int, List[float]] = {}
+    # Plain lists: indexing numpy scalars one at a time is the slow part of this loop
+    rows_list = offer_rows.tolist()
+    game_list = frame.game_idx[offer_rows].tolist()
+    book_list = frame.book_idx[offer_rows].tolist()
+    market_list = frame.market_idx[offer_rows].tolist()
+    line_list = match.tolist()
+    mask_list = fair_lines.books_mask[match].tolist()
+    group_list = hit_group.tolist()
+    offered_list, p_list, kelly_list = offered.tolist(), p.tolist(), kelly.tolist()
+
+    opportunities = []
+    for i in ordering.tolist():
+        row = rows_list[i]
+        game = frame.games[game_list[i]]
+        book = frame.books[book_list[i]]
+        market_key = frame.market_keys[market_list[i]]
+        outcome = frame.outcomes[row]
+        price = outcome["price"]
+        fraction = kelly_list[i]
+
+        mask = mask_list[i]
+        sharp_book = sharp_names.get(mask)
+        if sharp_book is None:
+            sharp_book = sharp_names[mask] = " / ".join(titles[key] for key in fair_lines.sources(line_list[i]))
+        group = group_list[i]
+        sharp_prices = sharp_odds.get(group)
+        if sharp_prices is None:
+            sharp_prices = sharp_odds[group] = [round(x, 3) for x in dec[fair_lines.group_slice(line_list[i])].tolist()]
+
+        # Every field is computed here with the right type, so skip validation
+        opportunities.append((row, BetOpportunity.model_construct(
+            id=opportunity_id((
+                game["id"], market_key, outcome.get("point"), book["key"], outcome["name"], outcome.get("description"),
+            )),
+            match_name=f"{game['home_team']} vs {game['away_team']}",
+            sport=game["sport_key"],
+            market=market_key_to_name(market_key, outcome),
+            selection=selection_name(outcome),
+            target_book=book["title"],
+            target_odds_american=int(price) if abs(price) >= 100 else 0,
+            target_odds_decimal=round(offered_list[i], 3),
+            sharp_book=sharp_book,
+            sharp_odds_decimal=list(sharp_prices),
+            fair_prob=round(p_list[i], 4),
+            ev_percent=ev_rounded[i],
+            kelly_fraction=round(fraction, 4),
+            kelly_stake_suggested=round(bankroll * fraction, 2),
+            timestamp=timestamp,
+        )))
+
+    return opportunities
+
+
+def scan_odds_data(
+    data: list,
+    min_ev_threshold: float = 0.0,
+    devig_method: str = "multiplicative",
+    sharp_weights: Optional[Dict[str, float]] = None,
+) -> list[BetOpportunity]:
+    """
+    Vectorized replacement for `process_odds_data`. Unlike the reference it
+    prices markets with more than two outcomes (e.g. 3-way soccer h2h) and
+    only compares a book's line against the sharp line at the same point.
+
+    Args:
+        data: Games as returned by The Odds API
+        min_ev_threshold: Minimum EV percentage (exclusive)
+        devig_method: Any of `math_logic.DEVIG_METHODS`
+        sharp_weights: Sharp book key -> consensus weight (Pinnacle only by default)
+
+    Returns:
+        Opportunities sorted by EV, highest first
+    """
+    sharp_weights = sharp_weights or DEFAULT_SHARP_WEIGHTS
+    index = build_market_index(data, sharp_keys=sharp_weights)
+    return scan_index(index, min_ev_threshold, devig_method=devig_method, sharp_weights=sharp_weights)
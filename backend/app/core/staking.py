@@ -0,0 +1,288 @@
+"""
+Simultaneous Kelly staking.
+
+Sizing every bet with its own Kelly fraction ignores that the bets share one
+bankroll: ten of them can add up to more than it, and two books' prices on
+the same outcome (or on both sides of a line) are not independent bets.
+This allocator maximizes the expected log growth of the whole bankroll
+instead:
+
+- bets on one line of one game (see `line_key`) are outcomes of one
+  event: at most one selection wins, bets on the same selection at
+  different books win together. Different lines are treated as independent,
+  and the per-game cap bounds what that misses (a spread and a total of one
+  game are correlated);
+- open bets (placed, not settled) are fixed positions in the same outcome
+  model, so they count against the caps and their risk is part of the
+  objective;
+- E[log W] is estimated over a fixed set of sampled outcomes (stratified,
+  and seeded so the same inputs give the same stakes) and maximized by projected gradient
+  ascent. Everything is matrix work: one (scenarios x bets) return matrix,
+  one matvec for the wealth and one for the gradient per step.
+
+Fractional Kelly scales the growth-optimal stakes; the caps apply to the
+scaled stakes.
+"""
+import math
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Hashable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.models.schemas import BetOpportunity
+
+# Wealth may not get closer to ruin than this in any sampled outcome
+_MIN_WEALTH = 1e-6
+
+
+@dataclass(frozen=True)
+class OpenBet:
+    """An unsettled bet already placed (a pending SavedBet)"""
+    sport: str
+    match_name: str
+    market: Optional[str]
+    selection: str
+    book: str
+    stake: float
+    odds_decimal: float
+    fair_prob: float
+
+
+@dataclass
+class StakePlan:
+    """Stakes for a set of candidate bets"""
+    stakes: np.ndarray  # Per candidate, in bankroll currency
+    fractions: np.ndarray  # Per candidate, share of the bankroll
+    expected_log_growth: float  # E[log(W1 / W0)] with the open bets and these stakes
+    bankroll: float
+    open_stake: float
+    iterations: int
+    scenarios: int
+    seconds: float
+    game_exposure: Dict[Hashable, float] = field(default_factory=dict)
+    book_exposure: Dict[str, float] = field(default_factory=dict)
+
+    @property
+    def total_stake(self) -> float:
+        return float(self.stakes.sum())
+
+
+def game_key(sport: str, match_name: str) -> Hashable:
+    return (sport, match_name)
+
+
+def line_key(sport: str, match_name: str, market: Optional[str], selection: str) -> Hashable:
+    """
+    Bets with the same line key are outcomes of one event. Props name the
+    player and line in the selection ("LeBron James Over 25.5"), so the
+    player and line are part of the key and only Over / Under share it.
+    Spread names carry each side's own point ("Spread -3.5" / "Spread +3.5"),
+    so spreads are keyed by the home side's point: home -3.5 and away +3.5
+    are one event.
+    """
+    if market and market.startswith("Spread "):
+        home = match_name.split(" vs ", 1)[0]
+        try:
+            point = float(market[len("Spread "):])
+        except ValueError:
+            return (sport, match_name, market)
+        return (sport, match_name, "spreads", point if selection == home else -point)
+    for side in (" Over ", " Under "):
+        subject, found, point = selection.rpartition(side)
+        if found:
+            return (sport, match_name, market, subject, point)
+    return (sport, match_name, market)
+
+
+def _outcome_model(
+    lines: Sequence[Tuple[Hashable, str, float]],
+) -> Tuple[List[Hashable], np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Group bets into events.
+
+    Args:
+        lines: Per bet (line key, selection, fair probability)
+
+    Returns:
+        (line keys, per-bet line index, per-bet selection index,
+        cumulative selection probabilities per line padded with 1.0)
+    """
+    line_ids: Dict[Hashable, int] = {}
+    selections: List[Dict[str, int]] = []
+    probs: List[List[List[float]]] = []
+    bet_line = np.empty(len(lines), dtype=np.int64)
+    bet_selection = np.empty(len(lines), dtype=np.int64)
+    for i, (line, selection, prob) in enumerate(lines):
+        g = line_ids.get(line)
+        if g is None:
+            g = line_ids[line] = len(selections)
+            selections.append({})
+            probs.append([])
+        k = selections[g].get(selection)
+        if k is None:
+            k = selections[g][selection] = len(probs[g])
+            probs[g].append([])
+        probs[g][k].append(prob)
+        bet_line[i], bet_selection[i] = g, k
+
+    width = max((len(p) for p in probs), default=1)
+    cumulative = np.ones((len(probs), width), dtype=np.float64)
+    for g, by_selection in enumerate(probs):
+        # Books' fair lines differ slightly; one probability per selection
+        p = np.array([sum(values) / len(values) for values in by_selection])
+        p = np.clip(p, 0.0, 1.0)
+        if p.sum() > 1.0:
+            p = p / p.sum()
+        cumulative[g, :len(p)] = np.cumsum(p)
+    return list(line_ids), bet_line, bet_selection, cumulative
+
+
+def _returns(
+    rng: np.random.Generator,
+    scenarios: int,
+    cumulative: np.ndarray,
+    bet_line: np.ndarray,
+    bet_selection: np.ndarray,
+    odds: np.ndarray,
+) -> np.ndarray:
+    """(scenarios x bets) net return per unit staked: odds - 1 when the bet wins, else -1"""
+    # Stratified per line (a shuffled draw from each of `scenarios` equal strata),
+    # so every selection wins in its exact share of the scenarios
+    strata = np.argsort(rng.random((scenarios, cumulative.shape[0])), axis=0)
+    draws = (strata + rng.random(strata.shape)) / scenarios
+    # Winning selection per line and scenario; == number of selections when none of ours wins
+    winners = (draws[:, :, None] >= cumulative[None, :, :]).sum(axis=2)
+    wins = winners[:, bet_line] == bet_selection[None, :]
+    return np.where(wins, odds[None, :] - 1.0, -1.0)
+
+
+def _project(f: np.ndarray, caps: Sequence[Tuple[np.ndarray, np.ndarray]], total_cap: float) -> np.ndarray:
+    """
+    Make `f` feasible: non-negative, each group within its cap, the total
+    within `total_cap`. Over-cap groups are scaled down, which never breaks
+    another cap.
+    """
+    f = np.maximum(f, 0.0)
+    for group_of, limit in caps:
+        used = np.bincount(group_of, weights=f, minlength=len(limit))
+        scale = np.where(used > limit, limit / np.maximum(used, 1e-18), 1.0)
+        f = f * scale[group_of]
+    total = f.sum()
+    if total > total_cap:
+        f = f * (total_cap / total)
+    return f
+
+
+def optimize_stakes(
+    candidates: Sequence[BetOpportunity],
+    open_bets: Sequence[OpenBet] = (),
+    bankroll: float = 1000.0,
+    kelly_fraction: float = 0.25,
+    max_game_exposure: float = 0.1,
+    max_book_exposure: float = 0.25,
+    max_total_exposure: float = 0.5,
+    scenarios: int = 4000,
+    max_iterations: int = 300,
+    tolerance: float = 1e-10,
+    seed: int = 0,
+) -> StakePlan:
+    """
+    Stakes maximizing the bankroll's expected log growth, subject to caps.
+
+    Args:
+        candidates: Opportunities to size (uses odds, fair prob, game, market, selection, book)
+        open_bets: Unsettled bets already placed
+        bankroll: Current bankroll, open stakes included
+        kelly_fraction: Multiplier on the growth-optimal stakes (0.25 = quarter Kelly)
+        max_game_exposure: Most of the bankroll staked on one game, open bets included
+        max_book_exposure: Most of the bankroll staked at one book, open bets included
+        max_total_exposure: Most of the bankroll staked in total, open bets included
+        scenarios: Sampled outcomes the expectation is taken over
+        max_iterations: Gradient steps at most
+        tolerance: Stop once a step improves E[log W] by less than this
+        seed: Seed of the sampled outcomes
+
+    Returns:
+        StakePlan with one stake per candidate (0 for bets not worth taking)
+    """
+    start = time.perf_counter()
+    n = len(candidates)
+    odds = np.array([opp.target_odds_decimal for opp in candidates] + [bet.odds_decimal for bet in open_bets], dtype=np.float64)
+    open_stakes = np.array([bet.stake for bet in open_bets], dtype=np.float64) / bankroll
+    games = [game_key(opp.sport, opp.match_name) for opp in candidates] + [game_key(bet.sport, bet.match_name) for bet in open_bets]
+    books = [opp.target_book for opp in candidates] + [bet.book for bet in open_bets]
+    lines = [(line_key(opp.sport, opp.match_name, opp.market, opp.selection), opp.selection, opp.fair_prob) for opp in candidates]
+    lines += [(line_key(bet.sport, bet.match_name, bet.market, bet.selection), bet.selection, bet.fair_prob) for bet in open_bets]
+
+    _, bet_line, bet_selection, cumulative = _outcome_model(lines)
+    rng = np.random.default_rng(seed)
+    returns = _returns(rng, scenarios, cumulative, bet_line, bet_selection, odds)
+    new_returns, open_wealth = returns[:, :n], 1.0 + returns[:, n:] @ open_stakes
+
+    # Caps on the full-Kelly solution, so they hold after scaling by kelly_fraction
+    scale = 1.0 / kelly_fraction if kelly_fraction > 0 else 0.0
+    game_ids: Dict[Hashable, int] = {}
+    game_of = np.array([game_ids.setdefault(key, len(game_ids)) for key in games], dtype=np.int64)
+    book_ids: Dict[str, int] = {}
+    book_of = np.array([book_ids.setdefault(key, len(book_ids)) for key in books], dtype=np.int64)
+    open_by_game = np.bincount(game_of[n:], weights=open_stakes, minlength=len(game_ids))
+    open_by_book = np.bincount(book_of[n:], weights=open_stakes, minlength=len(book_ids))
+    caps = [
+        (game_of[:n], np.maximum(max_game_exposure - open_by_game, 0.0) * scale),
+        (book_of[:n], np.maximum(max_book_exposure - open_by_book, 0.0) * scale),
+    ]
+    total_cap = max(max_total_exposure - open_stakes.sum(), 0.0) * scale
+
+    def objective(f: np.ndarray) -> Tuple[float, np.ndarray]:
+        wealth = open_wealth + new_returns @ f
+        if wealth.min() <= _MIN_WEALTH:
+            return -math.inf, wealth
+        return float(np.log(wealth).mean()), wealth
+
+    # Start from independent Kelly fractions, made feasible
+    p = np.array([opp.fair_prob for opp in candidates], dtype=np.float64)
+    b = odds[:n] - 1.0
+    f = _project(np.where(b > 0, (b * p - (1 - p)) / np.where(b > 0, b, 1.0), 0.0) * 0.5, caps, total_cap)
+    value, wealth = objective(f)
+    if not math.isfinite(value):
+        f = np.zeros(n)
+        value, wealth = objective(f)
+
+    step, iterations = 1.0, 0
+    while n and iterations < max_iterations and math.isfinite(value):
+        iterations += 1
+        gradient = new_returns.T @ (1.0 / wealth) / scenarios
+        while step > 1e-12:
+            trial = _project(f + step * gradient, caps, total_cap)
+            trial_value, trial_wealth = objective(trial)
+            if trial_value >= value:
+                break
+            step *= 0.5
+        else:
+            break
+        improvement = trial_value - value
+        f, value, wealth = trial, trial_value, trial_wealth
+        step *= 1.5
+        if improvement < tolerance:
+            break
+
+    fractions = f * kelly_fraction
+    stakes = fractions * bankroll
+    growth, _ = objective(fractions)
+    game_keys = list(game_ids)
+    book_keys = list(book_ids)
+    exposure_by_game = np.bincount(game_of[:n], weights=fractions, minlength=len(game_keys)) + open_by_game
+    exposure_by_book = np.bincount(book_of[:n], weights=fractions, minlength=len(book_keys)) + open_by_book
+    return StakePlan(
+        stakes=stakes,
+        fractions=fractions,
+        expected_log_growth=growth,
+        bankroll=bankroll,
+        open_stake=float(open_stakes.sum() * bankroll),
+        iterations=iterations,
+        scenarios=scenarios,
+        seconds=time.perf_counter() - start,
+        game_exposure={key: float(v * bankroll) for key, v in zip(game_keys, exposure_by_game) if v > 0},
+        book_exposure={key: float(v * bankroll) for key, v in zip(book_keys, exposure_by_book) if v > 0},
+    )
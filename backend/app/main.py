@@ -1,20 +1,84 @@
-from fastapi import FastAPI, HTTPException, Depends, Query
+import time
+
+# Startup budget (STARTUP_BUDGET_SECONDS): imports are timed from here, then
+# the startup hook; both are reported by /health and the startup_seconds metric
+_import_started = time.perf_counter()
+
+from fastapi import FastAPI, HTTPException, Depends, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from app.core.math_logic import to_decimal, remove_vig_multiplicative, calculate_ev, kelly_criterion
-from app.models.schemas import BetOpportunity, SavedBet
-from app.services.odds_api import get_live_odds, get_available_sports
-from app.core.db import create_db_and_tables, get_session
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+from app.core.math_logic import to_decimal, remove_vig_multiplicative, calculate_ev, kelly_criterion, DevigMethod
+from app.models.schemas import BetOpportunity, BulkBetsResult
+from app.models.tables import SavedBet
+from app.services.odds_api import start_client, close_client, odds_cache
+from app.services.poller import poller, EVSnapshot, encode_feed
+from app.services.broadcast import broadcaster, render_snapshot, RESYNC
+from app.services.metrics import metrics, MetricsMiddleware, SERIALIZE_SECONDS
+from app.services.profiler import profiler
+from app.services.quota import quota
+from app.services.settlement import ClosingLines, FileScores, settlement
+from app.services.shared_state import election
+from app.services.portfolio import needs_rebuild, portfolio_stats, rebuild as rebuild_portfolio, record_saved, valid_odds
+from app.core.db import async_session, close_db, create_db_and_tables, defer_setup, get_session
 from app.core.config import settings
-from sqlmodel import Session, select
-import json
+from app.core import fast_json
+from app.core.feed_index import FeedQuery
+from sqlmodel import and_, or_, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+import base64
+import binascii
+import asyncio
+import heapq
+import math
 import os
 from datetime import datetime
-from typing import Optional
+from typing import Literal, Optional
+
+# Seconds per startup phase: imports, the startup hook (until the server takes
+# requests), and the database setup that continues in the background
+startup_timings: dict = {"imports": round(time.perf_counter() - _import_started, 3), "startup": None, "database": None}
 
 app = FastAPI(title=settings.APP_NAME, version=settings.APP_VERSION)
 
+# Every published refresh is pushed to streaming subscribers
+broadcaster.max_queue = settings.STREAM_MAX_QUEUE
+poller.add_listener(broadcaster.publish)
+# Settled bets get their closing price from the recorded odds
+settlement.closing_lines = ClosingLines(poller.store, poller.get_snapshot)
+
+# Scrape-time views of state the cache and poller already keep
+metrics.gauge(
+    "odds_cache_hit_ratio", "Share of odds cache lookups served without an upstream call",
+    collect=lambda: [({}, odds_cache.stats()["hit_ratio"])]
+)
+metrics.gauge(
+    "odds_cache_lookups", "Odds cache lookups by result since startup", ("result",),
+    collect=lambda: [({"result": key}, odds_cache.stats()[key]) for key in ("hits", "stale_hits", "misses", "coalesced")]
+)
+metrics.gauge(
+    "ev_opportunities", "Opportunities in the current snapshot", ("sport",),
+    collect=lambda: [({"sport": sport}, len(poller.get_snapshot(sport).opportunities)) for sport in poller.sports()]
+)
+metrics.gauge(
+    "ev_snapshot_age_seconds", "Age of the current snapshot", ("sport",),
+    collect=lambda: [({"sport": sport}, poller.get_snapshot(sport).age_seconds) for sport in poller.sports()]
+)
+metrics.gauge(
+    "startup_seconds", "Time spent per startup phase", ("phase",),
+    collect=lambda: [({"phase": phase}, seconds) for phase, seconds in startup_timings.items() if seconds is not None]
+)
+metrics.gauge("sse_subscribers", "Connected streaming clients", collect=lambda: [({}, len(broadcaster))])
+metrics.gauge(
+    "poll_interval_seconds", "Planned poll interval per sport (0 while paused for quota)", ("sport",),
+    collect=lambda: [
+        ({"sport": sport}, state["interval_seconds"] if state["polling"] else 0.0)
+        for sport, state in poller.status().items()
+    ]
+)
+
 @app.on_event("startup")
-def on_startup():
+async def on_startup():
+    started = time.perf_counter()
     print(f"\n{'='*60}")
     print(f"🚀 Starting {settings.APP_NAME} v{settings.APP_VERSION}")
     print(f"{'='*60}\n")
@@ -24,16 +88,79 @@ def on_startup():
     for issue in issues:
         print(issue)
     
-    # Initialize database
+    # Initialize database in the background: requests that need it wait
+    # for it (see get_session), everything else is served right away
+    defer_setup(_init_database())
+    
+    # Shared upstream client (connection pool reused by every fetch)
+    await start_client()
+    print("✓ Upstream HTTP client ready.")
+    
+    # Restore the newest recorded payloads instead of spending upstream quota
+    warmed = poller.warm_from_store()
+    if warmed:
+        print(f"✓ Restored recorded odds for {len(warmed)} sports.")
+    
+    # One worker polls and settles; with several workers the others serve its
+    # snapshots and take over if it exits. Shared snapshots count as polled,
+    # so a restarted leader does not re-fetch what is still fresh.
+    await poller.sync_shared()
+    election.on_elected(_start_leader_tasks)
+    if not election.try_lead():
+        poller.follow()
+        election.start()
+    
+    if settings.ENABLE_PROFILER and settings.PROFILER_AUTOSTART:
+        profiler.start(hz=settings.PROFILER_HZ)
+        print(f"✓ Sampling profiler running at {settings.PROFILER_HZ:g} Hz.")
+    
+    startup_timings["startup"] = round(time.perf_counter() - started, 3)
+    total = startup_timings["imports"] + startup_timings["startup"]
+    print(f"✓ Ready in {total * 1000:.0f} ms (imports {startup_timings['imports'] * 1000:.0f} ms, startup {startup_timings['startup'] * 1000:.0f} ms).")
+    if total > settings.STARTUP_BUDGET_SECONDS:
+        print(f"⚠️  Startup took {total:.2f}s, over the {settings.STARTUP_BUDGET_SECONDS:g}s budget.")
+    
+    print(f"\n{'='*60}\n")
+
+async def _init_database():
+    started = time.perf_counter()
     try:
-        create_db_and_tables()
+        await create_db_and_tables()
         print("✓ Database connected and tables created.")
+        async with async_session() as session:
+            if await needs_rebuild(session):
+                count = await rebuild_portfolio(session)
+                await session.commit()
+                print(f"✓ Built portfolio aggregates from {count} saved bets.")
     except Exception as e:
         print(f"❌ CRITICAL DATABASE ERROR: {e}")
-        # We don't raise here so the app can start and we can see the logs
-        pass
+        # We don't raise here so the app keeps serving and we can see the logs
+    startup_timings["database"] = round(time.perf_counter() - started, 3)
+
+def _start_leader_tasks():
+    # Background poller keeps precomputed EV snapshots warm
+    if settings.ENABLE_POLLER and _has_api_key():
+        poller.start()
+        print(f"✓ Poller started for {len(poller.intervals)} sports.")
     
-    print(f"\n{'='*60}\n")
+    # Pending bets are graded as final scores come in
+    if settings.ENABLE_SETTLEMENT and (isinstance(settlement.source, FileScores) or _has_api_key()):
+        settlement.start()
+        print(f"✓ Bet settlement scheduled every {settlement.interval:g}s ({settlement.source.name}).")
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    await election.stop()
+    await poller.stop()
+    await settlement.stop()
+    await close_client()
+    await close_db()
+
+def _has_api_key() -> bool:
+    return bool(settings.ODDS_API_KEY and len(settings.ODDS_API_KEY) > 5)
+
+if settings.ENABLE_METRICS:
+    app.add_middleware(MetricsMiddleware)
 
 app.add_middleware(
     CORSMiddleware,
@@ -41,12 +168,17 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Load sample data path
 DATA_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "data", "sample_odds.json")
 
 def process_odds_data(data: list, min_ev_threshold: float = 0.0) -> list[BetOpportunity]:
+    """
+    Scalar reference scan. The API serves results from the vectorized engine in
+    `app.core.scanner`; this loop is kept to check that engine against.
+    """
     opportunities = []
     
     # Helper to map market keys
@@ -154,9 +286,73 @@ def health_check():
         "status": "healthy",
         "timestamp": datetime.now().isoformat(),
         "database": "connected" if settings.DATABASE_URL else "not configured",
-        "api_key": "configured" if settings.ODDS_API_KEY else "missing"
+        "api_key": "configured" if settings.ODDS_API_KEY else "missing",
+        "startup_seconds": startup_timings,
     }
 
+@app.get("/cache/stats")
+def get_cache_stats():
+    """Odds cache counters (hits, misses, coalesced fetches, evictions)"""
+    return odds_cache.stats()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    """Prometheus scrape endpoint (text exposition format)"""
+    if not settings.ENABLE_METRICS:
+        raise HTTPException(status_code=404, detail="Metrics are disabled (ENABLE_METRICS)")
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.get("/debug/profiler")
+def get_profiler_status():
+    """State of the sampling profiler"""
+    _require_profiler()
+    return profiler.status()
+
+@app.post("/debug/profiler/start")
+def start_profiler(
+    hz: float = Query(settings.PROFILER_HZ, gt=0, le=1000, description="Samples per second"),
+    seconds: Optional[float] = Query(None, gt=0, description="Stop by itself after this long (default: until stopped)")
+):
+    """Start sampling this worker's stacks (discards the previous profile)"""
+    _require_profiler()
+    if not profiler.start(hz=hz, duration=seconds):
+        raise HTTPException(status_code=409, detail="Profiler is already running")
+    return profiler.status()
+
+@app.post("/debug/profiler/stop", response_class=PlainTextResponse)
+def stop_profiler():
+    """Stop sampling and download the profile as folded stacks (flamegraph.pl / speedscope)"""
+    _require_profiler()
+    return PlainTextResponse(profiler.stop())
+
+def _require_profiler():
+    if not settings.ENABLE_PROFILER:
+        raise HTTPException(status_code=404, detail="Profiler is disabled (ENABLE_PROFILER)")
+
+@app.get("/poller/status")
+def get_poller_status():
+    """Per-sport poll plan, snapshot size and snapshot age, the upstream credit balance and this worker's role"""
+    return {"sports": poller.status(), "stream_subscribers": len(broadcaster), "quota": quota.status(), "state": election.status()}
+
+@app.get("/odds/history")
+def get_odds_history(
+    sport: str = Query(..., description="Sport key"),
+    event_id: str = Query(..., description="Odds API event id"),
+    market: str = Query("h2h", description="Market key"),
+    book: str = Query(..., description="Bookmaker key (e.g. 'fanduel')"),
+    start: Optional[datetime] = Query(None, description="From (ISO timestamp)"),
+    end: Optional[datetime] = Query(None, description="To (ISO timestamp)")
+):
+    """Recorded price changes of one (event, market, book), oldest first"""
+    if poller.store is None:
+        raise HTTPException(status_code=404, detail="Odds history is disabled (ENABLE_ODDS_STORE)")
+    history = poller.store.history(
+        sport, event_id, market, book,
+        start=start.timestamp() if start else None,
+        end=end.timestamp() if end else None
+    )
+    return {"sport": sport, "event_id": event_id, "market": market, "book": book, "points": history.to_records()}
+
 @app.get("/sports")
 async def get_sports():
     """Get list of supported sports"""
@@ -165,98 +361,243 @@ async def get_sports():
         "note": "Use the sport key (e.g., 'basketball_nba') in the /ev/feed endpoint"
     }
 
+FeedFormat = Literal["rows", "columns"]
+FeedSort = Literal["ev", "odds", "kelly"]
+
 @app.get("/ev/feed", response_model=list[BetOpportunity])
 async def get_ev_feed(
     sport: str = Query("basketball_nba", description="Sport key"),
-    min_ev: float = Query(0.0, description="Minimum EV percentage")
+    min_ev: float = Query(0.0, description="Minimum EV percentage"),
+    devig: Optional[DevigMethod] = Query(None, description="Devig method for the sharp line (default: settings.DEVIG_METHOD)"),
+    format: FeedFormat = Query("rows", description="'columns' returns {count, columns: {field: [values]}} for machine clients"),
+    book: Optional[str] = Query(None, description="Comma-separated books (title or key, e.g. DraftKings,fanduel)"),
+    market: Optional[str] = Query(None, description="Comma-separated market types: moneyline, spread, total, prop"),
+    q: Optional[str] = Query(None, min_length=1, description="Substring of the selection or match name"),
+    min_odds: Optional[float] = Query(None, description="Minimum decimal odds"),
+    max_odds: Optional[float] = Query(None, description="Maximum decimal odds"),
+    min_kelly: Optional[float] = Query(None, ge=0, description="Minimum kelly_fraction: the recommended quarter-Kelly stake fraction, not full Kelly"),
+    sort: FeedSort = Query("ev", description="Sort key, highest first"),
+    limit: Optional[int] = Query(None, ge=1, le=5000, description="Page size (default: everything that matches)"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page"),
 ):
     """
     Scans for +EV opportunities.
     Prioritizes LIVE API if network/key available, else falls back to SAMPLE data.
+    Filters and pages are served from per-snapshot sorted indexes; when more
+    results follow, the X-Next-Cursor header continues the page.
     """
-    return await _fetch_ev_data(sport, min_ev)
-
-async def _fetch_ev_data(sport: str, min_ev: float) -> list[BetOpportunity]:
-    """Helper to fetch EV data (live or sample)"""
-    use_live = False
-    data = []
-
-    if settings.ODDS_API_KEY and len(settings.ODDS_API_KEY) > 5:
-        # Try Live with all markets
-        data = await get_live_odds(
-            sport_key=sport,
-            markets="h2h,spreads,totals"
-        )
-        if data:
-            use_live = True
-        else:
-            print(f"⚠️  Live fetch failed or empty for {sport}.")
-    
-    if not use_live:
+    query = FeedQuery.parse(
+        sort=sort, books=book, markets=market, search=q, min_ev=min_ev, min_odds=min_odds,
+        max_odds=max_odds, min_kelly=min_kelly, limit=limit,
+        after=_decode_feed_cursor(cursor, sort) if cursor else None,
+    )
+    snapshot = await _get_ev_snapshot(sport)
+    if snapshot is None:
+        return _json_response(encode_feed([], columnar=format == "columns"))
+    if devig:
+        snapshot = snapshot.with_method(devig)
+    with SERIALIZE_SECONDS.time(endpoint="/ev/feed"):
+        body, next_key = snapshot.query_json(query, columnar=format == "columns")
+    response = _json_response(body)
+    if next_key is not None:
+        response.headers["X-Next-Cursor"] = _pack_cursor([sort, *next_key])
+    return response
+
+def _decode_feed_cursor(cursor: str, sort: str) -> tuple[float, str]:
+    values = _unpack_cursor(cursor)
+    try:
+        cursor_sort, key, opportunity_id = values
+        if cursor_sort != sort:
+            raise ValueError(cursor_sort)
+        return float(key), str(opportunity_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def _json_response(body: bytes) -> Response:
+    """
+    Already encoded JSON. Opportunities passed validation when they were
+    scanned, so FastAPI's response_model re-validation is skipped.
+    """
+    return Response(body, media_type="application/json")
+
+async def _get_ev_snapshot(sport: str) -> Optional[EVSnapshot]:
+    """
+    Helper to read EV data for a sport.
+    Served from the poller's precomputed snapshot; a sport without one yet is
+    fetched (through the cache), scanned and published on first request.
+    """
+    if not _has_api_key():
         print("ℹ️  No live data available. Returning empty list (Sample field disabled).")
-        return []
+        return None
+
+    snapshot = poller.get_snapshot(sport) or await poller.refresh(sport)
+    if snapshot is None:
+        print(f"⚠️  Live fetch failed or empty for {sport}.")
+    return snapshot
 
-    opportunities = process_odds_data(data, min_ev)
+@app.get("/ev/feed/all", response_model=list[BetOpportunity])
+async def get_ev_feed_all(
+    sports: Optional[str] = Query(None, description="Comma-separated sport keys (default: all supported)"),
+    min_ev: float = Query(0.0, description="Minimum EV percentage"),
+    devig: Optional[DevigMethod] = Query(None, description="Devig method for the sharp line (default: settings.DEVIG_METHOD)"),
+    format: FeedFormat = Query("rows", description="'columns' returns {count, columns: {field: [values]}} for machine clients")
+):
+    """
+    Scans every supported sport at once.
+    Sports without a snapshot yet are fetched concurrently over the shared
+    client; the merged, EV-sorted list is streamed back as a JSON array.
+    """
+    sport_keys = [s.strip() for s in sports.split(",") if s.strip()] if sports else list(settings.SUPPORTED_SPORTS)
     
-    # Filter is now handled inside process_odds_data, but we keep this for safety or additional filtering
-    if min_ev > 0:
-         opportunities = [opp for opp in opportunities if opp.ev_percent >= min_ev]
+    per_sport: list[list[tuple[BetOpportunity, bytes]]] = []
+    if _has_api_key():
+        snapshots = await poller.ensure_snapshots(sport_keys)
+        snapshots = [snapshot.with_method(devig) if devig else snapshot for snapshot in snapshots.values()]
+        # Per-opportunity JSON is memoized on each snapshot
+        with SERIALIZE_SECONDS.time(endpoint="/ev/feed/all"):
+            per_sport = [snapshot.encoded_above(min_ev) for snapshot in snapshots]
     
-    return opportunities
+    # Each per-sport list is already sorted, so a k-way merge keeps the output sorted
+    merged = heapq.merge(*per_sport, key=lambda item: -item[0].ev_percent)
+    if format == "columns":
+        return _json_response(fast_json.dumps_columns([opp for opp, _ in merged], BetOpportunity))
+    return StreamingResponse(_stream_json_array(text for _, text in merged), media_type="application/json")
+
+@app.get("/ev/stream")
+async def stream_ev_feed(
+    request: Request,
+    sport: Optional[str] = Query(None, description="Comma-separated sport keys (default: all)"),
+    min_ev: float = Query(0.0, description="Minimum EV percentage")
+):
+    """
+    Live opportunity feed over Server-Sent Events.
+    Sends a `snapshot` event on connect, then `delta` events (added / updated /
+    removed) whenever a refresh changes what this filter can see.
+    """
+    sport_keys = [s.strip() for s in sport.split(",") if s.strip()] if sport else None
+    if sport_keys and _has_api_key():
+        await poller.ensure_snapshots(sport_keys)
+    
+    subscription = broadcaster.subscribe(sport_keys, min_ev)
+    return StreamingResponse(
+        _sse_events(request, subscription),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+async def _sse_events(request: Request, subscription):
+    def snapshot_frame() -> str:
+        sports = subscription.sports or poller.sports()
+        per_sport = [snap.encoded_above(subscription.min_ev) for snap in map(poller.get_snapshot, sports) if snap]
+        merged = heapq.merge(*per_sport, key=lambda item: -item[0].ev_percent)
+        return render_snapshot(text for _, text in merged)
+    
+    try:
+        yield snapshot_frame()
+        while True:
+            try:
+                frame = await asyncio.wait_for(subscription.queue.get(), timeout=settings.STREAM_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                if await request.is_disconnected():
+                    break
+                yield ": keep-alive\n\n"
+                continue
+            yield snapshot_frame() if frame is RESYNC else frame
+    finally:
+        broadcaster.unsubscribe(subscription)
+
+# Elements per chunk when streaming a JSON array
+STREAM_CHUNK_ITEMS = 500
+
+def _stream_json_array(encoded):
+    """Yield a JSON array of already encoded elements, a chunk at a time"""
+    yield b"["
+    chunk: list[bytes] = []
+    separator = b""
+    for text in encoded:
+        chunk.append(text)
+        if len(chunk) == STREAM_CHUNK_ITEMS:
+            yield separator + b",".join(chunk)
+            separator, chunk = b",", []
+    if chunk:
+        yield separator + b",".join(chunk)
+    yield b"]"
 
 from app.models.schemas import ParlayRecommendation, ParlayLeg
+from app.core.parlay import Parlay, optimize_parlays
 
 @app.get("/ev/parlay", response_model=Optional[ParlayRecommendation])
-async def get_suggested_parlay(target_book: str = "FanDuel", min_odds: float = 20.0):
+async def get_suggested_parlay(
+    target_book: str = "FanDuel",
+    min_odds: float = Query(20.0, gt=1.0, description="Minimum combined decimal odds"),
+    sports: Optional[str] = Query(None, description="Comma-separated sport keys (default: sports already scanned, else NBA)"),
+    max_odds: Optional[float] = Query(None, gt=1.0, description="Maximum combined decimal odds (default: 2x min_odds)"),
+    max_legs: int = Query(6, ge=2, le=12, description="Maximum number of legs")
+):
     """
     Generates a high-value parlay (Lotto Ticket) for a specific book.
     Targeting ~20x odds.
     """
-    # 1. Get all opportunities
-    # 1. Get all opportunities (default to NBA and 0 EV for base set)
-    opportunities = await _fetch_ev_data("basketball_nba", 0.0)
-    
-    # 2. Filter by Book and Positive EV
-    candidates = [
-        op for op in opportunities 
-        if start_case_insensitive_match(op.target_book, target_book) and op.ev_percent > 0
-    ]
+    parlays = await _build_parlays(target_book, min_odds, sports, max_odds, max_legs, top_k=1)
+    return parlays[0] if parlays else None
+
+@app.get("/ev/parlays", response_model=list[ParlayRecommendation])
+async def get_suggested_parlays(
+    target_book: str = "FanDuel",
+    min_odds: float = Query(20.0, gt=1.0, description="Minimum combined decimal odds"),
+    sports: Optional[str] = Query(None, description="Comma-separated sport keys (default: sports already scanned, else NBA)"),
+    max_odds: Optional[float] = Query(None, gt=1.0, description="Maximum combined decimal odds (default: 2x min_odds)"),
+    max_legs: int = Query(6, ge=2, le=12, description="Maximum number of legs"),
+    top_k: int = Query(5, ge=1, le=50, description="Number of parlays to return")
+):
+    """Top-K parlays by true combined EV for a specific book"""
+    return await _build_parlays(target_book, min_odds, sports, max_odds, max_legs, top_k)
+
+async def _build_parlays(
+    target_book: str,
+    min_odds: float,
+    sports: Optional[str],
+    max_odds: Optional[float],
+    max_legs: int,
+    top_k: int
+) -> list[ParlayRecommendation]:
+    """
+    Search the cached opportunity sets for the best parlays.
+    One leg per game; EV is prod(fair prob) x prod(odds) - 1, not a sum of leg EVs.
+    """
+    if not _has_api_key():
+        return []
     
-    # 3. Sort by robustness (EV)
-    candidates.sort(key=lambda x: x.ev_percent, reverse=True)
+    sport_keys = [s.strip() for s in sports.split(",") if s.strip()] if sports else (poller.sports() or ["basketball_nba"])
+    snapshots = await poller.ensure_snapshots(sport_keys)
     
-    selected_legs = []
-    current_combined_odds = 1.0
-    used_matches = set()
+    # 1. +EV legs at the requested book
+    candidates = {
+        op.id: op for snapshot in snapshots.values() for op in snapshot.above(0.0)
+        if start_case_insensitive_match(op.target_book, target_book)
+    }
     
-    for bet in candidates:
-        # Avoid correlation (Same Game Parlays are complex, so we stick to 1 leg per game for MVP)
-        if bet.match_name in used_matches:
-            continue
-            
-        selected_legs.append(bet)
-        used_matches.add(bet.match_name)
-        current_combined_odds *= bet.target_odds_decimal
-        
-        if current_combined_odds >= min_odds:
-            break
-            
-    if not selected_legs or current_combined_odds < 2.0:
-        return None
-        
+    # 2. Bounded search over one-leg-per-game combinations
+    parlays = optimize_parlays(
+        list(candidates.values()), min_odds=min_odds, max_odds=max_odds or min_odds * 2, max_legs=max_legs, top_k=top_k,
+        time_budget=settings.PARLAY_TIME_BUDGET_SECONDS
+    )
+    return [_parlay_recommendation(parlay, target_book) for parlay in parlays]
+
+def _parlay_recommendation(parlay: Parlay, target_book: str) -> ParlayRecommendation:
     # Convert combined odds to American
-    if current_combined_odds >= 2.0:
-        total_us = int((current_combined_odds - 1) * 100)
+    if parlay.odds_decimal >= 2.0:
+        total_us = int((parlay.odds_decimal - 1) * 100)
     else:
-        total_us = int(-100 / (current_combined_odds - 1))
-        
-    # Create Response
-    recommendation = ParlayRecommendation(
+        total_us = int(-100 / (parlay.odds_decimal - 1))
+    
+    return ParlayRecommendation(
         book=target_book,
-        total_odds_decimal=round(current_combined_odds, 2),
+        total_odds_decimal=round(parlay.odds_decimal, 2),
         total_odds_american=total_us,
-        expected_value_combined=sum(leg.ev_percent for leg in selected_legs), # Rough approximation
-        note="Parlay built from uncorrelated +EV bets. Variance is high.",
+        expected_value_combined=round(parlay.ev * 100, 2),
+        win_probability=round(parlay.win_probability, 6),
+        note="Parlay built from uncorrelated +EV bets (one leg per game). Variance is high.",
         legs=[
             ParlayLeg(
                 match_name=leg.match_name,
@@ -266,10 +607,9 @@ async def get_suggested_parlay(target_book: str = "FanDuel", min_odds: float = 2
                 odds_american=leg.target_odds_american,
                 odds_decimal=leg.target_odds_decimal,
                 ev_percent=leg.ev_percent
-            ) for leg in selected_legs
+            ) for leg in parlay.legs
         ]
     )
-    return recommendation
 
 def start_case_insensitive_match(s1, s2):
     return s1.lower().startswith(s2.lower()) or s2.lower().startswith(s1.lower())
@@ -277,26 +617,240 @@ def start_case_insensitive_match(s1, s2):
 def get_selection_name(op: BetOpportunity) -> str:
     return op.selection
 
+from app.models.schemas import StakeAllocation, StakePlanResponse
+from app.core.staking import OpenBet, optimize_stakes
+from app.services.portfolio import decimal_odds
+
+@app.get("/ev/stakes", response_model=StakePlanResponse)
+async def get_stake_plan(
+    sports: Optional[str] = Query(None, description="Comma-separated sport keys (default: sports already scanned, else NBA)"),
+    min_ev: float = Query(0.0, description="Minimum EV percentage"),
+    bankroll: float = Query(settings.BANKROLL, gt=0, description="Current bankroll, open stakes included"),
+    kelly_fraction: float = Query(settings.KELLY_FRACTION, gt=0, le=1),
+    max_game_exposure: float = Query(settings.MAX_GAME_EXPOSURE, gt=0, le=1, description="Share of the bankroll on one game"),
+    max_book_exposure: float = Query(settings.MAX_BOOK_EXPOSURE, gt=0, le=1, description="Share of the bankroll at one book"),
+    max_total_exposure: float = Query(settings.MAX_TOTAL_EXPOSURE, gt=0, le=1, description="Share of the bankroll at risk in total"),
+    include_open: bool = Query(True, description="Account for pending bets in the portfolio"),
+    session: AsyncSession = Depends(get_session),
+):
+    """
+    Stakes for the current +EV opportunities, sized together (simultaneous
+    Kelly) rather than one bet at a time, within per-game, per-book and total
+    exposure caps. Pending bets count against the caps and into the risk.
+    """
+    sport_keys = [s.strip() for s in sports.split(",") if s.strip()] if sports else (poller.sports() or ["basketball_nba"])
+    snapshots = await poller.ensure_snapshots(sport_keys) if _has_api_key() else {}
+    candidates = list(heapq.merge(
+        *(snapshot.above(max(min_ev, 0.0)) for snapshot in snapshots.values()),
+        key=lambda opp: opp.ev_percent, reverse=True,
+    ))[:settings.MAX_STAKE_CANDIDATES]
+
+    open_bets = []
+    if include_open:
+        rows = (await session.exec(
+            select(SavedBet.sport, SavedBet.match_name, SavedBet.market, SavedBet.selection, SavedBet.book,
+                   SavedBet.stake, SavedBet.odds, SavedBet.ev_percent)
+            .where(SavedBet.status == "Pending")
+        )).all()
+        for row in rows:
+            odds = decimal_odds(row.odds)
+            if odds <= 1 or row.stake <= 0:
+                continue
+            # Fair probability implied by the EV the bet was saved with
+            fair_prob = min(max((1 + row.ev_percent / 100) / odds, 0.0), 1.0)
+            open_bets.append(OpenBet(row.sport, row.match_name, row.market, row.selection, row.book, row.stake, odds, fair_prob))
+
+    plan = await asyncio.to_thread(
+        optimize_stakes, candidates, open_bets,
+        bankroll=bankroll, kelly_fraction=kelly_fraction, max_game_exposure=max_game_exposure,
+        max_book_exposure=max_book_exposure, max_total_exposure=max_total_exposure, scenarios=settings.STAKE_SCENARIOS,
+    )
+    allocations = [
+        StakeAllocation(
+            id=opp.id,
+            match_name=opp.match_name,
+            sport=opp.sport,
+            market=opp.market,
+            selection=opp.selection,
+            target_book=opp.target_book,
+            target_odds_decimal=opp.target_odds_decimal,
+            fair_prob=opp.fair_prob,
+            ev_percent=opp.ev_percent,
+            independent_stake=round(kelly_criterion(opp.fair_prob, opp.target_odds_decimal, kelly_fraction) * bankroll, 2),
+            stake=round(float(stake), 2),
+        )
+        for opp, stake in zip(candidates, plan.stakes) if stake >= 0.01
+    ]
+    allocations.sort(key=lambda allocation: allocation.stake, reverse=True)
+    return StakePlanResponse(
+        bankroll=bankroll,
+        kelly_fraction=kelly_fraction,
+        open_stake=round(plan.open_stake, 2),
+        total_stake=round(plan.total_stake, 2),
+        expected_log_growth=round(plan.expected_log_growth, 6) if math.isfinite(plan.expected_log_growth) else None,
+        candidates=len(candidates),
+        solve_seconds=round(plan.seconds, 4),
+        allocations=allocations,
+    )
+
+from app.models.schemas import ArbOpportunity
+from app.core.arbitrage import ARB
+
+@app.get("/arb/feed", response_model=list[ArbOpportunity])
+async def get_arb_feed(
+    sports: Optional[str] = Query(None, description="Comma-separated sport keys (default: sports already scanned, else NBA)"),
+    min_profit: float = Query(0.0, ge=0, description="Minimum guaranteed profit of an arb, in % of the stake"),
+    stake: float = Query(settings.ARB_STAKE, gt=0, description="Total stake split across the legs"),
+    include_middles: bool = Query(True, description="Also return middles between differing spread / total numbers"),
+    max_middle_loss: float = Query(settings.MAX_MIDDLE_LOSS_PERCENT, ge=0, lt=100, description="Most a middle may lose when it misses, in % of the stake"),
+    limit: int = Query(200, ge=1, le=5000, description="Maximum number of results"),
+):
+    """
+    Guaranteed-profit arbs and middles across every book, with the stake split
+    that pays the same whichever leg wins. Arbs come first (highest profit),
+    then middles (smallest loss on a miss, widest first).
+    """
+    sport_keys = [s.strip() for s in sports.split(",") if s.strip()] if sports else (poller.sports() or ["basketball_nba"])
+    snapshots = await poller.ensure_snapshots(sport_keys) if _has_api_key() else {}
+    # Scanned once per snapshot and parameter set, off the event loop
+    per_sport = await asyncio.gather(*(
+        asyncio.to_thread(snapshot.arbitrage, stake, include_middles, max_middle_loss)
+        for snapshot in snapshots.values()
+    ))
+    merged = heapq.merge(*per_sport, key=lambda opp: (opp.kind != ARB, -opp.profit_percent, -(opp.middle_width or 0)))
+    results = []
+    for opp in merged:
+        if opp.kind == ARB and opp.profit_percent <= min_profit:
+            continue
+        results.append(opp)
+        if len(results) >= limit:
+            break
+    return results
+
 # --- V2: Database Endpoints ---
 
+def _check_odds(bets: list[SavedBet]):
+    """Reject odds that are neither American (|odds| >= 100) nor a decimal price above 1"""
+    for i, bet in enumerate(bets):
+        if not valid_odds(bet.odds):
+            raise HTTPException(
+                status_code=422,
+                detail=f"Bet {i}: odds {bet.odds:g} are neither American (|odds| >= 100) nor decimal (> 1)",
+            )
+
 @app.post("/bets", response_model=SavedBet)
-def save_bet(bet: SavedBet, session: Session = Depends(get_session)):
+async def save_bet(bet: SavedBet, session: AsyncSession = Depends(get_session)):
     """
     Save a selected bet to the database (Portfolio).
     """
+    _check_odds([bet])
     session.add(bet)
-    session.commit()
-    session.refresh(bet)
+    await record_saved(session, [bet])
+    await session.commit()
     return bet
 
+@app.post("/bets/bulk", response_model=BulkBetsResult)
+async def save_bets_bulk(bets: list[SavedBet], session: AsyncSession = Depends(get_session)):
+    """
+    Save many bets in one transaction (imports, syncing another tracker).
+    Ids are assigned by the database; either every bet is saved or none is.
+    """
+    if len(bets) > settings.MAX_BULK_BETS:
+        raise HTTPException(status_code=413, detail=f"At most {settings.MAX_BULK_BETS} bets per request")
+    _check_odds(bets)
+    for bet in bets:
+        bet.id = None
+    # One batched INSERT ... RETURNING per chunk instead of a round trip per bet
+    session.add_all(bets)
+    await record_saved(session, bets)
+    await session.commit()
+    return BulkBetsResult(inserted=len(bets), ids=[bet.id for bet in bets])
+
+def _pack_cursor(values: list) -> str:
+    return base64.urlsafe_b64encode(fast_json.dumps(values)).decode().rstrip("=")
+
+def _unpack_cursor(cursor: str) -> list:
+    try:
+        values = fast_json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (binascii.Error, ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(values, list):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
+
+def _encode_cursor(bet: SavedBet) -> str:
+    return _pack_cursor([bet.timestamp, bet.id])
+
+def _decode_cursor(cursor: str) -> tuple[str, int]:
+    try:
+        timestamp, bet_id = _unpack_cursor(cursor)
+        return str(timestamp), int(bet_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
 @app.get("/history", response_model=list[SavedBet])
-def get_bet_history(session: Session = Depends(get_session)):
+async def get_bet_history(
+    response: Response,
+    limit: int = Query(settings.HISTORY_PAGE_SIZE, ge=1, le=settings.MAX_HISTORY_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page"),
+    sport: Optional[str] = None,
+    status: Optional[str] = None,
+    session: AsyncSession = Depends(get_session),
+):
     """
-    Retrieve all saved bets.
+    Saved bets, newest first, one page at a time.
+    
+    Pages are keyset-paginated on (timestamp, id), so every page is an index
+    range scan no matter how deep it is. When more bets follow, the
+    `X-Next-Cursor` response header holds the cursor of the next page.
+    """
+    statement = select(SavedBet)
+    if sport:
+        statement = statement.where(SavedBet.sport == sport)
+    if status:
+        statement = statement.where(SavedBet.status == status)
+    if cursor:
+        timestamp, bet_id = _decode_cursor(cursor)
+        statement = statement.where(or_(
+            SavedBet.timestamp < timestamp,
+            and_(SavedBet.timestamp == timestamp, SavedBet.id < bet_id),
+        ))
+    statement = statement.order_by(SavedBet.timestamp.desc(), SavedBet.id.desc()).limit(limit + 1)
+    bets = list((await session.exec(statement)).all())
+    if len(bets) > limit:
+        bets = bets[:limit]
+        response.headers["X-Next-Cursor"] = _encode_cursor(bets[-1])
+    return bets
+
+@app.get("/portfolio/stats")
+async def get_portfolio_stats(
+    bucket: Literal["day", "week", "month"] = Query("day", description="Time bucket of by_time and the bankroll curve"),
+    starting_bankroll: float = Query(1000.0, gt=0),
+    session: AsyncSession = Depends(get_session),
+):
     """
-    statement = select(SavedBet).order_by(SavedBet.id.desc())
-    results = session.exec(statement)
-    return results.all()
+    P&L, ROI, turnover, average EV, CLV and bankroll curve, in total and per
+    sport, book, market and time bucket. Read from aggregates kept up to date
+    as bets are saved and settled, so the cost does not grow with the number of bets.
+    """
+    return await portfolio_stats(session, bucket=bucket, starting_bankroll=starting_bankroll)
+
+@app.post("/portfolio/rebuild")
+async def post_portfolio_rebuild(session: AsyncSession = Depends(get_session)):
+    """Recompute the portfolio aggregates from every saved bet (after editing bets by hand)"""
+    count = await rebuild_portfolio(session)
+    await session.commit()
+    return {"bets": count}
+
+@app.post("/settlement/run")
+async def run_settlement():
+    """Grade pending bets against final scores now (idempotent)"""
+    return await settlement.settle()
+
+@app.get("/settlement/status")
+def get_settlement_status():
+    """Settlement schedule and the summary of the last run"""
+    return settlement.status()
 
 
 
@@ -1,10 +1,13 @@
 from pydantic import BaseModel
 from typing import Optional, List
-from sqlmodel import SQLModel, Field
+
+# Plain pydantic models only: the scan core imports these without the
+# database stack. Tables live in app.models.tables.
 
 # --- API Models ---
 
 class BetOpportunity(BaseModel):
+    id: Optional[str] = None  # Stable across refreshes (event, market, point, book, selection)
     match_name: str
     sport: str
     market: str  # e.g., "Moneyline", "Spread -3.5"
@@ -22,7 +25,7 @@ class BetOpportunity(BaseModel):
     # Math
     fair_prob: float        # True win probability (0-1)
     ev_percent: float       # Expected Value %
-    kelly_fraction: float   # Recommended stake % (Full Kelly)
+    kelly_fraction: float   # Recommended stake fraction (quarter Kelly)
     kelly_stake_suggested: float # Example stake for $1000 bankroll (0.25 Kelly)
     
     timestamp: str
@@ -41,21 +44,60 @@ class ParlayRecommendation(BaseModel):
     total_odds_decimal: float
     total_odds_american: int
     legs: List[ParlayLeg]
-    expected_value_combined: float
+    expected_value_combined: float  # EV % of the whole ticket: prod(fair prob) x prod(odds) - 1
     note: str
+    win_probability: Optional[float] = None  # prod(fair prob) of the legs
 
-class SavedBet(SQLModel, table=True):
-    id: Optional[int] = Field(default=None, primary_key=True)
+class StakeAllocation(BaseModel):
+    id: Optional[str] = None
     match_name: str
+    sport: str
+    market: str
     selection: str
-    odds: float
-    stake: float
-    potential_payout: float
+    target_book: str
+    target_odds_decimal: float
+    fair_prob: float
     ev_percent: float
+    independent_stake: float  # Fractional Kelly of this bet alone
+    stake: float  # Allocated jointly with every other bet
+
+class StakePlanResponse(BaseModel):
+    bankroll: float
+    kelly_fraction: float
+    open_stake: float  # Already at risk in pending bets
+    total_stake: float  # Newly allocated
+    expected_log_growth: Optional[float]  # None when open bets alone can exceed the bankroll
+    candidates: int
+    solve_seconds: float
+    allocations: List[StakeAllocation]  # Bets with a stake, largest first
+
+class ArbLeg(BaseModel):
     book: str
+    market: str  # e.g., "Spread -3.5"
+    selection: str
+    point: Optional[float] = None
+    odds_decimal: float
+    odds_american: int
+    stake: float  # Share of total_stake; every leg pays the same if it wins
+
+class ArbOpportunity(BaseModel):
+    id: str  # Stable while the same lines are best at the same books
+    kind: str  # "arb" (guaranteed profit) or "middle" (both legs can win)
+    match_name: str
     sport: str
+    market: str  # Odds API market key
+    commence_time: Optional[str] = None
+    legs: List[ArbLeg]
+    implied_sum: float  # Sum of 1 / odds over the legs; below 1 is an arb
+    profit_percent: float  # Return on total_stake when one leg wins (negative for most middles)
+    middle_width: Optional[float] = None  # Points between the legs' lines
+    middle_profit_percent: Optional[float] = None  # Return on total_stake when both legs win
+    total_stake: float
     timestamp: str
-    status: str = "Pending" # Pending, Won, Lost
+
+class BulkBetsResult(BaseModel):
+    inserted: int
+    ids: List[int]  # Database ids, in request order
 
 class OddsRequest(BaseModel):
     provider: str = "mock" # "mock" or "the-odds-api"
@@ -0,0 +1,50 @@
+from typing import Optional
+from sqlalchemy import Index
+from sqlmodel import SQLModel, Field
+
+# --- Database Models ---
+
+class SavedBet(SQLModel, table=True):
+    # /history pages newest first by (timestamp, id), optionally per sport or status
+    __table_args__ = (
+        Index("ix_savedbet_timestamp_id", "timestamp", "id"),
+        Index("ix_savedbet_sport_timestamp_id", "sport", "timestamp", "id"),
+        Index("ix_savedbet_status_timestamp_id", "status", "timestamp", "id"),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    match_name: str
+    selection: str
+    odds: float
+    stake: float
+    potential_payout: float
+    ev_percent: float
+    book: str
+    sport: str
+    timestamp: str
+    status: str = "Pending" # Pending, Won, Lost, Push
+    # Needed for automatic settlement (see app.services.settlement); bets
+    # without an event id are matched on sport and match name
+    event_id: Optional[str] = None
+    market: Optional[str] = None  # "h2h" / "spreads" / "totals" or the feed's market name
+    point: Optional[float] = None  # Spread or total line (parsed from `market` when omitted)
+    settled_at: Optional[str] = None
+    closing_odds: Optional[float] = None  # Closing price of the selection, for CLV
+
+class PortfolioAggregate(SQLModel, table=True):
+    """Running totals of the saved bets of one group (see app.services.portfolio)"""
+    dimension: str = Field(primary_key=True)  # all, sport, book, market, day, settled_day
+    key: str = Field(primary_key=True)
+    bets: int = 0
+    pending: int = 0
+    won: int = 0
+    lost: int = 0
+    push: int = 0
+    staked: float = 0.0
+    settled_staked: float = 0.0
+    profit: float = 0.0
+    ev_sum: float = 0.0  # Sum of ev_percent
+    expected_profit: float = 0.0  # Sum of stake x EV
+    settled_expected_profit: float = 0.0
+    clv_sum: float = 0.0  # Sum of CLV %, over the bets with a closing price
+    clv_bets: int = 0
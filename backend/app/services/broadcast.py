@@ -0,0 +1,148 @@
+"""
+Fan-out of scan results to streaming (SSE) subscribers.
+
+Every refresh is computed once by the poller. The broadcaster turns the
+refresh's ScanDelta into one Server-Sent Events frame per distinct
+subscriber filter and hands the same string to every subscriber sharing that
+filter, so idle connections cost a queue each and no per-client scan.
+"""
+import asyncio
+import json
+from typing import Dict, Iterable, List, Optional, Set
+
+from app.core import fast_json
+from app.models.schemas import BetOpportunity
+
+# Queued in place of frames when a subscriber fell too far behind; the stream
+# answers it by sending a fresh full snapshot.
+RESYNC = object()
+
+
+class Subscription:
+    """One connected client: its filters and its outbound queue"""
+    __slots__ = ("sports", "min_ev", "queue")
+
+    def __init__(self, sports: Optional[frozenset], min_ev: float, max_queue: int):
+        self.sports = sports
+        self.min_ev = min_ev
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+
+    def push(self, frame):
+        try:
+            self.queue.put_nowait(frame)
+        except asyncio.QueueFull:
+            # Slow consumer: drop the backlog and make it start over from a snapshot
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESYNC)
+
+
+def sse_frame(event: str, data: str) -> str:
+    return f"event: {event}\ndata: {data}\n\n"
+
+
+def render_snapshot(encoded: Iterable[bytes]) -> str:
+    """Initial full-state frame sent when a client connects (or resyncs), from encoded opportunities"""
+    body = b",".join(encoded).decode()
+    return sse_frame("snapshot", f'{{"opportunities":[{body}]}}')
+
+
+class Broadcaster:
+    """
+    Registry of subscribers, indexed by sport (None = all sports) and then by
+    min_ev, so a publish renders each distinct filter only once.
+    """
+
+    def __init__(self, max_queue: int = 64):
+        self.max_queue = max_queue
+        self._index: Dict[Optional[str], Dict[float, Set[Subscription]]] = {}
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def subscribe(self, sports: Optional[Iterable[str]] = None, min_ev: float = 0.0) -> Subscription:
+        sub = Subscription(frozenset(sports) if sports else None, min_ev, self.max_queue)
+        for sport in sub.sports or (None,):
+            self._index.setdefault(sport, {}).setdefault(min_ev, set()).add(sub)
+        self._count += 1
+        return sub
+
+    def unsubscribe(self, sub: Subscription):
+        for sport in sub.sports or (None,):
+            by_ev = self._index.get(sport, {})
+            group = by_ev.get(sub.min_ev)
+            if group is not None and sub in group:
+                group.discard(sub)
+                if not group:
+                    del by_ev[sub.min_ev]
+        self._count -= 1
+
+    def publish(self, sport: str, delta) -> int:
+        """
+        Push one refresh's changes to every interested subscriber.
+
+        Args:
+            sport: Sport the delta belongs to
+            delta: ScanDelta from the incremental scanner
+
+        Returns:
+            Number of subscribers a frame was queued for
+        """
+        if delta is None or delta.is_empty or not self._count:
+            return 0
+
+        groups: Dict[float, List[Set[Subscription]]] = {}
+        for key in (sport, None):
+            for min_ev, subs in self._index.get(key, {}).items():
+                groups.setdefault(min_ev, []).append(subs)
+
+        encoded: Dict[int, str] = {}
+
+        def encode(opp: BetOpportunity) -> str:
+            text = encoded.get(id(opp))
+            if text is None:
+                text = encoded[id(opp)] = fast_json.dumps(opp).decode()
+            return text
+
+        delivered = 0
+        for min_ev, sub_sets in groups.items():
+            frame = self._render_delta(sport, delta, min_ev, encode)
+            if frame is None:
+                continue
+            for subs in sub_sets:
+                for sub in subs:
+                    sub.push(frame)
+                    delivered += 1
+        return delivered
+
+    @staticmethod
+    def _render_delta(sport: str, delta, min_ev: float, encode) -> Optional[str]:
+        """
+        Project a delta onto one min_ev filter: an opportunity crossing the
+        threshold is an add or a remove from that subscriber's point of view.
+        """
+        added = [encode(opp) for opp in delta.added if opp.ev_percent > min_ev]
+        updated = []
+        removed = [opp.id for opp in delta.removed if opp.ev_percent > min_ev]
+
+        for new, old in zip(delta.changed, delta.replaced):
+            was_visible = old.ev_percent > min_ev
+            is_visible = new.ev_percent > min_ev
+            if is_visible and was_visible:
+                updated.append(encode(new))
+            elif is_visible:
+                added.append(encode(new))
+            elif was_visible:
+                removed.append(old.id)
+
+        if not (added or updated or removed):
+            return None
+        return sse_frame(
+            "delta",
+            f'{{"sport":{json.dumps(sport)},"added":[{",".join(added)}],'
+            f'"updated":[{",".join(updated)}],"removed":{json.dumps(removed)}}}',
+        )
+
+
+broadcaster = Broadcaster()
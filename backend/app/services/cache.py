@@ -0,0 +1,139 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+Fetcher = Callable[[], Awaitable[Optional[Any]]]
+
+
+class OddsCache:
+    """
+    Async TTL cache with single-flight fetches, stale-while-revalidate and
+    LRU eviction.
+
+    - Fresh entries (age < ttl) are returned directly.
+    - Stale entries (ttl <= age < ttl + stale_ttl) are returned immediately
+      while one background task refreshes them.
+    - Misses share a single in-flight fetch per key: concurrent callers await
+      the same future instead of each calling upstream.
+
+    All bookkeeping runs on the event loop between awaits, so the check for an
+    in-flight fetch and the registration of a new one cannot interleave.
+    """
+
+    def __init__(self, ttl_seconds: float = 300.0, stale_ttl_seconds: float = 600.0, max_entries: int = 128):
+        self.ttl = ttl_seconds
+        self.stale_ttl = stale_ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.refreshes = 0
+        self.evictions = 0
+        self.errors = 0
+
+    # --- Lookup ---
+
+    def peek(self, key: str) -> Optional[Tuple[Any, float]]:
+        """Return (value, age_seconds) regardless of freshness, without touching stats or LRU order"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, stored_at = entry
+        return value, time.monotonic() - stored_at
+
+    async def get_or_fetch(self, key: str, fetcher: Fetcher) -> Optional[Any]:
+        """
+        Return the cached value for `key`, fetching it if needed.
+
+        Args:
+            key: Cache key
+            fetcher: Coroutine factory returning the fresh value, or None if the
+                fetch failed (failures are not cached)
+
+        Returns:
+            The cached or freshly fetched value, or None if nothing is available
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            value, stored_at = entry
+            age = time.monotonic() - stored_at
+            if age < self.ttl:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return value
+            if age < self.ttl + self.stale_ttl:
+                self.stale_hits += 1
+                self._entries.move_to_end(key)
+                if key not in self._inflight:
+                    self.refreshes += 1
+                    task = self._start_fetch(key, fetcher)
+                    task.add_done_callback(self._log_refresh_failure)
+                return value
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            inflight = self._start_fetch(key, fetcher)
+        # Shielded so a cancelled request does not cancel the fetch other callers share
+        return await asyncio.shield(inflight)
+
+    # --- Mutation ---
+
+    def set(self, key: str, value: Any, age_seconds: float = 0.0):
+        """Store a value, evicting the least recently used entries past max_entries"""
+        self._entries[key] = (value, time.monotonic() - age_seconds)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self._entries.clear()
+
+    # --- Internals ---
+
+    def _start_fetch(self, key: str, fetcher: Fetcher) -> asyncio.Task:
+        task = asyncio.ensure_future(self._fetch(key, fetcher))
+        self._inflight[key] = task
+        task.add_done_callback(lambda done: self._inflight.pop(key) if self._inflight.get(key) is done else None)
+        return task
+
+    async def _fetch(self, key: str, fetcher: Fetcher) -> Optional[Any]:
+        try:
+            value = await fetcher()
+        except Exception:
+            self.errors += 1
+            raise
+        if value is not None:
+            self.set(key, value)
+        return value
+
+    @staticmethod
+    def _log_refresh_failure(task: asyncio.Task):
+        if not task.cancelled() and task.exception() is not None:
+            e = task.exception()
+            print(f"❌ Background refresh failed: {type(e).__name__}: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.stale_hits + self.misses + self.coalesced
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "stale_ttl_seconds": self.stale_ttl,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "refreshes": self.refreshes,
+            "evictions": self.evictions,
+            "errors": self.errors,
+            "in_flight": len(self._inflight),
+            "hit_ratio": round((self.hits + self.stale_hits + self.coalesced) / lookups, 4) if lookups else 0.0,
+        }
@@ -1,17 +1,79 @@
-import httpx
-import os
-from typing import List, Dict, Any, Optional
-from datetime import datetime, timedelta
-from dotenv import load_dotenv
+import asyncio
+import time
+from typing import TYPE_CHECKING, List, Dict, Any, Optional, Iterable
+from app.core import fast_json
+from app.core.config import settings
+from app.services.cache import OddsCache
+from app.services.metrics import (
+    API_REQUESTS_REMAINING, API_REQUESTS_USED, JSON_DECODE_SECONDS, RATE_LIMIT_WAIT_SECONDS,
+    UPSTREAM_FETCH_SECONDS, UPSTREAM_IN_FLIGHT, UPSTREAM_REQUESTS,
+)
+from app.services.quota import quota, rate_limiter, request_cost
 
-load_dotenv()
+if TYPE_CHECKING:
+    import httpx  # Imported on first use (start_client): scripts that only read the caches skip it
 
-API_KEY = os.getenv("ODDS_API_KEY")
-BASE_URL = "https://api.the-odds-api.com/v4/sports"
+API_KEY = settings.ODDS_API_KEY
+BASE_URL = settings.ODDS_API_BASE_URL
 
-# Simple in-memory cache to avoid hitting API limits
-_cache: Dict[str, tuple[List[Dict[str, Any]], datetime]] = {}
+# Shared connection-pooled client, opened on app startup (see start_client)
+_client: Optional["httpx.AsyncClient"] = None
+HTTP_TIMEOUT_SECONDS = 30.0
+HTTP_MAX_CONNECTIONS = settings.HTTP_MAX_CONNECTIONS
+
+# In-memory cache to avoid hitting API limits. Entries older than
+# CACHE_DURATION_MINUTES are served stale while one background refresh runs.
 CACHE_DURATION_MINUTES = 5
+CACHE_STALE_MINUTES = 10
+CACHE_MAX_ENTRIES = settings.ODDS_CACHE_MAX_ENTRIES
+odds_cache = OddsCache(
+    ttl_seconds=CACHE_DURATION_MINUTES * 60,
+    stale_ttl_seconds=CACHE_STALE_MINUTES * 60,
+    max_entries=CACHE_MAX_ENTRIES,
+)
+# Per-event payloads (player props) get their own cache so the many small
+# entries never evict whole-sport payloads
+EVENT_CACHE_MAX_ENTRIES = settings.EVENT_CACHE_MAX_ENTRIES
+event_cache = OddsCache(
+    ttl_seconds=CACHE_DURATION_MINUTES * 60,
+    stale_ttl_seconds=CACHE_STALE_MINUTES * 60,
+    max_entries=EVENT_CACHE_MAX_ENTRIES,
+)
+
+
+async def start_client() -> "httpx.AsyncClient":
+    """
+    Open the shared upstream client. Keeping one client alive for the whole
+    process lets every fetch reuse pooled keep-alive connections instead of
+    paying for a new TLS handshake per request.
+    """
+    import httpx
+
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            timeout=HTTP_TIMEOUT_SECONDS,
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_CONNECTIONS,
+            ),
+        )
+    return _client
+
+
+async def close_client():
+    """Close the shared upstream client (app shutdown)"""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+async def get_client() -> "httpx.AsyncClient":
+    """Return the shared client, opening it lazily if startup did not run (CLI, scripts)."""
+    if _client is None or _client.is_closed:
+        return await start_client()
+    return _client
 
 async def get_live_odds(
     sport_key: str = "basketball_nba", 
@@ -35,13 +97,126 @@ async def get_live_odds(
         print("⚠️  Warning: No valid ODDS_API_KEY found. Returning empty list.")
         return []
     
-    # Check cache first
-    cache_key = f"{sport_key}_{regions}_{markets}"
-    if use_cache and cache_key in _cache:
-        cached_data, cached_time = _cache[cache_key]
-        if datetime.now() - cached_time < timedelta(minutes=CACHE_DURATION_MINUTES):
-            print(f"✓ Using cached data for {sport_key} (age: {(datetime.now() - cached_time).seconds}s)")
-            return cached_data
+    cache_key = odds_cache_key(sport_key, regions, markets)
+    
+    async def fetch() -> Optional[List[Dict[str, Any]]]:
+        return await _fetch_odds(sport_key, regions, markets)
+    
+    if use_cache:
+        data = await odds_cache.get_or_fetch(cache_key, fetch)
+    else:
+        data = await fetch()
+        if data is not None:
+            odds_cache.set(cache_key, data)
+    
+    if data is None:
+        # Upstream failed (rate limit, outage): fall back to the last payload we have, however old
+        cached = odds_cache.peek(cache_key)
+        if cached:
+            print(f"ℹ️  Serving last known data for {sport_key} (age: {int(cached[1])}s)")
+            return cached[0]
+        return []
+    return data
+
+
+def odds_cache_key(sport_key: str, regions: str = "us", markets: str = "h2h,spreads,totals") -> str:
+    return f"{sport_key}_{regions}_{markets}"
+
+def warm_cache(
+    sport_key: str,
+    data: List[Dict[str, Any]],
+    age_seconds: float,
+    regions: str = "us",
+    markets: str = "h2h,spreads,totals"
+):
+    """Seed the cache with a payload fetched earlier (e.g. restored from disk)"""
+    odds_cache.set(odds_cache_key(sport_key, regions, markets), data, age_seconds=age_seconds)
+
+async def get_event_odds(
+    sport_key: str,
+    event_id: str,
+    regions: str = "us",
+    markets: str = "player_points",
+    use_cache: bool = True
+) -> Optional[Dict[str, Any]]:
+    """
+    Fetch odds for a single event (`/events/{event_id}/odds`). This is the
+    only endpoint serving player props, and it is billed per event, so props
+    are fetched for chosen events instead of the whole slate.
+    
+    Args:
+        sport_key: Sport identifier
+        event_id: Odds API event id
+        regions: Regions to fetch odds for
+        markets: Markets to fetch (e.g. 'player_points,player_assists')
+        use_cache: Whether to use cached data if available
+    
+    Returns:
+        The event with its bookmakers, or None if unavailable
+    """
+    if not API_KEY or len(API_KEY) < 10:
+        return None
+    
+    cache_key = event_odds_cache_key(sport_key, event_id, regions, markets)
+    
+    async def fetch() -> Optional[Dict[str, Any]]:
+        return await _fetch_odds(sport_key, regions, markets, event_id=event_id)
+    
+    if use_cache:
+        data = await event_cache.get_or_fetch(cache_key, fetch)
+    else:
+        data = await fetch()
+        if data is not None:
+            event_cache.set(cache_key, data)
+    
+    if data is None:
+        cached = event_cache.peek(cache_key)
+        return cached[0] if cached else None
+    return data
+
+
+def event_odds_cache_key(sport_key: str, event_id: str, regions: str, markets: str) -> str:
+    return f"{sport_key}_{event_id}_{regions}_{markets}"
+
+
+async def get_event_odds_many(
+    sport_key: str,
+    event_ids: Iterable[str],
+    regions: str = "us",
+    markets: str = "player_points",
+    concurrency: int = 5,
+    use_cache: bool = True
+) -> Dict[str, Optional[Dict[str, Any]]]:
+    """
+    Fetch several events of one sport concurrently over the shared client.
+    
+    Returns:
+        Mapping of event id -> event odds (None on failure)
+    """
+    event_ids = list(event_ids)
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def fetch_one(event_id: str) -> Optional[Dict[str, Any]]:
+        async with semaphore:
+            return await get_event_odds(sport_key, event_id, regions=regions, markets=markets, use_cache=use_cache)
+
+    results = await asyncio.gather(*(fetch_one(event_id) for event_id in event_ids))
+    return dict(zip(event_ids, results))
+
+async def _fetch_odds(sport_key: str, regions: str, markets: str, event_id: Optional[str] = None) -> Optional[Any]:
+    """
+    Single upstream call for one sport, or for one event of it with
+    `event_id`. Returns None on failure so the cache never stores an error as
+    a valid (empty) payload.
+    """
+    import httpx
+
+    label = f"{sport_key}/{event_id}" if event_id else sport_key
+    cost = request_cost(markets, regions)
+    if not quota.can_spend(cost):
+        UPSTREAM_REQUESTS.inc(sport=sport_key, status="no_credits")
+        print(f"⛽ Skipping {label}: {quota.remaining:g} API credits left, request costs {cost}.")
+        return None
 
     params = {
         "apiKey": API_KEY,
@@ -51,58 +226,123 @@ async def get_live_odds(
         "dateFormat": "iso"
     }
 
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        try:
-            url = f"{BASE_URL}/{sport_key}/odds"
-            
-            print(f"🔄 Fetching live odds for {sport_key}...")
-            response = await client.get(url, params=params)
-            response.raise_for_status()
-            
-            data = response.json()
-            
-            # Check remaining requests from headers
-            remaining = response.headers.get("x-requests-remaining")
-            used = response.headers.get("x-requests-used")
-            
-            if remaining:
-                print(f"📊 API Usage: {used} used, {remaining} remaining")
-                if int(remaining) < 50:
-                    print(f"⚠️  WARNING: Only {remaining} API requests remaining!")
-            
-            # Cache the result
-            _cache[cache_key] = (data, datetime.now())
-            
+    client = await get_client()
+    await _wait_for_rate_limit()
+    UPSTREAM_IN_FLIGHT.inc()
+    try:
+        url = f"{BASE_URL}/{sport_key}/events/{event_id}/odds" if event_id else f"{BASE_URL}/{sport_key}/odds"
+        
+        print(f"🔄 Fetching live odds for {label}...")
+        start = time.perf_counter()
+        response = await client.get(url, params=params)
+        UPSTREAM_FETCH_SECONDS.observe(time.perf_counter() - start, sport=sport_key)
+        UPSTREAM_REQUESTS.inc(sport=sport_key, status=str(response.status_code))
+        quota.update(response.headers)
+        response.raise_for_status()
+        
+        with JSON_DECODE_SECONDS.time(sport=sport_key):
+            data = fast_json.loads(response.content)
+        
+        # Check remaining requests from headers
+        remaining = response.headers.get("x-requests-remaining")
+        used = response.headers.get("x-requests-used")
+        
+        if remaining:
+            print(f"📊 API Usage: {used} used, {remaining} remaining")
+            _record_quota(remaining, used)
+            if not quota.can_spend(cost, keep_reserve=True):
+                print(f"⚠️  WARNING: Only {remaining} API requests remaining! Polling only live and imminent games.")
+        
+        if event_id:
+            print(f"✓ Fetched {len(data.get('bookmakers', []))} books for {label}")
+        else:
             print(f"✓ Fetched {len(data)} games for {sport_key}")
-            return data
-            
-        except httpx.HTTPStatusError as e:
-            error_detail = ""
-            try:
-                error_detail = e.response.json()
-            except:
-                error_detail = e.response.text
-            
-            print(f"❌ API Error ({e.response.status_code}): {error_detail}")
-            
-            if e.response.status_code == 401:
-                print("🔑 Invalid API key. Please check your ODDS_API_KEY environment variable.")
-            elif e.response.status_code == 429:
-                print("⏱️  Rate limit exceeded. Using cached data if available.")
-                # Return cached data even if expired
-                if cache_key in _cache:
-                    cached_data, _ = _cache[cache_key]
-                    return cached_data
-            
-            return []
-            
-        except httpx.TimeoutException:
-            print(f"⏱️  Request timeout for {sport_key}. Check your internet connection.")
-            return []
-            
-        except Exception as e:
-            print(f"❌ Unexpected error: {type(e).__name__}: {e}")
-            return []
+        return data
+        
+    except httpx.HTTPStatusError as e:
+        error_detail = ""
+        try:
+            error_detail = e.response.json()
+        except:
+            error_detail = e.response.text
+        
+        print(f"❌ API Error ({e.response.status_code}): {error_detail}")
+        
+        if e.response.status_code == 401:
+            print("🔑 Invalid API key. Please check your ODDS_API_KEY environment variable.")
+        elif e.response.status_code == 429:
+            print("⏱️  Rate limit exceeded. Using cached data if available.")
+            rate_limiter.block_for(_retry_after(e.response))
+        
+        return None
+        
+    except httpx.TimeoutException:
+        UPSTREAM_REQUESTS.inc(sport=sport_key, status="timeout")
+        print(f"⏱️  Request timeout for {label}. Check your internet connection.")
+        return None
+        
+    except Exception as e:
+        UPSTREAM_REQUESTS.inc(sport=sport_key, status="error")
+        print(f"❌ Unexpected error: {type(e).__name__}: {e}")
+        return None
+    
+    finally:
+        UPSTREAM_IN_FLIGHT.dec()
+
+
+async def _wait_for_rate_limit():
+    """Take a token from the upstream rate limiter (MAX_REQUESTS_PER_MINUTE)"""
+    waited = await rate_limiter.acquire()
+    if waited > 0.001:
+        RATE_LIMIT_WAIT_SECONDS.observe(waited)
+
+
+def _retry_after(response: "httpx.Response", default: float = 60.0) -> float:
+    try:
+        return float(response.headers.get("retry-after", default))
+    except ValueError:
+        return default
+
+
+def _record_quota(remaining: str, used: Optional[str]):
+    """Publish the quota headers of the last upstream response as gauges"""
+    try:
+        API_REQUESTS_REMAINING.set(float(remaining))
+        if used:
+            API_REQUESTS_USED.set(float(used))
+    except ValueError:
+        pass
+
+
+async def get_live_odds_many(
+    sport_keys: Iterable[str],
+    regions: str = "us",
+    markets: str = "h2h,spreads,totals",
+    concurrency: int = 5,
+    use_cache: bool = True
+) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Fetch several sports concurrently over the shared client.
+    
+    Args:
+        sport_keys: Sports to fetch
+        regions: Regions to fetch odds for
+        markets: Markets to fetch
+        concurrency: Maximum number of upstream requests in flight at once
+        use_cache: Whether to use cached data if available
+    
+    Returns:
+        Mapping of sport key -> list of game odds data (empty on failure)
+    """
+    sport_keys = list(sport_keys)
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def fetch_one(sport_key: str) -> List[Dict[str, Any]]:
+        async with semaphore:
+            return await get_live_odds(sport_key, regions=regions, markets=markets, use_cache=use_cache)
+
+    results = await asyncio.gather(*(fetch_one(key) for key in sport_keys))
+    return dict(zip(sport_keys, results))
 
 
 async def get_available_sports() -> List[Dict[str, Any]]:
@@ -118,19 +358,57 @@ async def get_available_sports() -> List[Dict[str, Any]]:
     
     params = {"apiKey": API_KEY}
     
-    async with httpx.AsyncClient(timeout=10.0) as client:
-        try:
-            url = BASE_URL
-            response = await client.get(url, params=params)
-            response.raise_for_status()
-            return response.json()
-        except Exception as e:
-            print(f"❌ Error fetching sports list: {e}")
-            return []
+    client = await get_client()
+    try:
+        url = BASE_URL
+        await _wait_for_rate_limit()
+        response = await client.get(url, params=params, timeout=10.0)
+        response.raise_for_status()
+        return response.json()
+    except Exception as e:
+        print(f"❌ Error fetching sports list: {e}")
+        return []
+
+
+SCORES_COST = 2  # credits of a /scores request with daysFrom
+
+
+async def get_scores(sport_key: str, days_from: int = 3) -> Optional[List[Dict[str, Any]]]:
+    """
+    Fetch scores of a sport's live and recently completed events
+    (`/scores`, completed events from up to `days_from` days back, max 3).
+
+    Returns:
+        Events with `completed` and `scores`, or None if unavailable
+    """
+    if not API_KEY or len(API_KEY) < 10:
+        return None
+    if not quota.can_spend(SCORES_COST):
+        UPSTREAM_REQUESTS.inc(sport=sport_key, status="no_credits")
+        return None
+
+    params = {"apiKey": API_KEY, "daysFrom": min(max(days_from, 1), 3)}
+
+    client = await get_client()
+    await _wait_for_rate_limit()
+    try:
+        response = await client.get(f"{BASE_URL}/{sport_key}/scores", params=params)
+        UPSTREAM_REQUESTS.inc(sport=sport_key, status=str(response.status_code))
+        quota.update(response.headers)
+        if response.status_code == 429:
+            rate_limiter.block_for(_retry_after(response))
+        response.raise_for_status()
+        remaining = response.headers.get("x-requests-remaining")
+        if remaining:
+            _record_quota(remaining, response.headers.get("x-requests-used"))
+        return fast_json.loads(response.content)
+    except Exception as e:
+        print(f"❌ Error fetching scores for {sport_key}: {type(e).__name__}: {e}")
+        return None
 
 
 def clear_cache():
     """Clear the odds data cache"""
-    global _cache
-    _cache = {}
+    odds_cache.clear()
+    event_cache.clear()
     print("🗑️  Cache cleared")
@@ -0,0 +1,422 @@
+"""
+On-disk odds history.
+
+Every published payload is appended to a columnar store partitioned by sport
+and UTC day:
+
+    <root>/<sport>/<YYYY-MM-DD>/ts.bin, event.bin, market.bin, book.bin,
+                                selection.bin, point.bin, price.bin
+    <root>/<sport>/<YYYY-MM-DD>/tables.json   (strings behind the int codes)
+    <root>/<sport>/latest.json                (newest raw payload, for warm starts)
+    <root>/<sport>/<YYYY-MM-DD>/payloads/<epoch>.json.gz
+                                              (every raw payload, with keep_payloads;
+                                               replayable by `app.core.backtest`)
+
+Column files are raw little-endian arrays that only ever grow, so readers map
+them with `np.memmap` and never parse JSON. Only prices that moved since the
+previous poll are written, which keeps a day of 10-minute polls small; the
+first poll of each day writes every price, so a day partition stands alone.
+"""
+import gzip
+import os
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.core import fast_json
+from app.core.feed_index import book_key
+
+COLUMNS: Dict[str, np.dtype] = {
+    "ts": np.dtype("<f8"),         # fetch time, epoch seconds
+    "event": np.dtype("<i4"),
+    "market": np.dtype("<i4"),
+    "book": np.dtype("<i4"),
+    "selection": np.dtype("<i4"),  # (outcome name, description)
+    "point": np.dtype("<f8"),      # NaN when the outcome has none
+    "price": np.dtype("<f8"),
+}
+TABLES = ("event", "market", "book", "selection")
+
+# (event, market, book, (name, description), point)
+PriceKey = Tuple[str, str, str, Tuple[str, Optional[str]], Optional[float]]
+
+
+def _day(ts: float) -> str:
+    return datetime.fromtimestamp(ts, timezone.utc).strftime("%Y-%m-%d")
+
+
+def _write_atomic(path: Path, content: bytes):
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_bytes(content)
+    os.replace(tmp, path)
+
+
+class _Partition:
+    """
+    One sport/day directory: append-only column files and their string
+    tables, plus the rows of each event (built incrementally from event.bin)
+    so a query reads only its event's rows.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.tables: Dict[str, list] = {name: [] for name in TABLES}
+        self._codes: Dict[str, dict] = {name: {} for name in TABLES}
+        self._version: Optional[Tuple[int, int]] = None  # tables.json (mtime_ns, size) reflected here
+        self._event_rows: Dict[int, np.ndarray] = {}
+        self._rows_indexed = 0
+        self._maps: Optional[Dict[str, np.ndarray]] = None
+        self.refresh()
+
+    def _tables_version(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = (self.path / "tables.json").stat()
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def refresh(self):
+        """Reload the string tables when another process (the leader) rewrote them"""
+        version = self._tables_version()
+        if version is None or version == self._version:
+            return
+        loaded = fast_json.loads((self.path / "tables.json").read_bytes())
+        for name in TABLES:
+            self.tables[name] = [tuple(v) if isinstance(v, list) else v for v in loaded.get(name, [])]
+        self._codes = {name: {v: i for i, v in enumerate(values)} for name, values in self.tables.items()}
+        self._version = version
+
+    def code(self, table: str, value) -> int:
+        codes = self._codes[table]
+        c = codes.get(value)
+        if c is None:
+            c = codes[value] = len(self.tables[table])
+            self.tables[table].append(value)
+        return c
+
+    def lookup(self, table: str, value) -> Optional[int]:
+        return self._codes[table].get(value)
+
+    def append(self, columns: Dict[str, np.ndarray]):
+        self.path.mkdir(parents=True, exist_ok=True)
+        # Tables first, so every code a reader can see is resolvable
+        _write_atomic(self.path / "tables.json", fast_json.dumps(self.tables))
+        self._version = self._tables_version()
+        for name, dtype in COLUMNS.items():
+            with open(self.path / f"{name}.bin", "ab") as f:
+                f.write(np.ascontiguousarray(columns[name], dtype=dtype).tobytes())
+
+    def columns(self) -> Dict[str, np.ndarray]:
+        """
+        Read-only memory maps of every column, trimmed to the rows all columns
+        have; mapped again only when rows were appended
+        """
+        # Columns are appended in COLUMNS order, so the last one bounds the complete rows
+        last, dtype = list(COLUMNS.items())[-1]
+        try:
+            n = (self.path / f"{last}.bin").stat().st_size // dtype.itemsize
+        except FileNotFoundError:
+            n = 0
+        if n == 0:
+            return {name: np.zeros(0, dtype=dtype) for name, dtype in COLUMNS.items()}
+        if self._maps is None or len(self._maps[last]) != n:
+            self._maps = {
+                name: np.memmap(self.path / f"{name}.bin", dtype=dtype, mode="r", shape=(n,))
+                for name, dtype in COLUMNS.items()
+            }
+        return self._maps
+
+    def event_rows(self, cols: Dict[str, np.ndarray], event: int) -> np.ndarray:
+        """Rows of one event, ascending (so in time order); indexes rows appended since the last call"""
+        n = len(cols["event"])
+        if n > self._rows_indexed:
+            start = self._rows_indexed
+            new = np.asarray(cols["event"][start:n])
+            order = np.argsort(new, kind="stable")
+            codes, first = np.unique(new[order], return_index=True)
+            for code, rows in zip(codes.tolist(), np.split(order + start, first[1:])):
+                known = self._event_rows.get(code)
+                self._event_rows[code] = rows if known is None else np.concatenate([known, rows])
+            self._rows_indexed = n
+        return self._event_rows.get(event, np.zeros(0, dtype=np.int64))
+
+
+@dataclass
+class PriceHistory:
+    """Price points of one (event, market, book), oldest first"""
+    ts: np.ndarray
+    selection: np.ndarray  # index into `selections`
+    point: np.ndarray
+    price: np.ndarray
+    selections: List[Tuple[str, Optional[str]]]
+
+    def __len__(self) -> int:
+        return len(self.ts)
+
+    def to_records(self) -> List[Dict[str, Any]]:
+        return [
+            {
+                "timestamp": datetime.fromtimestamp(ts, timezone.utc).isoformat(),
+                "selection": self.selections[s][0],
+                "description": self.selections[s][1],
+                "point": None if np.isnan(point) else point,
+                "price": price,
+            }
+            for ts, s, point, price in zip(
+                self.ts.tolist(), self.selection.tolist(), self.point.tolist(), self.price.tolist()
+            )
+        ]
+
+
+class OddsStore:
+    """
+    Append-only odds history with per-(event, market, book) range queries.
+    """
+
+    def __init__(self, root: str, keep_payloads: bool = False):
+        self.root = Path(root)
+        self.keep_payloads = keep_payloads
+        self._partitions: Dict[Tuple[str, str], _Partition] = {}
+        # Last price written per line (and the day it went to), so unchanged
+        # prices are not stored again
+        self._last: Dict[str, Dict[PriceKey, float]] = {}
+        self._last_day: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def _partition(self, sport: str, day: str) -> _Partition:
+        partition = self._partitions.get((sport, day))
+        if partition is None:
+            partition = self._partitions[(sport, day)] = _Partition(self.root / sport / day)
+        return partition
+
+    # --- Writes ---
+
+    def append(self, sport: str, data: List[Dict[str, Any]], fetched_at: Optional[float] = None) -> int:
+        """
+        Record one payload.
+
+        Args:
+            sport: Sport key
+            data: Games as returned by The Odds API
+            fetched_at: Epoch seconds the payload was fetched (default: now)
+
+        Returns:
+            Number of price rows written (prices that moved since the last payload)
+        """
+        fetched_at = fetched_at if fetched_at is not None else time.time()
+        day = _day(fetched_at)
+        with self._lock:
+            last = self._last.get(sport)
+            if last is None:
+                # After a restart, seed from the newest payload so it is not rewritten
+                last = self._last[sport] = {}
+                latest = self.latest(sport)
+                if latest is not None:
+                    self._last_day[sport] = _day(latest[1])
+                    last.update(self._prices(latest[0]))
+            if self._last_day.get(sport) != day:
+                last.clear()
+                self._last_day[sport] = day
+
+            partition = self._partition(sport, day)
+            # A new leader continues the previous one's tables
+            partition.refresh()
+            rows = {name: [] for name in COLUMNS}
+            for key, price in self._prices(data):
+                if last.get(key) == price:
+                    continue
+                last[key] = price
+                event, market, book, selection, point = key
+                rows["event"].append(partition.code("event", event))
+                rows["market"].append(partition.code("market", market))
+                rows["book"].append(partition.code("book", book))
+                rows["selection"].append(partition.code("selection", selection))
+                rows["point"].append(point if point is not None else np.nan)
+                rows["price"].append(price)
+
+            n = len(rows["price"])
+            if n:
+                rows["ts"] = [fetched_at] * n
+                partition.append({name: np.asarray(values) for name, values in rows.items()})
+
+            sport_dir = self.root / sport
+            sport_dir.mkdir(parents=True, exist_ok=True)
+            stored = fast_json.dumps({"fetched_at": fetched_at, "data": data})
+            _write_atomic(sport_dir / "latest.json", stored)
+            if self.keep_payloads:
+                payloads = partition.path / "payloads"
+                payloads.mkdir(parents=True, exist_ok=True)
+                with gzip.open(payloads / f"{fetched_at:.3f}.json.gz", "wb") as f:
+                    f.write(stored)
+            return n
+
+    @staticmethod
+    def _prices(data: List[Dict[str, Any]]):
+        for game in data:
+            for book in game.get("bookmakers", []):
+                for market in book.get("markets", []):
+                    for outcome in market.get("outcomes", []):
+                        yield (
+                            (game["id"], market["key"], book["key"],
+                             (outcome["name"], outcome.get("description")), outcome.get("point")),
+                            float(outcome["price"]),
+                        )
+
+    # --- Reads ---
+
+    def latest(self, sport: str) -> Optional[Tuple[List[Dict[str, Any]], float]]:
+        """Newest recorded payload for a sport and its fetch time (epoch seconds)"""
+        path = self.root / sport / "latest.json"
+        if not path.exists():
+            return None
+        stored = fast_json.loads(path.read_bytes())
+        return stored["data"], stored["fetched_at"]
+
+    def days(self, sport: str) -> List[str]:
+        sport_dir = self.root / sport
+        if not sport_dir.exists():
+            return []
+        return sorted(p.name for p in sport_dir.iterdir() if p.is_dir())
+
+    def history(
+        self,
+        sport: str,
+        event_id: str,
+        market: str,
+        book: str,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+    ) -> PriceHistory:
+        """
+        Price history of every outcome of one (event, market, book).
+
+        Args:
+            sport: Sport key
+            event_id: Odds API event id
+            market: Market key (e.g. "h2h", "spreads")
+            book: Bookmaker key
+            start: Inclusive lower bound, epoch seconds
+            end: Inclusive upper bound, epoch seconds
+
+        Returns:
+            PriceHistory, oldest first. Each point is a price change.
+        """
+        start_day = _day(start) if start is not None else ""
+        end_day = _day(end) if end is not None else "9999"
+        parts: List[Dict[str, np.ndarray]] = []
+        selection_codes: Dict[Tuple[str, Optional[str]], int] = {}
+
+        for day in self.days(sport):
+            if not start_day <= day <= end_day:
+                continue
+            # Under the write lock: the leader's own writer thread may be appending
+            with self._lock:
+                partition = self._partition(sport, day)
+                # Followers see the rows and strings the leader appended since.
+                # Columns first: the leader writes tables before columns, so
+                # tables read after them resolve every code they hold.
+                cols = partition.columns()
+                partition.refresh()
+                e = partition.lookup("event", event_id)
+                m = partition.lookup("market", market)
+                b = partition.lookup("book", book)
+                if e is None or m is None or b is None:
+                    continue
+                rows = partition.event_rows(cols, e)
+                selection_table = partition.tables["selection"]
+
+            # The event's rows are in time order, so the range is a slice of them
+            ts = cols["ts"][rows]
+            lo = np.searchsorted(ts, start, side="left") if start is not None else 0
+            hi = np.searchsorted(ts, end, side="right") if end is not None else len(ts)
+            rows, ts = rows[lo:hi], ts[lo:hi]
+            hit = (cols["market"][rows] == m) & (cols["book"][rows] == b)
+            rows = rows[hit]
+
+            # Re-code the selections hit into one table across days
+            codes, inverse = np.unique(cols["selection"][rows], return_inverse=True)
+            local = np.array([
+                selection_codes.setdefault(selection_table[code], len(selection_codes))
+                for code in codes.tolist()
+            ], dtype=np.int64)
+            parts.append({
+                "ts": ts[hit],
+                "selection": local[inverse].reshape(-1),
+                "point": np.asarray(cols["point"][rows]),
+                "price": np.asarray(cols["price"][rows]),
+            })
+        selections = list(selection_codes)
+
+        if not parts:
+            empty = np.zeros(0)
+            return PriceHistory(empty, np.zeros(0, dtype=np.int64), empty, empty, selections)
+        return PriceHistory(
+            ts=np.concatenate([p["ts"] for p in parts]),
+            selection=np.concatenate([p["selection"] for p in parts]),
+            point=np.concatenate([p["point"] for p in parts]),
+            price=np.concatenate([p["price"] for p in parts]),
+            selections=selections,
+        )
+
+    def closing_price(
+        self,
+        sport: str,
+        event_id: str,
+        market: str,
+        book: str,
+        selection: str,
+        point: Optional[float],
+        before: float,
+    ) -> Optional[float]:
+        """
+        Last recorded price of one outcome at or before `before` (its
+        closing line when `before` is the kickoff).
+
+        Args:
+            sport: Sport key
+            event_id: Odds API event id
+            market: Market key ("h2h", "spreads", "totals")
+            book: Bookmaker key or title ("fanduel" / "FanDuel")
+            selection: Outcome name (team, "Draw", "Over" or "Under")
+            point: The outcome's spread or total line, None for moneylines
+            before: Epoch seconds
+
+        Returns:
+            Decimal price, None when the line was never recorded before `before`
+        """
+        wanted_book = book_key(book)
+        last_day = _day(before)
+        for day in reversed(self.days(sport)):
+            if day > last_day:
+                continue
+            with self._lock:
+                partition = self._partition(sport, day)
+                cols = partition.columns()
+                partition.refresh()
+                e = partition.lookup("event", event_id)
+                m = partition.lookup("market", market)
+                if e is None or m is None:
+                    continue
+                rows = partition.event_rows(cols, e)
+                books = [c for c, key in enumerate(partition.tables["book"]) if book_key(key) == wanted_book]
+                selections = [c for c, (name, description) in enumerate(partition.tables["selection"])
+                              if name == selection and description is None]
+            if not books or not selections:
+                continue
+            rows = rows[:np.searchsorted(cols["ts"][rows], before, side="right")]
+            hit = (
+                (cols["market"][rows] == m)
+                & np.isin(cols["book"][rows], books)
+                & np.isin(cols["selection"][rows], selections)
+            )
+            points = cols["point"][rows]
+            hit &= np.isnan(points) if point is None else np.isclose(points, point)
+            if hit.any():
+                return float(cols["price"][rows[np.flatnonzero(hit)[-1]]])
+        return None
+
@@ -0,0 +1,693 @@
+import asyncio
+import threading
+import time
+from bisect import bisect_left
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from app.core import fast_json
+from app.core.arbitrage import scan_arbitrage
+from app.core.feed_index import FeedIndex, FeedQuery, SortKey
+from app.core.config import settings
+from app.core.incremental import IncrementalScanner, ScanDelta
+from app.core.scanner import scan_odds_data
+from app.models.schemas import ArbOpportunity, BetOpportunity
+from app.services.metrics import SCAN_SECONDS
+from app.services.odds_api import get_event_odds_many, get_live_odds, get_live_odds_many, odds_cache, warm_cache
+from app.services.odds_store import OddsStore
+from app.services.props import events_in_window, merge_props
+from app.services.quota import NORMAL, PollPlan, QuotaScheduler, request_cost, scheduler as quota_scheduler
+from app.services.shared_state import LeaderElection, StateBackend, election as leader_election, state as shared_state
+
+# Rendered feed bodies kept per snapshot (distinct thresholds / formats)
+MAX_ENCODED_FEEDS = 16
+# Shared state key of a sport's snapshot
+SNAPSHOT_KEY = "snapshot:"
+
+
+def encode_feed(opportunities: List[BetOpportunity], columnar: bool = False) -> bytes:
+    """Encode an opportunity list as a JSON array, or as columns"""
+    if columnar:
+        return fast_json.dumps_columns(opportunities, BetOpportunity)
+    return fast_json.join_array(fast_json.dumps_each(opportunities))
+
+
+@dataclass(frozen=True)
+class EVSnapshot:
+    """
+    Immutable result of one scan of one sport.
+
+    `opportunities` is sorted by EV (highest first) and `_neg_ev` holds the
+    negated EVs in ascending order, so threshold queries are a bisect plus a
+    slice. Endpoints read a snapshot reference and never see it mutate: a
+    refresh publishes a new object.
+
+    Encoded responses are memoized on the snapshot, so repeated requests for
+    an unchanged feed return the same bytes without re-encoding, and so are
+    the arbs and middles of the payload (`arbitrage`). Memos are filled from
+    the event loop, worker threads (`asyncio.to_thread`) and the poller's
+    writer thread, so each value is computed once, under its own lock
+    (`_memo`); a slow arb scan never blocks reads of other memos.
+    """
+    sport: str
+    opportunities: Tuple[BetOpportunity, ...]
+    data: Tuple[Dict[str, Any], ...]
+    created_at: datetime
+    min_ev_floor: float = 0.0
+    devig_method: str = "multiplicative"
+    sharp_weights: Optional[Dict[str, float]] = field(default=None, compare=False)
+    delta: Optional[ScanDelta] = field(default=None, repr=False)
+    _neg_ev: Tuple[float, ...] = field(default=(), repr=False)
+    # Scans of `data` with other devig methods, computed on first request
+    _alternates: Dict[str, "EVSnapshot"] = field(default_factory=dict, repr=False, compare=False)
+    # Per-opportunity JSON and rendered feed bodies, filled on first request
+    _encoded: Dict[Any, Any] = field(default_factory=dict, repr=False, compare=False)
+    # Sorted per-book / per-market views for filtered and paged queries
+    _index: Dict[str, FeedIndex] = field(default_factory=dict, repr=False, compare=False)
+    # Arbitrage scans of `data`, per (stake, include_middles, max_middle_loss)
+    _arbs: Dict[Tuple[float, bool, float], List[ArbOpportunity]] = field(default_factory=dict, repr=False, compare=False)
+    # Guards the memo dicts' structure and `_locks` (one lock per value being computed)
+    _guard: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+    _locks: Dict[Tuple[int, Any], threading.Lock] = field(default_factory=dict, repr=False, compare=False)
+
+    @classmethod
+    def build(
+        cls,
+        sport: str,
+        data: List[Dict[str, Any]],
+        opportunities: Optional[List[BetOpportunity]] = None,
+        delta: Optional[ScanDelta] = None,
+        min_ev_floor: float = 0.0,
+        devig_method: str = "multiplicative",
+        sharp_weights: Optional[Dict[str, float]] = None,
+        created_at: Optional[datetime] = None,
+    ) -> "EVSnapshot":
+        """
+        Args:
+            sport: Sport key
+            data: Payload the snapshot was computed from
+            opportunities: EV-sorted scan result (scanned from `data` when omitted)
+            delta: Changes relative to the previous snapshot, if known
+            min_ev_floor: Threshold the opportunities were scanned with
+            devig_method: Devig method the opportunities were scanned with
+            sharp_weights: Consensus weights the opportunities were scanned with
+            created_at: When the payload was fetched (default: now)
+        """
+        if opportunities is None:
+            opportunities = scan_odds_data(data, min_ev_floor, devig_method, sharp_weights)
+        opportunities = tuple(opportunities)
+        return cls(
+            sport=sport,
+            opportunities=opportunities,
+            data=tuple(data),
+            created_at=created_at or datetime.now(),
+            min_ev_floor=min_ev_floor,
+            devig_method=devig_method,
+            sharp_weights=sharp_weights,
+            delta=delta,
+            _neg_ev=tuple(-opp.ev_percent for opp in opportunities),
+        )
+
+    def above(self, min_ev: float, devig_method: Optional[str] = None) -> List[BetOpportunity]:
+        """
+        Opportunities with EV strictly above `min_ev`.
+
+        Thresholds below the floor the snapshot was built with cannot be
+        answered from it, so those rescan the stored payload. Other devig
+        methods are scanned once per snapshot and memoized.
+        """
+        if devig_method and devig_method != self.devig_method:
+            return self.with_method(devig_method).above(min_ev)
+        if min_ev < self.min_ev_floor:
+            return scan_odds_data(list(self.data), min_ev, self.devig_method, self.sharp_weights)
+        return list(self.opportunities[:bisect_left(self._neg_ev, -min_ev)])
+
+    def _memo(self, memo: Dict[Any, Any], key: Any, compute: Callable[[], Any], limit: Optional[int] = None) -> Any:
+        """
+        `memo[key]`, computed by `compute()` the first time. Concurrent callers
+        for the same key wait for the one computing it. With `limit`, the
+        oldest entries (other than "items") are evicted to stay under it.
+        """
+        value = memo.get(key)
+        if value is not None:
+            return value
+        lock_key = (id(memo), key)
+        with self._guard:
+            lock = self._locks.setdefault(lock_key, threading.Lock())
+        with lock:
+            value = memo.get(key)
+            if value is None:
+                value = compute()
+                with self._guard:
+                    if limit is not None:
+                        stored = [k for k in memo if k != "items"]
+                        if len(stored) >= limit:
+                            del memo[stored[0]]  # oldest first
+                    memo[key] = value
+        with self._guard:
+            if self._locks.get(lock_key) is lock:
+                del self._locks[lock_key]
+        return value
+
+    def with_method(self, devig_method: str) -> "EVSnapshot":
+        """The same payload scanned with another devig method"""
+        return self._memo(self._alternates, devig_method, lambda: EVSnapshot.build(
+            self.sport, list(self.data), min_ev_floor=self.min_ev_floor,
+            devig_method=devig_method, sharp_weights=self.sharp_weights,
+        ))
+
+    def arbitrage(self, stake: float = 100.0, include_middles: bool = True, max_middle_loss: float = 3.0) -> List[ArbOpportunity]:
+        """Arbs (best first) then middles across every book of the payload (see app.core.arbitrage)"""
+        return self._memo(
+            self._arbs, (stake, include_middles, max_middle_loss),
+            lambda: scan_arbitrage(list(self.data), stake=stake, include_middles=include_middles, max_middle_loss=max_middle_loss),
+            limit=MAX_ENCODED_FEEDS,
+        )
+
+    def encoded_items(self) -> Tuple[bytes, ...]:
+        """JSON of each opportunity, in `opportunities` order"""
+        return self._memo(self._encoded, "items", lambda: tuple(fast_json.dumps_each(self.opportunities)))
+
+    def carry_encodings(self, previous: "EVSnapshot"):
+        """
+        Reuse the previous snapshot's per-opportunity JSON for the objects the
+        incremental scanner carried over, so a refresh only encodes what moved.
+        """
+        items = previous._encoded.get("items")
+        if items is None or "items" in self._encoded:
+            return
+        known = {id(opp): text for opp, text in zip(previous.opportunities, items)}
+        missing = [opp for opp in self.opportunities if id(opp) not in known]
+        fresh = dict(zip(map(id, missing), fast_json.dumps_each(missing)))
+        self._encoded["items"] = tuple(known.get(id(opp)) or fresh[id(opp)] for opp in self.opportunities)
+
+    def encoded_above(self, min_ev: float) -> List[Tuple[BetOpportunity, bytes]]:
+        """`above(min_ev)` paired with each opportunity's JSON"""
+        if min_ev < self.min_ev_floor:
+            opportunities = self.above(min_ev)
+            return list(zip(opportunities, fast_json.dumps_each(opportunities)))
+        n = bisect_left(self._neg_ev, -min_ev)
+        return list(zip(self.opportunities[:n], self.encoded_items()[:n]))
+
+    def feed_json(self, min_ev: float, devig_method: Optional[str] = None, columnar: bool = False) -> bytes:
+        """
+        Encoded `above(min_ev, devig_method)`: a JSON array of opportunities,
+        or with `columnar` the array-of-columns document (see fast_json.dumps_columns).
+        """
+        if devig_method and devig_method != self.devig_method:
+            return self.with_method(devig_method).feed_json(min_ev, columnar=columnar)
+        if min_ev < self.min_ev_floor:
+            return encode_feed(self.above(min_ev), columnar)
+
+        # Thresholds that select the same prefix share one body
+        n = bisect_left(self._neg_ev, -min_ev)
+        if columnar:
+            encode = lambda: fast_json.dumps_columns(self.opportunities[:n], BetOpportunity)
+        else:
+            encode = lambda: fast_json.join_array(self.encoded_items()[:n])
+        return self._memo(self._encoded, ("columns" if columnar else "rows", n), encode, limit=MAX_ENCODED_FEEDS)
+
+    def feed_index(self) -> FeedIndex:
+        return self._memo(self._index, "all", lambda: FeedIndex(self.opportunities))
+
+    def query_json(self, query: FeedQuery, columnar: bool = False) -> Tuple[bytes, Optional[SortKey]]:
+        """
+        Encoded page of a filtered / sorted query, and the cursor of the next
+        page (None on the last one). Plain threshold queries share `feed_json`.
+        """
+        if query.is_plain:
+            return self.feed_json(query.min_ev, columnar=columnar), None
+        if query.min_ev < self.min_ev_floor:
+            # Below the scan threshold: a one-off index over the rescanned list
+            opportunities = self.above(query.min_ev)
+            positions, next_key = FeedIndex(opportunities).query(query)
+            return encode_feed([opportunities[i] for i in positions], columnar), next_key
+        positions, next_key = self.feed_index().query(query)
+        if columnar:
+            return fast_json.dumps_columns([self.opportunities[i] for i in positions], BetOpportunity), next_key
+        items = self.encoded_items()
+        return fast_json.join_array([items[i] for i in positions]), next_key
+
+    @property
+    def age_seconds(self) -> float:
+        return (datetime.now() - self.created_at).total_seconds()
+
+    def to_bytes(self) -> bytes:
+        """
+        Encode for other workers: a header, the opportunities (the memoized
+        per-opportunity JSON) and the payload, one JSON document per line.
+        """
+        header = {
+            "sport": self.sport,
+            "created_at": self.created_at.timestamp(),
+            "min_ev_floor": self.min_ev_floor,
+            "devig_method": self.devig_method,
+            "sharp_weights": self.sharp_weights,
+        }
+        return b"\n".join([fast_json.dumps(header), fast_json.join_array(self.encoded_items()), fast_json.dumps(list(self.data))])
+
+    @classmethod
+    def from_bytes(cls, blob: bytes, delta_from: Optional["EVSnapshot"] = None) -> "EVSnapshot":
+        """
+        Decode `to_bytes` output without rescanning.
+
+        Args:
+            blob: Encoded snapshot
+            delta_from: Snapshot this one replaces; the delta is computed against it
+        """
+        header, items, data = blob.split(b"\n", 2)
+        header = fast_json.loads(header)
+        # Encoded from validated models, so skip validation
+        opportunities = [BetOpportunity.model_construct(**item) for item in fast_json.loads(items)]
+        return cls.build(
+            header["sport"], fast_json.loads(data), opportunities,
+            delta=diff_opportunities(delta_from.opportunities if delta_from else (), opportunities),
+            min_ev_floor=header["min_ev_floor"], devig_method=header["devig_method"],
+            sharp_weights=header["sharp_weights"], created_at=datetime.fromtimestamp(header["created_at"]),
+        )
+
+
+def diff_opportunities(previous: Iterable[BetOpportunity], current: Iterable[BetOpportunity]) -> ScanDelta:
+    """Delta between two opportunity lists, matched by id (for snapshots not scanned here)"""
+    before = {opp.id: opp for opp in previous}
+    delta = ScanDelta()
+    for opp in current:
+        old = before.pop(opp.id, None)
+        if old is None:
+            delta.added.append(opp)
+        elif old != opp:
+            delta.changed.append(opp)
+            delta.replaced.append(old)
+    delta.removed.extend(before.values())
+    return delta
+
+
+class OddsPoller:
+    """
+    Background scheduler that keeps one EVSnapshot per sport up to date.
+
+    Each sport runs its own loop; every refresh fetches the payload once and
+    publishes the result. Scans are incremental: only events whose bookmakers
+    moved since the last refresh are recomputed. With a QuotaScheduler the
+    interval of each sport is re-planned after every poll from the credits
+    left and the sport's schedule; `intervals` are then the starting values.
+
+    Sports listed in `prop_markets` also run a props loop: every
+    `prop_interval` seconds the events starting within `prop_window_hours`
+    are fetched one by one (concurrently) and their prop markets merged into
+    the sport's latest main payload, so main markets are not re-downloaded
+    to refresh props and only the events whose props moved are rescanned.
+
+    With a shared `state` backend (several workers), every published
+    snapshot is written to it. Only the `election` leader polls (`start`);
+    the other workers `follow`, installing the snapshots as they appear, and
+    look there before fetching a sport on demand.
+    """
+
+    def __init__(
+        self,
+        intervals: Dict[str, float],
+        markets: str = "h2h,spreads,totals",
+        store: Optional[OddsStore] = None,
+        scheduler: Optional[QuotaScheduler] = None,
+        regions: str = "us",
+        prop_markets: Optional[Dict[str, str]] = None,
+        prop_window_hours: float = 6.0,
+        prop_interval: float = 900.0,
+        state: Optional[StateBackend] = None,
+        election: Optional[LeaderElection] = None,
+        follow_interval: float = 1.0,
+    ):
+        self.intervals = intervals
+        self.markets = markets
+        self.regions = regions
+        self.store = store
+        self.scheduler = scheduler
+        self.prop_markets = prop_markets or {}
+        self.prop_window_hours = prop_window_hours
+        self.prop_interval = prop_interval
+        self._snapshots: Dict[str, EVSnapshot] = {}
+        self._scanners: Dict[str, IncrementalScanner] = {}
+        # Latest main-market payload and per-event prop payloads of each sport
+        self._main: Dict[str, List[Dict[str, Any]]] = {}
+        self._props: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._prop_tasks: Dict[str, asyncio.Task] = {}
+        self._listeners: List[Callable[[str, ScanDelta], Any]] = []
+        self.state = state if state is not None and state.shared else None
+        self.election = election
+        self.follow_interval = follow_interval
+        # Version of each shared snapshot key this worker wrote or installed last
+        self._seen: Dict[str, Any] = {}
+        self._follow_task: Optional[asyncio.Task] = None
+        # Disk writes of published snapshots (shared state, odds store) run off
+        # the event loop, on one thread so each sport's writes land in order
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="poller-writer")
+
+    def add_listener(self, callback: Callable[[str, ScanDelta], Any]):
+        """Register `callback(sport, delta)`, called after every publish"""
+        self._listeners.append(callback)
+
+    # --- Reads ---
+
+    def get_snapshot(self, sport: str) -> Optional[EVSnapshot]:
+        return self._snapshots.get(sport)
+
+    def sports(self) -> List[str]:
+        """Sports that currently have a snapshot"""
+        return list(self._snapshots)
+
+    def plan(self, sport: str) -> PollPlan:
+        """Next refresh of a sport: its interval, and whether it may spend credits now"""
+        cost = request_cost(self.markets, self.regions)
+        base = self.intervals.get(sport)
+        if self.scheduler is None:
+            return PollPlan(base or settings.POLL_INTERVAL_SECONDS, True, 0.0, cost, NORMAL)
+        return self.scheduler.plan(sport, cost, base)
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            sport: {
+                "interval_seconds": round(plan.interval, 1),
+                "polling": plan.poll,
+                "priority": round(plan.priority, 2),
+                "quota_mode": plan.mode,
+                "running": sport in self._tasks and not self._tasks[sport].done(),
+                "prop_events": len(self._props.get(sport, {})),
+                "opportunities": len(snap.opportunities) if snap else 0,
+                "age_seconds": round(snap.age_seconds, 1) if snap else None,
+                "last_delta": snap.delta.summary() if snap and snap.delta else None,
+            }
+            for sport in set(self.intervals) | set(self._snapshots)
+            for snap, plan in [(self._snapshots.get(sport), self.plan(sport))]
+        }
+
+    # --- Refresh ---
+
+    def publish(
+        self,
+        sport: str,
+        data: List[Dict[str, Any]],
+        fetched_at: Optional[float] = None,
+        record: bool = True,
+    ) -> EVSnapshot:
+        """
+        Scan a payload and swap it in as the current snapshot for the sport.
+
+        Args:
+            sport: Sport key
+            data: Games as returned by The Odds API
+            fetched_at: Epoch seconds the payload was fetched (default: now)
+            record: Append the payload to the odds store, if one is configured
+                (only the leader writes the store)
+        """
+        scanner = self._scanners.get(sport)
+        if scanner is None:
+            scanner = self._scanners[sport] = IncrementalScanner(
+                sharp_weights=settings.SHARP_BOOKS, devig_method=settings.DEVIG_METHOD,
+            )
+        with SCAN_SECONDS.time(sport=sport):
+            delta = scanner.update(data)
+            current = self._snapshots.get(sport)
+            if current is not None and delta.is_empty:
+                opportunities = list(current.opportunities)
+            else:
+                opportunities = scanner.opportunities()
+        snapshot = EVSnapshot.build(
+            sport, data, opportunities, delta=delta,
+            min_ev_floor=scanner.min_ev_threshold, devig_method=scanner.devig_method,
+            sharp_weights=scanner.sharp_weights,
+            created_at=datetime.fromtimestamp(fetched_at) if fetched_at is not None else None,
+        )
+        if current is not None:
+            snapshot.carry_encodings(current)
+        self._snapshots[sport] = snapshot
+        if self.scheduler is not None:
+            self.scheduler.observe(sport, data)
+        store = self.store if self.is_leader else None
+        if record and (self.state is not None or store is not None):
+            # Stamped now: the write itself may run a little later
+            stamp = fetched_at if fetched_at is not None else time.time()
+            self._writer.submit(self._persist, snapshot, data, stamp, store)
+        for callback in self._listeners:
+            callback(sport, delta)
+        return snapshot
+
+    async def refresh(self, sport: str, use_cache: bool = True) -> Optional[EVSnapshot]:
+        if use_cache and self.state is not None:
+            # Another worker may have fetched it within the cache lifetime
+            await self.sync_shared([sport])
+            snapshot = self._snapshots.get(sport)
+            if snapshot is not None and snapshot.age_seconds < odds_cache.ttl:
+                return snapshot
+        data = await get_live_odds(sport_key=sport, regions=self.regions, markets=self.markets, use_cache=use_cache)
+        if not data:
+            return self._snapshots.get(sport)
+        return self._publish_main(sport, data)
+
+    def _publish_main(self, sport: str, data: List[Dict[str, Any]]) -> EVSnapshot:
+        """Publish a new main-market payload together with the props already fetched for it"""
+        self._main[sport] = data
+        props = self._props.get(sport)
+        if props:
+            # Props of events that left the slate are dropped with them
+            live_ids = {game["id"] for game in data}
+            props = self._props[sport] = {event_id: event for event_id, event in props.items() if event_id in live_ids}
+        return self.publish(sport, merge_props(data, props or {}))
+
+    async def refresh_props(self, sport: str, use_cache: bool = False) -> Optional[EVSnapshot]:
+        """
+        Fetch props for the sport's events starting within the window and
+        republish the merged payload. Needs the sport's main payload.
+
+        Returns:
+            The new snapshot, or None when nothing was fetched
+        """
+        markets = self.prop_markets.get(sport)
+        main = self._main.get(sport)
+        if not markets or not main:
+            return None
+        event_ids = events_in_window(main, self.prop_window_hours)
+        if self.scheduler is not None:
+            # Props are extras: spend on them only while credits are plentiful
+            cost = request_cost(markets, self.regions)
+            if self.scheduler.quota.mode(cost * max(len(event_ids), 1)) != NORMAL:
+                return None
+        if not event_ids:
+            return None
+
+        fetched = await get_event_odds_many(
+            sport, event_ids, regions=self.regions, markets=markets,
+            concurrency=settings.FETCH_CONCURRENCY, use_cache=use_cache,
+        )
+        props = self._props.setdefault(sport, {})
+        updated = 0
+        for event_id, event in fetched.items():
+            # A failed fetch keeps the props from the previous round
+            if event is not None:
+                props[event_id] = event
+                updated += 1
+        if not updated:
+            return None
+        return self._publish_main(sport, self._main[sport])
+
+    async def ensure_snapshots(self, sports: Iterable[str]) -> Dict[str, EVSnapshot]:
+        """Return snapshots for `sports`, fetching any that are missing concurrently"""
+        sports = list(sports)
+        missing = [sport for sport in sports if sport not in self._snapshots]
+        if missing and self.state is not None:
+            await self.sync_shared(missing)
+            missing = [sport for sport in sports if sport not in self._snapshots]
+        if missing:
+            payloads = await get_live_odds_many(missing, regions=self.regions, markets=self.markets, concurrency=settings.FETCH_CONCURRENCY)
+            for sport, data in payloads.items():
+                if data:
+                    self._publish_main(sport, data)
+        return {sport: self._snapshots[sport] for sport in sports if sport in self._snapshots}
+
+    def warm_from_store(self) -> List[str]:
+        """
+        Restore each polled sport's newest recorded payload into the cache and
+        the snapshots, so a restart does not spend upstream quota. Returns the
+        sports that were restored.
+        """
+        if self.store is None:
+            return []
+        warmed = []
+        for sport in self.intervals:
+            try:
+                latest = self.store.latest(sport)
+            except (OSError, ValueError) as e:
+                print(f"❌ Could not read recorded odds for {sport}: {e}")
+                continue
+            if latest is None:
+                continue
+            data, fetched_at = latest
+            warm_cache(sport, data, age_seconds=max(time.time() - fetched_at, 0.0), regions=self.regions, markets=self.markets)
+            # The recorded payload already carries the props that were merged into it
+            self._main[sport] = data
+            self.publish(sport, data, fetched_at=fetched_at, record=False)
+            warmed.append(sport)
+        return warmed
+
+    # --- Shared state ---
+
+    @property
+    def is_leader(self) -> bool:
+        """Whether this worker polls and records (always, without shared state)"""
+        return self.state is None or self.election is None or self.election.is_leader
+
+    def _persist(self, snapshot: EVSnapshot, data: List[Dict[str, Any]], fetched_at: float, store: Optional[OddsStore]):
+        """Write a published snapshot to shared state and its payload to the store (writer thread)"""
+        if self.state is not None:
+            self._share(snapshot)
+        if store is not None:
+            try:
+                store.append(snapshot.sport, data, fetched_at)
+            except Exception as e:
+                print(f"❌ Could not record odds for {snapshot.sport}: {type(e).__name__}: {e}")
+
+    async def flush(self):
+        """Wait for the disk writes of everything published so far"""
+        await asyncio.wrap_future(self._writer.submit(lambda: None))
+
+    def _share(self, snapshot: EVSnapshot):
+        key = SNAPSHOT_KEY + snapshot.sport
+        try:
+            self.state.put(key, snapshot.to_bytes())
+            self._seen[key] = self.state.version(key)
+        except Exception as e:
+            print(f"❌ Could not share snapshot for {snapshot.sport}: {type(e).__name__}: {e}")
+
+    def _load_shared(self, key: str) -> Optional[Tuple[Any, EVSnapshot]]:
+        """(version, snapshot) of a shared key; runs in a worker thread"""
+        version = self.state.version(key)
+        entry = self.state.get(key)
+        if entry is None:
+            return None
+        return version, EVSnapshot.from_bytes(entry[0], delta_from=self._snapshots.get(key[len(SNAPSHOT_KEY):]))
+
+    async def sync_shared(self, sports: Optional[Iterable[str]] = None) -> List[str]:
+        """
+        Install the snapshots other workers wrote since the last sync.
+
+        Args:
+            sports: Only these sports (default: every shared snapshot)
+
+        Returns:
+            The sports whose snapshot was replaced
+        """
+        if self.state is None:
+            return []
+        keys = self.state.keys(SNAPSHOT_KEY) if sports is None else [SNAPSHOT_KEY + sport for sport in sports]
+        installed = []
+        for key in keys:
+            version = self.state.version(key)
+            if version is None or version == self._seen.get(key):
+                continue
+            loaded = await asyncio.to_thread(self._load_shared, key)
+            if loaded is None:
+                continue
+            self._seen[key], snapshot = loaded
+            current = self._snapshots.get(snapshot.sport)
+            if current is not None and current.created_at >= snapshot.created_at:
+                continue
+            self._snapshots[snapshot.sport] = snapshot
+            installed.append(snapshot.sport)
+            for callback in self._listeners:
+                callback(snapshot.sport, snapshot.delta)
+        return installed
+
+    def follow(self):
+        """Install the leader's snapshots as they are written (followers)"""
+        if self.state is not None and (self._follow_task is None or self._follow_task.done()):
+            self._follow_task = asyncio.create_task(self._follow(), name="follow")
+
+    async def _follow(self):
+        while True:
+            try:
+                await self.sync_shared()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"❌ Reading shared snapshots failed: {type(e).__name__}: {e}")
+            await asyncio.sleep(self.follow_interval)
+
+    # --- Lifecycle ---
+
+    def start(self):
+        """Start polling (the leader); a worker that was following stops"""
+        if self._follow_task is not None:
+            self._follow_task.cancel()
+            self._follow_task = None
+        for sport in self.intervals:
+            if sport not in self._tasks or self._tasks[sport].done():
+                self._tasks[sport] = asyncio.create_task(self._run(sport), name=f"poll:{sport}")
+            if sport in self.prop_markets and (sport not in self._prop_tasks or self._prop_tasks[sport].done()):
+                self._prop_tasks[sport] = asyncio.create_task(self._run_props(sport), name=f"props:{sport}")
+
+    async def stop(self):
+        tasks = list(self._tasks.values()) + list(self._prop_tasks.values())
+        if self._follow_task is not None:
+            tasks.append(self._follow_task)
+            self._follow_task = None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks.clear()
+        self._prop_tasks.clear()
+        await self.flush()
+
+    async def _run(self, sport: str):
+        # A snapshot restored from disk counts as the last poll
+        snapshot = self._snapshots.get(sport)
+        if snapshot is not None:
+            await asyncio.sleep(max(self.plan(sport).interval - snapshot.age_seconds, 0.0))
+        paused = False
+        while True:
+            plan = self.plan(sport)
+            if plan.poll:
+                paused = False
+                try:
+                    # The poller is the cache's writer, so always go upstream
+                    await self.refresh(sport, use_cache=False)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    print(f"❌ Poll failed for {sport}: {type(e).__name__}: {e}")
+                plan = self.plan(sport)
+            elif not paused:
+                # Low on credits: keep serving the last snapshot, check again later
+                paused = True
+                print(f"⛽ Pausing polls for {sport} ({plan.mode} quota, priority {plan.priority:g}).")
+            await asyncio.sleep(plan.interval)
+
+    async def _run_props(self, sport: str):
+        while sport not in self._main:
+            # Props are keyed to the events of the main payload
+            await asyncio.sleep(1.0)
+        while True:
+            try:
+                await self.refresh_props(sport)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"❌ Prop poll failed for {sport}: {type(e).__name__}: {e}")
+            await asyncio.sleep(self.prop_interval)
+
+
+poller = OddsPoller(
+    settings.POLL_INTERVALS,
+    markets=settings.DEFAULT_MARKETS,
+    store=OddsStore(settings.ODDS_STORE_DIR, keep_payloads=settings.ODDS_STORE_KEEP_PAYLOADS) if settings.ENABLE_ODDS_STORE else None,
+    scheduler=quota_scheduler,
+    regions=settings.DEFAULT_REGIONS,
+    prop_markets=settings.PROP_MARKETS if settings.ENABLE_PROPS else None,
+    prop_window_hours=settings.PROP_WINDOW_HOURS,
+    prop_interval=settings.PROP_POLL_INTERVAL_SECONDS,
+    state=shared_state,
+    election=leader_election,
+    follow_interval=settings.STATE_FOLLOW_INTERVAL_SECONDS,
+)
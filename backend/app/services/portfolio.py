@@ -0,0 +1,281 @@
+"""
+Portfolio analytics from incrementally maintained aggregates.
+
+Every saved bet adds to a handful of `PortfolioAggregate` rows: the whole
+portfolio, its sport, book, market and day. Settling a bet moves it from
+pending to its result in the same rows, and adds its profit to the day
+it settled (the bankroll curve). The changes are applied as one
+`INSERT ... ON CONFLICT DO UPDATE SET col = col + excluded.col` per batch,
+in the transaction that saves or settles the bets. `/portfolio/stats`
+then reads O(groups) rows however many bets there are.
+
+    await record_saved(session, bets)  # POST /bets, /bets/bulk
+    await record_settled(session, rows, result, settled_at)  # settlement
+    await portfolio_stats(session)  # GET /portfolio/stats
+"""
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlmodel import func, select
+
+from app.core.grading import LOST, PUSH, WON, parse_market, profit
+from app.core.math_logic import to_decimal
+from app.models.tables import PortfolioAggregate, SavedBet
+
+GroupKey = Tuple[str, str]
+Deltas = Dict[GroupKey, Dict[str, float]]
+
+SUM_COLUMNS = (
+    "bets", "pending", "won", "lost", "push", "staked", "settled_staked", "profit",
+    "ev_sum", "expected_profit", "settled_expected_profit", "clv_sum", "clv_bets",
+)
+# Bets read per query when rebuilding the aggregates from scratch
+REBUILD_BATCH = 5000
+# Groups per upsert statement (15 bind parameters each)
+UPSERT_CHUNK = 500
+_RESULT_COLUMNS = {WON: "won", LOST: "lost", PUSH: "push"}
+
+
+def decimal_odds(odds: float) -> float:
+    """Saved odds as a decimal price (American odds are converted)"""
+    return to_decimal(odds) if abs(odds) >= 100 else odds
+
+
+def valid_odds(odds: float) -> bool:
+    """Saved odds are American (|odds| >= 100) or a decimal price above 1"""
+    return abs(odds) >= 100 or odds > 1
+
+
+def _groups(bet: Any) -> List[GroupKey]:
+    market_key, _ = parse_market(bet.market, bet.point)
+    return [
+        ("all", ""),
+        ("sport", bet.sport),
+        ("book", bet.book),
+        ("market", market_key or "unknown"),
+        ("day", (bet.timestamp or "")[:10] or "unknown"),
+    ]
+
+
+def _add(deltas: Deltas, groups: Iterable[GroupKey], values: Dict[str, float]):
+    for group in groups:
+        row = deltas[group]
+        for column, value in values.items():
+            row[column] = row.get(column, 0.0) + value
+
+
+def _saved_values(bet: Any) -> Dict[str, float]:
+    values = {
+        "bets": 1,
+        "pending": 1,
+        "staked": bet.stake,
+        "ev_sum": bet.ev_percent,
+        "expected_profit": bet.stake * bet.ev_percent / 100,
+    }
+    if bet.closing_odds:
+        values.update(_clv_values(bet.odds, bet.closing_odds))
+    return values
+
+
+def _clv_values(odds: float, closing_odds: float) -> Dict[str, float]:
+    if not (valid_odds(odds) and valid_odds(closing_odds)):
+        return {}
+    return {"clv_sum": (decimal_odds(odds) / decimal_odds(closing_odds) - 1) * 100, "clv_bets": 1}
+
+
+def _settled_values(bet: Any, result: str) -> Dict[str, float]:
+    values = {"pending": -1, _RESULT_COLUMNS[result]: 1}
+    # Bets saved with invalid odds (before /bets checked them) have no
+    # profit to book: they count as settled but stay out of P&L and ROI
+    if valid_odds(bet.odds):
+        values.update({
+            "settled_staked": bet.stake,
+            "profit": profit(result, bet.stake, decimal_odds(bet.odds)),
+            "settled_expected_profit": bet.stake * bet.ev_percent / 100,
+        })
+    return values
+
+
+def _add_bet(deltas: Deltas, bet: Any):
+    """Contribution of a bet in its current state (saved, and settled unless pending)"""
+    groups = _groups(bet)
+    _add(deltas, groups, _saved_values(bet))
+    if bet.status in _RESULT_COLUMNS:
+        values = _settled_values(bet, bet.status)
+        _add(deltas, groups, values)
+        # Bets imported as settled count on the day they were placed
+        if "profit" in values:
+            _add(deltas, [("settled_day", (bet.settled_at or bet.timestamp or "")[:10] or "unknown")], {"profit": values["profit"]})
+
+
+async def _apply(session, deltas: Deltas):
+    """Add `deltas` to the aggregate rows, one upsert per UPSERT_CHUNK groups"""
+    rows = [
+        {"dimension": dimension, "key": key, **{column: values.get(column, 0) for column in SUM_COLUMNS}}
+        for (dimension, key), values in deltas.items()
+    ]
+    insert = postgresql.insert if session.bind.dialect.name == "postgresql" else sqlite.insert
+    table = PortfolioAggregate.__table__
+    for i in range(0, len(rows), UPSERT_CHUNK):
+        statement = insert(PortfolioAggregate).values(rows[i:i + UPSERT_CHUNK])
+        statement = statement.on_conflict_do_update(
+            index_elements=["dimension", "key"],
+            set_={column: table.c[column] + statement.excluded[column] for column in SUM_COLUMNS},
+        )
+        await session.exec(statement)
+
+
+async def record_saved(session, bets: Iterable[SavedBet]):
+    """Add newly saved bets to the aggregates (same transaction as the insert)"""
+    deltas: Deltas = defaultdict(dict)
+    for bet in bets:
+        _add_bet(deltas, bet)
+    await _apply(session, deltas)
+
+
+async def record_settled(
+    session,
+    bets: Iterable[Any],
+    result: str,
+    settled_at: str,
+    closing: Optional[Mapping[int, float]] = None,
+):
+    """
+    Move bets that were just settled from pending to `result`.
+
+    Args:
+        bets: Rows with id, sport, book, market, point, timestamp, stake, odds and ev_percent
+        result: WON, LOST or PUSH
+        settled_at: ISO time of settlement (its day is the bankroll curve bucket)
+        closing: Closing prices filled in at settlement, by bet id (adds their CLV)
+    """
+    deltas: Deltas = defaultdict(dict)
+    for bet in bets:
+        values = _settled_values(bet, result)
+        if closing and bet.id in closing:
+            values.update(_clv_values(bet.odds, closing[bet.id]))
+        _add(deltas, _groups(bet), values)
+        if "profit" in values:
+            _add(deltas, [("settled_day", settled_at[:10])], {"profit": values["profit"]})
+    await _apply(session, deltas)
+
+
+async def rebuild(session) -> int:
+    """
+    Recompute every aggregate from the bets table (existing databases, or
+    after editing bets by hand). Returns the number of bets read.
+    """
+    await session.exec(PortfolioAggregate.__table__.delete())
+    deltas: Deltas = defaultdict(dict)
+    last_id, count = 0, 0
+    while True:
+        bets = (await session.exec(
+            select(SavedBet).where(SavedBet.id > last_id).order_by(SavedBet.id).limit(REBUILD_BATCH)
+        )).all()
+        if not bets:
+            break
+        for bet in bets:
+            _add_bet(deltas, bet)
+        count += len(bets)
+        last_id = bets[-1].id
+    await _apply(session, deltas)
+    return count
+
+
+async def needs_rebuild(session) -> bool:
+    """Bets exist but no aggregates do (bets saved before aggregates were kept)"""
+    aggregated = (await session.exec(
+        select(PortfolioAggregate.bets).where(PortfolioAggregate.dimension == "all")
+    )).first() or 0
+    if aggregated:
+        return False
+    return bool((await session.exec(select(func.count()).select_from(SavedBet))).one())
+
+
+def _summary(row: Any) -> Dict[str, Any]:
+    settled = row.won + row.lost + row.push
+    return {
+        "bets": int(row.bets),
+        "pending": int(row.pending),
+        "settled": int(settled),
+        "won": int(row.won),
+        "lost": int(row.lost),
+        "push": int(row.push),
+        "turnover": round(row.staked, 2),
+        "pnl": round(row.profit, 2),
+        "roi_percent": round(row.profit / row.settled_staked * 100, 3) if row.settled_staked else None,
+        "win_rate": round(row.won / (row.won + row.lost), 4) if row.won + row.lost else None,
+        "avg_ev_percent": round(row.ev_sum / row.bets, 3) if row.bets else None,
+        "expected_pnl": round(row.settled_expected_profit, 2),
+        "pnl_vs_expected": round(row.profit - row.settled_expected_profit, 2),
+        "avg_clv_percent": round(row.clv_sum / row.clv_bets, 3) if row.clv_bets else None,
+    }
+
+
+def _bucket(day: str, bucket: str) -> str:
+    """Start of the day's week (Monday) or month, as YYYY-MM-DD"""
+    if bucket == "day":
+        return day
+    try:
+        start = date.fromisoformat(day)
+    except ValueError:
+        return day
+    if bucket == "week":
+        return (start - timedelta(days=start.weekday())).isoformat()
+    return start.replace(day=1).isoformat()
+
+
+class _Row:
+    """Sum of aggregate rows (days folded into weeks or months)"""
+
+    def __init__(self):
+        for column in SUM_COLUMNS:
+            setattr(self, column, 0.0)
+
+    def add(self, row: Any):
+        for column in SUM_COLUMNS:
+            setattr(self, column, getattr(self, column) + getattr(row, column))
+
+
+async def portfolio_stats(session, bucket: str = "day", starting_bankroll: float = 1000.0) -> Dict[str, Any]:
+    """
+    Portfolio totals, per-group breakdowns, time buckets and bankroll curve.
+
+    Args:
+        bucket: Time bucket of `by_time` and the bankroll curve: day, week or month
+        starting_bankroll: Bankroll the curve starts from
+    """
+    rows = (await session.exec(select(PortfolioAggregate))).all()
+    by_dimension: Dict[str, Dict[str, Any]] = defaultdict(dict)
+    for row in rows:
+        by_dimension[row.dimension][row.key] = row
+
+    def grouped(dimension: str) -> List[Dict[str, Any]]:
+        groups = by_dimension.get(dimension, {})
+        items = [{"key": key, **_summary(row)} for key, row in groups.items() if row.bets]
+        return sorted(items, key=lambda item: item["turnover"], reverse=True)
+
+    def bucketed(dimension: str) -> Dict[str, _Row]:
+        buckets: Dict[str, _Row] = defaultdict(_Row)
+        for day, row in by_dimension.get(dimension, {}).items():
+            buckets[_bucket(day, bucket)].add(row)
+        return dict(sorted(buckets.items()))
+
+    total = by_dimension.get("all", {}).get("")
+    curve, bankroll = [], starting_bankroll
+    for period, row in bucketed("settled_day").items():
+        bankroll += row.profit
+        curve.append({"period": period, "pnl": round(row.profit, 2), "bankroll": round(bankroll, 2)})
+
+    return {
+        "totals": _summary(total) if total is not None else _summary(_Row()),
+        "by_sport": grouped("sport"),
+        "by_book": grouped("book"),
+        "by_market": grouped("market"),
+        "by_time": [{"period": period, **_summary(row)} for period, row in bucketed("day").items()],
+        "bucket": bucket,
+        "bankroll_curve": curve,
+        "generated_at": datetime.now().isoformat(),
+    }
@@ -0,0 +1,114 @@
+"""
+Sampling profiler for a live worker.
+
+A daemon thread wakes `hz` times a second, walks every other thread's current
+Python stack (`sys._current_frames`) and counts identical stacks. Nothing is
+traced between samples, so a running profile costs the sampling thread's
+own work and can be switched on and off in production without a restart.
+
+Results are in the folded-stack format ("a;b;c 42" per line) read by
+flamegraph.pl, speedscope and inferno.
+"""
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, Optional
+
+
+class SamplingProfiler:
+    """Start/stop stack sampler; one profile at a time"""
+
+    def __init__(self, max_depth: int = 128):
+        self.max_depth = max_depth
+        self._stacks: Counter = Counter()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self.hz = 0.0
+        self.samples = 0
+        self.started_at: Optional[float] = None
+        self.stopped_at: Optional[float] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, hz: float = 100.0, duration: Optional[float] = None) -> bool:
+        """
+        Begin sampling, discarding the previous profile.
+
+        Args:
+            hz: Samples per second
+            duration: Stop by itself after this many seconds (None = until stop())
+
+        Returns:
+            False if a profile is already running
+        """
+        with self._lock:
+            if self.running:
+                return False
+            self._stacks = Counter()
+            self.samples = 0
+            self.hz = hz
+            self.started_at, self.stopped_at = time.time(), None
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._sample, args=(1.0 / hz, duration), name="sampling-profiler", daemon=True
+            )
+            self._thread.start()
+            return True
+
+    def stop(self) -> str:
+        """Stop sampling (if running) and return the folded stacks"""
+        thread = self._thread
+        if thread is not None:
+            self._stop.set()
+            thread.join()
+        return self.folded()
+
+    def folded(self) -> str:
+        """Profile so far in folded-stack format, hottest stacks first"""
+        stacks = list(self._stacks.most_common())
+        return "".join(f"{stack} {count}\n" for stack, count in stacks)
+
+    def status(self) -> Dict[str, Any]:
+        end = self.stopped_at or time.time()
+        return {
+            "running": self.running,
+            "hz": self.hz,
+            "samples": self.samples,
+            "distinct_stacks": len(self._stacks),
+            "seconds": round(end - self.started_at, 1) if self.started_at else 0.0,
+        }
+
+    def _sample(self, interval: float, duration: Optional[float]):
+        own = threading.get_ident()
+        names = {}
+        deadline = time.monotonic() + duration if duration else None
+        next_at = time.monotonic()
+        while not self._stop.is_set():
+            if deadline is not None and time.monotonic() >= deadline:
+                break
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                self._stacks[self._fold(frame, names)] += 1
+            self.samples += 1
+            next_at += interval
+            self._stop.wait(max(next_at - time.monotonic(), 0.0))
+        self.stopped_at = time.time()
+
+    def _fold(self, frame, names: Dict[Any, str]) -> str:
+        parts = []
+        while frame is not None and len(parts) < self.max_depth:
+            code = frame.f_code
+            name = names.get(code)
+            if name is None:
+                name = names[code] = f"{code.co_name} ({code.co_filename}:{code.co_firstlineno})"
+            parts.append(name)
+            frame = frame.f_back
+        return ";".join(reversed(parts))
+
+
+profiler = SamplingProfiler()
@@ -0,0 +1,72 @@
+"""
+Player props fetched per event.
+
+The sport-wide odds endpoint does not serve player props, and the per-event
+endpoint bills every event separately, so props are fetched only for events
+starting soon and merged into the sport's main payload. The merged payload
+looks like a normal Odds API payload (props are extra markets on each
+bookmaker), so the scanner, the incremental diff and the odds store need no
+special casing.
+"""
+import hashlib
+import time
+from typing import Any, Dict, List, Optional
+
+from app.core import fast_json
+from app.core.incremental import PROPS_VERSION_KEY
+from app.services.quota import kickoff_time
+
+
+def events_in_window(games: List[Dict[str, Any]], window_hours: float, now: Optional[float] = None) -> List[str]:
+    """
+    Ids of the events that have not started yet and start within `window_hours`,
+    soonest first.
+    """
+    now = now if now is not None else time.time()
+    upcoming = []
+    for game in games:
+        kickoff = kickoff_time(game)
+        if kickoff is not None and now <= kickoff <= now + window_hours * 3600:
+            upcoming.append((kickoff, game["id"]))
+    return [event_id for _, event_id in sorted(upcoming)]
+
+
+def merge_props(games: List[Dict[str, Any]], props: Dict[str, Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Main-market payload with each event's prop markets added.
+
+    Args:
+        games: Sport payload (h2h / spreads / totals)
+        props: Event id -> per-event odds payload with the prop markets
+
+    Returns:
+        New list of games; games without props are returned as they are.
+        Prop markets replace main markets with the same key.
+    """
+    if not props:
+        return games
+    merged = []
+    for game in games:
+        event = props.get(game["id"])
+        if not event or not event.get("bookmakers"):
+            merged.append(game)
+            continue
+
+        books: Dict[str, Dict[str, Any]] = {}
+        for book in game.get("bookmakers", []):
+            books[book["key"]] = book
+        for prop_book in event["bookmakers"]:
+            book = books.get(prop_book["key"])
+            prop_markets = prop_book.get("markets", [])
+            prop_keys = {market["key"] for market in prop_markets}
+            version = prop_book.get("last_update") or hashlib.blake2b(fast_json.dumps(prop_markets), digest_size=8).hexdigest()
+            if book is None:
+                books[prop_book["key"]] = {**prop_book, PROPS_VERSION_KEY: version}
+            else:
+                books[prop_book["key"]] = {
+                    **book,
+                    "markets": [m for m in book.get("markets", []) if m["key"] not in prop_keys] + prop_markets,
+                    PROPS_VERSION_KEY: version,
+                }
+        merged.append({**game, "bookmakers": list(books.values())})
+    return merged
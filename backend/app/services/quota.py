@@ -0,0 +1,301 @@
+"""
+Upstream quota budgeting.
+
+The Odds API bills every odds request `markets x regions` credits and
+reports the balance in response headers (`x-requests-remaining`,
+`x-requests-used`, `x-requests-last`). This module keeps that balance, rate
+limits upstream calls with a token bucket, and plans each sport's poll
+interval so the credits left last until the quota resets:
+
+- the spend rate is (remaining - reserve) / time until reset
+- it is shared between sports by priority: live events and imminent kickoffs
+  weigh the most, sports with nothing scheduled barely poll
+- below the reserve only sports with live or imminent games are polled, and
+  with no credits left nothing is (endpoints serve the cached payloads)
+"""
+import asyncio
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Mapping, Optional
+
+from app.core.config import settings
+
+# Poll modes, from plenty of credits to none
+NORMAL = "normal"
+CONSERVE = "conserve"
+EXHAUSTED = "exhausted"
+
+# (hours until kickoff, weight): first row whose bound is above the event's
+# time to kickoff. Events that started up to LIVE_HOURS ago count as live.
+LIVE_HOURS = 4.0
+LIVE_WEIGHT = 8.0
+KICKOFF_WEIGHTS = ((1.0, 4.0), (6.0, 2.0), (24.0, 1.0), (72.0, 0.25))
+# In CONSERVE mode only sports with an event live or starting within this many hours poll
+URGENT_HOURS = 1.0
+
+
+def request_cost(markets: str, regions: str = "us") -> int:
+    """Credits one odds request costs: number of markets x number of regions"""
+    n_markets = len([m for m in markets.split(",") if m.strip()])
+    n_regions = len([r for r in regions.split(",") if r.strip()])
+    return max(n_markets, 1) * max(n_regions, 1)
+
+
+class TokenBucket:
+    """
+    Async token bucket: `rate` tokens per second, bursts up to `capacity`.
+    Waiters are served in arrival order.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock: Optional[asyncio.Lock] = None
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self, tokens: float = 1.0) -> bool:
+        now = time.monotonic()
+        if now < self._blocked_until:
+            return False
+        self._refill(now)
+        if self._tokens >= tokens:
+            self._tokens -= tokens
+            return True
+        return False
+
+    async def acquire(self, tokens: float = 1.0) -> float:
+        """Wait until `tokens` are available and take them. Returns the seconds waited."""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        start = time.monotonic()
+        async with self._lock:
+            while not self.try_acquire(tokens):
+                now = time.monotonic()
+                wait = max(self._blocked_until - now, (tokens - self._tokens) / self.rate if self.rate > 0 else 1.0)
+                await asyncio.sleep(max(wait, 0.001))
+        return time.monotonic() - start
+
+    def block_for(self, seconds: float):
+        """Hand out no tokens for `seconds` (e.g. after a 429 with Retry-After)"""
+        self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+        self._tokens = 0.0
+
+
+def _next_reset(now: datetime, reset_day: int) -> datetime:
+    """Next occurrence of `reset_day` (day of month, clamped to 28) at 00:00 UTC"""
+    day = min(max(reset_day, 1), 28)
+    candidate = now.replace(day=day, hour=0, minute=0, second=0, microsecond=0)
+    if candidate <= now:
+        year, month = (now.year + 1, 1) if now.month == 12 else (now.year, now.month + 1)
+        candidate = candidate.replace(year=year, month=month)
+    return candidate
+
+
+class QuotaTracker:
+    """Credit balance as last reported by the upstream response headers"""
+
+    def __init__(self, reserve: int = 50, reset_day: int = 1):
+        self.reserve = reserve
+        self.reset_day = reset_day
+        self.remaining: Optional[float] = None
+        self.used: Optional[float] = None
+        self.last_cost: Optional[float] = None
+        self.updated_at: Optional[float] = None
+        # The reported balance stops applying once the quota resets
+        self._expires_at: Optional[datetime] = None
+
+    def update(self, headers: Mapping[str, str]):
+        """Record the quota headers of an upstream response (missing headers are ignored)"""
+        for attr, header in (("remaining", "x-requests-remaining"), ("used", "x-requests-used"), ("last_cost", "x-requests-last")):
+            value = headers.get(header)
+            if value is None:
+                continue
+            try:
+                setattr(self, attr, float(value))
+            except ValueError:
+                continue
+        if headers.get("x-requests-remaining") is not None:
+            self.updated_at = time.time()
+            self._expires_at = _next_reset(datetime.now(timezone.utc), self.reset_day)
+
+    def _expire(self):
+        if self._expires_at is not None and datetime.now(timezone.utc) >= self._expires_at:
+            self.remaining = self.used = self._expires_at = None
+
+    @property
+    def known(self) -> bool:
+        self._expire()
+        return self.remaining is not None
+
+    def can_spend(self, cost: float, keep_reserve: bool = False) -> bool:
+        """Whether a request of `cost` credits fits the balance (unknown balance: yes)"""
+        if not self.known:
+            return True
+        floor = self.reserve if keep_reserve else 0
+        return self.remaining - cost >= floor
+
+    def mode(self, cost: float = 1.0) -> str:
+        if not self.known or self.remaining - cost >= self.reserve:
+            return NORMAL
+        if self.remaining >= cost:
+            return CONSERVE
+        return EXHAUSTED
+
+    def seconds_until_reset(self, now: Optional[datetime] = None) -> float:
+        now = now or datetime.now(timezone.utc)
+        return (_next_reset(now, self.reset_day) - now).total_seconds()
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "remaining": self.remaining,
+            "used": self.used,
+            "last_cost": self.last_cost,
+            "reserve": self.reserve,
+            "mode": self.mode(),
+            "seconds_until_reset": round(self.seconds_until_reset()),
+            "updated_at": datetime.fromtimestamp(self.updated_at).isoformat() if self.updated_at else None,
+        }
+
+
+def kickoff_time(game: Dict[str, Any]) -> Optional[float]:
+    """An event's `commence_time` as epoch seconds (None if missing or malformed)"""
+    value = game.get("commence_time")
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+    except (AttributeError, ValueError):
+        return None
+
+
+def sport_priority(kickoffs: Iterable[float], now: Optional[float] = None) -> float:
+    """
+    How much fresh odds for a sport are worth: the sum of its events' weights
+    (live events weigh the most, then by closeness of kickoff).
+
+    Args:
+        kickoffs: Commence times of the sport's events, epoch seconds
+        now: Reference time (default: now)
+    """
+    now = now if now is not None else time.time()
+    priority = 0.0
+    for kickoff in kickoffs:
+        hours = (kickoff - now) / 3600
+        if hours <= 0:
+            priority += LIVE_WEIGHT if hours > -LIVE_HOURS else 0.0
+            continue
+        for bound, weight in KICKOFF_WEIGHTS:
+            if hours < bound:
+                priority += weight
+                break
+    return priority
+
+
+def is_urgent(kickoffs: Iterable[float], now: Optional[float] = None) -> bool:
+    """Whether any event is live or kicks off within URGENT_HOURS"""
+    now = now if now is not None else time.time()
+    return any(-LIVE_HOURS < (kickoff - now) / 3600 < URGENT_HOURS for kickoff in kickoffs)
+
+
+@dataclass
+class PollPlan:
+    """Planned refresh of one sport"""
+    interval: float
+    poll: bool
+    priority: float
+    cost: int
+    mode: str
+
+
+class QuotaScheduler:
+    """
+    Plans poll intervals for every sport from the shared credit balance.
+
+    Args:
+        quota: Balance to budget
+        min_interval: Shortest interval any sport is polled at (seconds)
+        max_interval: Longest interval (sports with nothing scheduled)
+        default_interval: Interval while the balance is still unknown
+    """
+
+    def __init__(self, quota: QuotaTracker, min_interval: float = 60.0, max_interval: float = 3600.0, default_interval: float = 600.0):
+        self.quota = quota
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.default_interval = default_interval
+        # Kickoff times of each sport's events, from its latest payload
+        self._kickoffs: Dict[str, List[float]] = {}
+
+    def observe(self, sport: str, data: Iterable[Dict[str, Any]]):
+        """Record the event schedule of a sport's latest payload"""
+        self._kickoffs[sport] = [k for k in map(kickoff_time, data) if k is not None]
+
+    def priorities(self, now: Optional[float] = None) -> Dict[str, float]:
+        """Current priority of every sport with a known schedule"""
+        now = now if now is not None else time.time()
+        return {sport: sport_priority(kickoffs, now) for sport, kickoffs in self._kickoffs.items()}
+
+    def plan(self, sport: str, cost: int, base_interval: Optional[float] = None) -> PollPlan:
+        """
+        Next refresh of `sport`.
+
+        Args:
+            sport: Sport key
+            cost: Credits one refresh of the sport costs
+            base_interval: Configured interval, used while the balance is unknown
+                and for sports whose schedule has not been seen yet
+
+        Returns:
+            PollPlan; `poll` is False when the sport should not spend credits now
+        """
+        default = base_interval or self.default_interval
+        mode = self.quota.mode(cost)
+        priorities = self.priorities()
+        priority = priorities.get(sport)
+
+        if mode == EXHAUSTED:
+            return PollPlan(self.max_interval, False, priority or 0.0, cost, mode)
+        if priority is None:
+            # Never seen: poll at the configured interval to learn its schedule
+            return PollPlan(default, True, 0.0, cost, mode)
+        if not self.quota.known:
+            return PollPlan(self._clamp(default if priority > 0 else self.max_interval), True, priority, cost, mode)
+
+        if mode == CONSERVE:
+            now = time.time()
+            urgent = {s for s, kickoffs in self._kickoffs.items() if is_urgent(kickoffs, now)}
+            if sport not in urgent:
+                return PollPlan(self.max_interval, False, priority, cost, mode)
+            # Spend the reserve on the sports with games on right now
+            budget = self.quota.remaining
+            total = sum(priorities[s] for s in urgent)
+        else:
+            budget = self.quota.remaining - self.quota.reserve
+            total = sum(priorities.values())
+
+        if priority <= 0 or total <= 0:
+            return PollPlan(self.max_interval, True, priority, cost, mode)
+        rate = budget / max(self.quota.seconds_until_reset(), 1.0)  # credits per second
+        interval = cost * total / (rate * priority) if rate > 0 else self.max_interval
+        return PollPlan(self._clamp(interval), True, priority, cost, mode)
+
+    def _clamp(self, interval: float) -> float:
+        return min(max(interval, self.min_interval), self.max_interval)
+
+
+quota = QuotaTracker(reserve=settings.QUOTA_RESERVE_CREDITS, reset_day=settings.QUOTA_RESET_DAY)
+# MAX_REQUESTS_PER_MINUTE upstream calls, with at most that many in one burst
+rate_limiter = TokenBucket(rate=settings.MAX_REQUESTS_PER_MINUTE / 60.0, capacity=max(settings.MAX_REQUESTS_PER_MINUTE, 1))
+scheduler = QuotaScheduler(
+    quota,
+    min_interval=settings.MIN_POLL_INTERVAL_SECONDS,
+    max_interval=settings.MAX_POLL_INTERVAL_SECONDS,
+    default_interval=settings.POLL_INTERVAL_SECONDS,
+)
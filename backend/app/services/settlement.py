@@ -0,0 +1,393 @@
+"""
+Bet settlement.
+
+Pending bets are graded against final scores (`app.core.grading`) and
+moved to Won / Lost / Push:
+
+1. the sports with pending bets are looked up and their recent scores are
+   fetched from a `ScoresSource` (the Odds API, or /scores dumps on disk)
+2. pending bets are read in keyset batches, only the columns grading needs
+3. each batch is written back with one UPDATE per result
+   (`WHERE id IN (...) AND status = 'Pending'`), so a re-run, or a bet
+   settled by hand in the meantime, is never graded twice
+4. bets settled without a closing price get the last line recorded before
+   kickoff (`ClosingLines`: the odds store, else the sport's final snapshot),
+   so the portfolio reports closing line value
+5. the bets each statement moved are added to the portfolio aggregates
+   (`app.services.portfolio`) in the same transaction
+
+Bets are matched to events by `event_id`, or by sport and match name
+("Home vs Away") for bets saved without one. Bets whose market cannot be
+graded (props, unknown markets) or whose event has no final score yet stay
+pending.
+"""
+import asyncio
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlmodel import and_, or_, select, update
+
+from app.core import fast_json
+from app.core.config import settings
+from app.core.db import async_session, wait_until_ready
+from app.core.feed_index import book_key
+from app.core.grading import final_scores, grade, has_draw, parse_market
+from app.models.tables import SavedBet
+from app.services.odds_api import SCORES_COST, get_scores
+from app.services.portfolio import record_settled
+from app.services.quota import NORMAL, quota
+
+PENDING = "Pending"
+# Ids per UPDATE statement: with the status parameter, under the 999 bind
+# parameters of SQLite builds before 3.32
+UPDATE_CHUNK = 900
+
+
+class ScoresSource(ABC):
+    """Where final scores come from: events in the Odds API `/scores` shape"""
+
+    name = "scores"
+
+    @abstractmethod
+    async def fetch(self, sport: str) -> Optional[List[Dict[str, Any]]]:
+        """Recent events of `sport` (None when unavailable)"""
+
+
+class OddsApiScores(ScoresSource):
+    """The Odds API `/scores` endpoint (completed events of the last `days_from` days)"""
+
+    name = "odds_api"
+
+    def __init__(self, days_from: int = 3):
+        self.days_from = days_from
+
+    async def fetch(self, sport: str) -> Optional[List[Dict[str, Any]]]:
+        if quota.mode(SCORES_COST) != NORMAL:
+            # Credits left are kept for odds polling
+            return None
+        return await get_scores(sport, days_from=self.days_from)
+
+
+class FileScores(ScoresSource):
+    """`/scores` dumps on disk: one JSON file or a directory of them"""
+
+    name = "file"
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+
+    async def fetch(self, sport: str) -> Optional[List[Dict[str, Any]]]:
+        return await asyncio.to_thread(self._read, sport)
+
+    def _read(self, sport: str) -> Optional[List[Dict[str, Any]]]:
+        if not self.path.exists():
+            return None
+        files = [self.path] if self.path.is_file() else sorted(self.path.rglob("*.json"))
+        events = []
+        for file in files:
+            events.extend(e for e in fast_json.loads(file.read_bytes()) if e.get("sport_key", sport) == sport)
+        return events
+
+
+def _timestamp(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+class ScoreBoard:
+    """Final scores of completed events, by event id and by (sport, match name)"""
+
+    def __init__(self):
+        self.by_id: Dict[str, Dict[str, float]] = {}
+        # event id -> commence time (epoch seconds), when known
+        self.commence: Dict[str, float] = {}
+        # (sport, "Home vs Away") -> [(commence time, event id)], oldest first
+        self.by_match: Dict[Tuple[str, str], List[Tuple[float, str]]] = {}
+
+    def __len__(self) -> int:
+        return len(self.by_id)
+
+    def add(self, sport: str, events: List[Dict[str, Any]]):
+        for event in events:
+            final = final_scores(event)
+            if final is None:
+                continue
+            self.by_id[event["id"]] = final
+            commence = _timestamp(event.get("commence_time"))
+            if commence is not None:
+                self.commence[event["id"]] = commence
+            match = (event.get("sport_key", sport), f"{event.get('home_team')} vs {event.get('away_team')}")
+            self.by_match.setdefault(match, []).append((commence or 0.0, event["id"]))
+        for games in self.by_match.values():
+            games.sort()
+
+    def resolve(self, event_id: Optional[str], sport: str, match_name: str, placed_at: Optional[str]) -> Optional[str]:
+        """Id of the bet's completed event, None if it is unknown or not final"""
+        if event_id:
+            return event_id if event_id in self.by_id else None
+        games = self.by_match.get((sport, match_name))
+        if not games:
+            return None
+        if len(games) == 1:
+            return games[0][1]
+        # Same matchup more than once in the window: the first game after the bet was placed
+        placed = _timestamp(placed_at)
+        if placed is None:
+            return None
+        for commence, game_id in games:
+            if commence >= placed:
+                return game_id
+        return None
+
+    def find(self, event_id: Optional[str], sport: str, match_name: str, placed_at: Optional[str]) -> Optional[Dict[str, float]]:
+        """Final scores of the bet's event, None if it is unknown or not final"""
+        game_id = self.resolve(event_id, sport, match_name, placed_at)
+        return self.by_id[game_id] if game_id is not None else None
+
+
+class ClosingLines:
+    """
+    Closing prices of settled bets: the last price of the bet's line recorded
+    before kickoff.
+
+    Args:
+        store: The odds history (`app.services.odds_store.OddsStore`), or None
+        snapshot: Latest `EVSnapshot` of a sport (None if there is none); used
+            when the store has no price, if it was taken before kickoff
+    """
+
+    def __init__(self, store=None, snapshot: Optional[Callable[[str], Any]] = None):
+        self.store = store
+        self.snapshot = snapshot
+
+    def find(
+        self,
+        sport: str,
+        event_id: str,
+        market_key: str,
+        book: str,
+        selection: str,
+        point: Optional[float],
+        commence: float,
+    ) -> Optional[float]:
+        """
+        Decimal closing price of one line.
+
+        Args:
+            sport: Sport key
+            event_id: Odds API event id
+            market_key: Market key ("h2h", "spreads", "totals")
+            book: Bookmaker key or title, as saved on the bet
+            selection: Outcome name (team, "Draw", "Over" or "Under")
+            point: The selection's spread or total line, None for moneylines
+            commence: Kickoff, epoch seconds
+
+        Returns:
+            Price, None when the line was never seen before kickoff
+        """
+        if self.store is not None:
+            try:
+                price = self.store.closing_price(sport, event_id, market_key, book, selection, point, commence)
+            except (OSError, ValueError) as e:
+                print(f"❌ Could not read recorded odds for {sport}: {e}")
+                price = None
+            if price is not None:
+                return price
+        snapshot = self.snapshot(sport) if self.snapshot is not None else None
+        if snapshot is None or snapshot.created_at.timestamp() > commence:
+            return None
+        wanted_book = book_key(book)
+        for game in snapshot.data:
+            if game.get("id") != event_id:
+                continue
+            for bookmaker in game.get("bookmakers", []):
+                if wanted_book not in (book_key(bookmaker.get("key", "")), book_key(bookmaker.get("title", ""))):
+                    continue
+                for market in bookmaker.get("markets", []):
+                    if market.get("key") != market_key:
+                        continue
+                    for outcome in market.get("outcomes", []):
+                        if outcome.get("name") != selection or outcome.get("description"):
+                            continue
+                        line = outcome.get("point")
+                        if (line is None) == (point is None) and (point is None or abs(line - point) < 1e-9):
+                            return outcome.get("price")
+        return None
+
+
+class SettlementEngine:
+    """
+    Grades pending bets on a schedule.
+
+    Args:
+        source: Where final scores come from
+        interval: Seconds between scheduled runs
+        batch_size: Pending bets read (and written back) per transaction
+        closing_lines: Fills the closing price of bets settled without one
+    """
+
+    def __init__(
+        self,
+        source: ScoresSource,
+        interval: float = 3600.0,
+        batch_size: int = 5000,
+        closing_lines: Optional[ClosingLines] = None,
+    ):
+        self.source = source
+        self.closing_lines = closing_lines
+        self.interval = interval
+        self.batch_size = batch_size
+        self.last_run: Optional[Dict[str, Any]] = None
+        self._task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+
+    async def settle(self) -> Dict[str, Any]:
+        """
+        Grade every pending bet that has a final score. Safe to re-run.
+
+        Returns:
+            Summary of the run (bets checked and settled per result)
+        """
+        await wait_until_ready()
+        async with self._lock:
+            start = time.perf_counter()
+            summary: Dict[str, Any] = {"source": self.source.name, "sports": 0, "events": 0, "checked": 0, "Won": 0, "Lost": 0, "Push": 0}
+
+            async with async_session() as session:
+                sports = list((await session.exec(
+                    select(SavedBet.sport).where(SavedBet.status == PENDING).distinct()
+                )).all())
+            board = ScoreBoard()
+            fetched = await asyncio.gather(*(self.source.fetch(sport) for sport in sports))
+            for sport, events in zip(sports, fetched):
+                if events:
+                    board.add(sport, events)
+            summary["sports"], summary["events"] = len(sports), len(board)
+
+            if len(board):
+                settled_at = datetime.now(timezone.utc).isoformat()
+                cursor: Optional[Tuple[str, int]] = None
+                while True:
+                    async with async_session() as session:
+                        rows, cursor = await self._settle_batch(session, board, cursor, settled_at, summary)
+                        await session.commit()
+                    if rows < self.batch_size:
+                        break
+
+            summary["settled"] = summary["Won"] + summary["Lost"] + summary["Push"]
+            summary["seconds"] = round(time.perf_counter() - start, 3)
+            summary["finished_at"] = datetime.now().isoformat()
+            self.last_run = summary
+            if summary["settled"]:
+                print(f"🏁 Settled {summary['settled']} of {summary['checked']} pending bets ({summary['Won']} won, {summary['Lost']} lost, {summary['Push']} push).")
+            return summary
+
+    async def _settle_batch(
+        self,
+        session,
+        board: ScoreBoard,
+        cursor: Optional[Tuple[str, int]],
+        settled_at: str,
+        summary: Dict[str, Any],
+    ) -> Tuple[int, Optional[Tuple[str, int]]]:
+        # Keyset walk in (timestamp, id) order, served by the (status, timestamp, id) index
+        statement = select(
+            SavedBet.id, SavedBet.timestamp, SavedBet.sport, SavedBet.match_name, SavedBet.selection,
+            SavedBet.event_id, SavedBet.market, SavedBet.point, SavedBet.book, SavedBet.stake,
+            SavedBet.odds, SavedBet.ev_percent, SavedBet.closing_odds,
+        ).where(SavedBet.status == PENDING)
+        if cursor is not None:
+            statement = statement.where(or_(
+                SavedBet.timestamp > cursor[0],
+                and_(SavedBet.timestamp == cursor[0], SavedBet.id > cursor[1]),
+            ))
+        rows = (await session.exec(statement.order_by(SavedBet.timestamp, SavedBet.id).limit(self.batch_size))).all()
+        if not rows:
+            return 0, cursor
+
+        results: Dict[str, Dict[int, Any]] = {}
+        closing: Dict[int, float] = {}
+        for bet in rows:
+            game_id = board.resolve(bet.event_id, bet.sport, bet.match_name, bet.timestamp)
+            if game_id is None:
+                continue
+            market_key, line = parse_market(bet.market, bet.point)
+            result = grade(market_key, bet.selection, line, board.by_id[game_id], has_draw(bet.sport)) if market_key else None
+            if result is None:
+                continue
+            results.setdefault(result, {})[bet.id] = bet
+            if self.closing_lines is not None and not bet.closing_odds and game_id in board.commence:
+                price = self.closing_lines.find(
+                    bet.sport, game_id, market_key, bet.book, bet.selection, line, board.commence[game_id],
+                )
+                if price:
+                    closing[bet.id] = price
+
+        for result, bets in results.items():
+            ids = list(bets)
+            for i in range(0, len(ids), UPDATE_CHUNK):
+                # RETURNING reports the bets this statement actually moved, so
+                # the aggregates never count a bet settled concurrently twice
+                settled = (await session.exec(
+                    update(SavedBet)
+                    .where(SavedBet.id.in_(ids[i:i + UPDATE_CHUNK]), SavedBet.status == PENDING)
+                    .values(status=result, settled_at=settled_at)
+                    .returning(SavedBet.id)
+                )).scalars().all()
+                closed = {bet_id: closing[bet_id] for bet_id in settled if bet_id in closing}
+                if closed:
+                    # Bulk UPDATE by primary key, one executemany
+                    await session.exec(
+                        update(SavedBet),
+                        params=[{"id": bet_id, "closing_odds": price} for bet_id, price in closed.items()],
+                    )
+                await record_settled(session, (bets[bet_id] for bet_id in settled), result, settled_at, closed)
+                summary[result] += len(settled)
+        summary["checked"] += len(rows)
+        last = rows[-1]
+        return len(rows), (last.timestamp, last.id)
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "source": self.source.name,
+            "interval_seconds": self.interval,
+            "running": self._task is not None and not self._task.done(),
+            "last_run": self.last_run,
+        }
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="settlement")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self.settle()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"❌ Settlement failed: {type(e).__name__}: {e}")
+            await asyncio.sleep(self.interval)
+
+
+settlement = SettlementEngine(
+    FileScores(settings.SETTLEMENT_SCORES_PATH) if settings.SETTLEMENT_SCORES_PATH else OddsApiScores(),
+    interval=settings.SETTLEMENT_INTERVAL_SECONDS,
+    batch_size=settings.SETTLEMENT_BATCH_SIZE,
+)
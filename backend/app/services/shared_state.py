@@ -0,0 +1,226 @@
+"""
+State shared between worker processes.
+
+With `uvicorn --workers N` every worker is its own process with its own
+poller, so without coordination each one polls upstream (N times the quota)
+and serves whatever its last poll saw. A `StateBackend` holds what the
+workers share, and a `LeaderElection` picks the one worker that polls:
+
+- the leader fetches, scans and writes each published snapshot to the
+  backend (`OddsPoller` with `state=`);
+- the other workers follow: they watch the backend and install every new
+  snapshot as it is written, without fetching or scanning;
+- when the leader exits, its lock is released and a follower takes over.
+
+Backends:
+
+    MemoryBackend  one process (the default): nothing is shared, the process leads
+    FileBackend    workers on one host: one file per key, replaced atomically, in
+                   a directory that defaults to shared memory (/dev/shm); the
+                   leader holds an exclusive `flock` on a lock file, which the OS
+                   releases when the process dies
+"""
+import asyncio
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import quote, unquote
+
+from app.core.config import settings
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
+
+
+class StateBackend:
+    """Key -> bytes store shared by the workers, plus the leader lock"""
+
+    name = "state"
+    shared = False  # Whether other processes see what this one writes
+
+    def get(self, key: str) -> Optional[Tuple[bytes, float]]:
+        """(value, epoch seconds it was written), None when missing"""
+        raise NotImplementedError
+
+    def put(self, key: str, value: bytes):
+        raise NotImplementedError
+
+    def version(self, key: str) -> Optional[Any]:
+        """Changes on every `put` of the key; cheap enough to poll"""
+        raise NotImplementedError
+
+    def keys(self, prefix: str = "") -> List[str]:
+        raise NotImplementedError
+
+    def try_lead(self) -> bool:
+        """Become the leader if no live process is. Never blocks."""
+        raise NotImplementedError
+
+    def status(self) -> Dict[str, Any]:
+        return {"backend": self.name, "shared": self.shared}
+
+
+class MemoryBackend(StateBackend):
+    """Process-local state: a single worker, always the leader"""
+
+    name = "memory"
+
+    def __init__(self):
+        self._values: Dict[str, Tuple[bytes, float]] = {}
+        self._versions: Dict[str, int] = {}
+
+    def get(self, key: str) -> Optional[Tuple[bytes, float]]:
+        return self._values.get(key)
+
+    def put(self, key: str, value: bytes):
+        self._values[key] = (value, time.time())
+        self._versions[key] = self._versions.get(key, 0) + 1
+
+    def version(self, key: str) -> Optional[Any]:
+        return self._versions.get(key)
+
+    def keys(self, prefix: str = "") -> List[str]:
+        return [key for key in self._values if key.startswith(prefix)]
+
+    def try_lead(self) -> bool:
+        return True
+
+
+class FileBackend(StateBackend):
+    """
+    One file per key in `directory`. Writes go to a temporary file that is
+    then renamed over the key's file, so readers see the old or the new
+    value, never a partial one, and a key's version is its file's identity.
+    """
+
+    name = "file"
+    shared = True
+    SUFFIX = ".state"
+
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._lock_file = None
+
+    def _path(self, key: str) -> Path:
+        return self.directory / (quote(key, safe="") + self.SUFFIX)
+
+    def get(self, key: str) -> Optional[Tuple[bytes, float]]:
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                return f.read(), os.fstat(f.fileno()).st_mtime
+        except FileNotFoundError:
+            return None
+
+    def put(self, key: str, value: bytes):
+        path = self._path(key)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        tmp.write_bytes(value)
+        os.replace(tmp, path)
+
+    def version(self, key: str) -> Optional[Any]:
+        try:
+            stat = self._path(key).stat()
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def keys(self, prefix: str = "") -> List[str]:
+        keys = (unquote(path.name[:-len(self.SUFFIX)]) for path in self.directory.glob(f"*{self.SUFFIX}"))
+        return [key for key in keys if key.startswith(prefix)]
+
+    def try_lead(self) -> bool:
+        if self._lock_file is not None:
+            return True
+        if fcntl is None:
+            # No advisory locks: every process leads, as without shared state
+            return True
+        lock_file = open(self.directory / "leader.lock", "a+")
+        try:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        # Held for the life of the process; the OS drops the lock when it exits
+        lock_file.truncate(0)
+        lock_file.write(str(os.getpid()))
+        lock_file.flush()
+        self._lock_file = lock_file
+        return True
+
+    def status(self) -> Dict[str, Any]:
+        try:
+            leader_pid = (self.directory / "leader.lock").read_text().strip() or None
+        except OSError:
+            leader_pid = None
+        return {**super().status(), "directory": str(self.directory), "leader_pid": leader_pid}
+
+
+def default_state_dir() -> str:
+    """Shared memory when the host has it (Linux), else the temp directory"""
+    root = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    return os.path.join(root, "value-bet-finder")
+
+
+def create_backend(kind: str, directory: Optional[str] = None) -> StateBackend:
+    if kind == "file":
+        return FileBackend(directory or default_state_dir())
+    if kind == "memory":
+        return MemoryBackend()
+    raise ValueError(f"Unknown state backend {kind!r} (expected 'memory' or 'file')")
+
+
+class LeaderElection:
+    """
+    Decides which worker polls upstream. `try_lead` runs once at startup;
+    followers then retry every `interval` seconds and run the `on_elected`
+    callbacks when they take over.
+    """
+
+    def __init__(self, backend: StateBackend, interval: float = 5.0):
+        self.backend = backend
+        self.interval = interval
+        self.is_leader = False
+        self._callbacks: List[Callable[[], Any]] = []
+        self._task: Optional[asyncio.Task] = None
+
+    def on_elected(self, callback: Callable[[], Any]):
+        """Register `callback()`, run once when this worker becomes the leader"""
+        self._callbacks.append(callback)
+
+    def try_lead(self) -> bool:
+        if not self.is_leader and self.backend.try_lead():
+            self.is_leader = True
+            if self.backend.shared:
+                print(f"👑 Worker {os.getpid()} is the leader: polling upstream.")
+            for callback in self._callbacks:
+                callback()
+        return self.is_leader
+
+    def start(self):
+        """Keep trying to take over until this worker leads"""
+        if not self.is_leader and (self._task is None or self._task.done()):
+            print(f"👥 Worker {os.getpid()} is following: serving the leader's snapshots.")
+            self._task = asyncio.create_task(self._run(), name="leader-election")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        while not self.try_lead():
+            await asyncio.sleep(self.interval)
+
+    def status(self) -> Dict[str, Any]:
+        return {**self.backend.status(), "pid": os.getpid(), "leader": self.is_leader}
+
+
+state = create_backend(settings.STATE_BACKEND, settings.STATE_DIR)
+election = LeaderElection(state, interval=settings.LEADER_RETRY_SECONDS)
@@ -0,0 +1,396 @@
+"""
+Benchmark suite for the scan and API hot paths.
+
+Groups:
+    scan       reference `process_odds_data` vs the vectorized scanner, index
+               build, incremental rescans, the arbitrage / middle scan
+    math       scalar devig/EV/Kelly helpers and the batched devig methods
+    serialize  upstream payload decode and BetOpportunity -> JSON: the pydantic
+               paths vs app.core.fast_json and memoized snapshot bodies
+    e2e        GET /ev/feed over HTTP (uvicorn) against a local stub upstream
+    startup    fresh-interpreter imports of the scan core and the API, and a
+               `python -m app scan` run, against STARTUP_BUDGETS_MS
+
+Results are written as JSON so runs on different commits can be compared:
+
+    python -m benchmarks.run --output before.json
+    python -m benchmarks.run --output after.json --compare before.json
+"""
+import argparse
+import json
+import os
+import platform
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional
+
+from benchmarks.synthetic import generate_odds, perturb
+
+SIZES = {
+    # name: generate_odds arguments
+    "small": dict(games=10, books=4),
+    "medium": dict(games=60, books=10),
+    "large": dict(games=200, books=16, props=8, alt_lines=2),
+}
+# p50 budgets of the startup group (cold starts and short CLI runs)
+STARTUP_BUDGETS_MS = {
+    "startup.import_core": 500,
+    "startup.import_api": 2000,
+    "startup.cli_scan": 1000,
+}
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def measure(fn: Callable[[], Any], repeat: int = 5, warmup: int = 1) -> Dict[str, float]:
+    """Wall time of `fn` over `repeat` runs (after `warmup` untimed runs), in ms"""
+    for _ in range(warmup):
+        fn()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    times.sort()
+    return {
+        "runs": repeat,
+        "mean_ms": round(statistics.fmean(times), 4),
+        "p50_ms": round(times[len(times) // 2], 4),
+        "p95_ms": round(times[min(len(times) - 1, int(len(times) * 0.95))], 4),
+        "min_ms": round(times[0], 4),
+    }
+
+
+def measure_per_call(fn: Callable[[], Any], calls: int, repeat: int = 5) -> Dict[str, float]:
+    """Like `measure`, for tiny functions: `fn` is called `calls` times per run and results are per call"""
+    def batch():
+        for _ in range(calls):
+            fn()
+    stats = measure(batch, repeat=repeat)
+    for key in ("mean_ms", "p50_ms", "p95_ms", "min_ms"):
+        stats[key] = round(stats[key] / calls * 1000, 4)
+    stats["unit"] = "us"
+    return stats
+
+
+class Suite:
+    def __init__(self, quick: bool = False):
+        self.quick = quick
+        self.results: List[Dict[str, Any]] = []
+
+    def repeat(self, n: int) -> int:
+        return max(2, n // 4) if self.quick else n
+
+    def add(self, name: str, stats: Dict[str, Any], **params):
+        entry = {"name": name, "params": params, **stats}
+        self.results.append(entry)
+        unit = stats.get("unit", "ms")
+        value = stats["p50_ms"]
+        label = f"{name} {' '.join(f'{k}={v}' for k, v in params.items())}"
+        print(f"  {label:<60} p50 {value:>10.3f} {unit}", file=sys.stderr)
+
+
+# --- Groups ---
+
+def bench_scan(suite: Suite, payloads: Dict[str, list]):
+    from app.core.arbitrage import scan_arbitrage
+    from app.core.incremental import IncrementalScanner
+    from app.core.market_index import build_market_index
+    from app.core.scanner import scan_index, scan_odds_data
+    from app.main import process_odds_data
+
+    for size, data in payloads.items():
+        rows = sum(len(m["outcomes"]) for g in data for b in g["bookmakers"] for m in b["markets"])
+        params = dict(size=size, games=len(data), rows=rows)
+        for min_ev in (0.0, 2.0):
+            # min_ev=0 is dominated by building BetOpportunity objects; 2% shows the scan itself
+            suite.add("scan.reference", measure(
+                lambda: process_odds_data(data, min_ev), suite.repeat(5 if size == "large" else 10),
+            ), **params, min_ev=min_ev)
+            suite.add("scan.vectorized", measure(
+                lambda: scan_odds_data(data, min_ev), suite.repeat(10),
+            ), **params, min_ev=min_ev)
+        suite.add("scan.index_build", measure(lambda: build_market_index(data), suite.repeat(10)), **params)
+        suite.add("scan.arbitrage", measure(lambda: scan_arbitrage(data), suite.repeat(10)), **params)
+        index = build_market_index(data)
+        def scan_prebuilt():
+            index.cache.clear()  # include the consensus fair line, which is memoized per index
+            return scan_index(index)
+        suite.add("scan.scan_index", measure(scan_prebuilt, suite.repeat(10)), **params)
+
+        scanner = IncrementalScanner()
+        scanner.update(data)
+        states = [data, perturb(data, fraction=0.1)]
+        def rescan():
+            # Alternate between the two payloads so every call sees ~10% of books move
+            states.reverse()
+            scanner.update(states[0])
+        suite.add("scan.incremental_10pct", measure(rescan, suite.repeat(10)), **params)
+
+
+def bench_math(suite: Suite):
+    import numpy as np
+    from app.core import math_logic
+
+    calls = 2000 if suite.quick else 20000
+    suite.add("math.to_decimal", measure_per_call(lambda: math_logic.to_decimal(-110), calls))
+    suite.add("math.remove_vig_multiplicative", measure_per_call(lambda: math_logic.remove_vig_multiplicative(1.91, 1.95), calls))
+    suite.add("math.calculate_ev", measure_per_call(lambda: math_logic.calculate_ev(0.52, 2.05), calls))
+    suite.add("math.kelly_criterion", measure_per_call(lambda: math_logic.kelly_criterion(0.52, 2.05, 0.25), calls))
+
+    rng = np.random.default_rng(0)
+    for groups in (1_000, 50_000):
+        p = rng.uniform(0.2, 0.8, groups)
+        margin = rng.uniform(1.02, 1.06, groups)
+        implied = np.column_stack([p * margin, (1 - p) * margin]).ravel()
+        group_ids = np.repeat(np.arange(groups), 2)
+        for method in math_logic.DEVIG_METHODS:
+            suite.add(
+                "math.devig_implied",
+                measure(lambda: math_logic.devig_implied(implied, group_ids, method, n_groups=groups), suite.repeat(10)),
+                method=method, groups=groups,
+            )
+
+    from app.core.scanner import scan_odds_data
+    from app.core.staking import optimize_stakes
+
+    opps = scan_odds_data(generate_odds(games=120, books=12, seed=2), 0.0)
+    for candidates in (100, 500):
+        suite.add(
+            "math.optimize_stakes",
+            measure(lambda: optimize_stakes(opps[:candidates]), suite.repeat(5)),
+            candidates=candidates, scenarios=4000,
+        )
+
+
+def bench_serialize(suite: Suite, payloads: Dict[str, list]):
+    from pydantic import TypeAdapter
+    from app.core import fast_json
+    from app.core.feed_index import FeedQuery
+    from app.core.scanner import scan_odds_data
+    from app.models.schemas import BetOpportunity
+    from app.services.poller import EVSnapshot
+
+    adapter = TypeAdapter(List[BetOpportunity])
+    for size, data in payloads.items():
+        raw = json.dumps(data).encode()
+        params = dict(size=size, bytes=len(raw))
+        suite.add("serialize.decode_stdlib", measure(lambda: json.loads(raw), suite.repeat(10)), **params)
+        suite.add("serialize.decode_fast_json", measure(lambda: fast_json.loads(raw), suite.repeat(10)), **params, backend=fast_json.BACKEND)
+
+        opps = scan_odds_data(data, -100.0)
+        params = dict(size=size, opportunities=len(opps))
+        suite.add("serialize.model_dump_json_each", measure(lambda: "[" + ",".join(o.model_dump_json() for o in opps) + "]", suite.repeat(10)), **params)
+        suite.add("serialize.type_adapter", measure(lambda: adapter.dump_json(opps), suite.repeat(10)), **params)
+        suite.add("serialize.stdlib_json", measure(lambda: json.dumps([o.model_dump() for o in opps]), suite.repeat(10)), **params)
+        # What a response_model endpoint pays: validate the objects again, then encode
+        suite.add("serialize.response_model", measure(lambda: adapter.dump_json(adapter.validate_python(opps)), suite.repeat(10)), **params)
+        suite.add("serialize.fast_json", measure(lambda: fast_json.join_array(fast_json.dumps_each(opps)), suite.repeat(10)), **params, backend=fast_json.BACKEND)
+        suite.add("serialize.fast_json_columns", measure(lambda: fast_json.dumps_columns(opps, BetOpportunity), suite.repeat(10)), **params, backend=fast_json.BACKEND)
+
+        snapshot = EVSnapshot.build("bench", data, opps, min_ev_floor=-100.0)
+        snapshot.feed_json(0.0)
+        suite.add("serialize.snapshot_cached", measure(lambda: snapshot.feed_json(0.0), suite.repeat(10)), **params)
+        # A filtered page vs the whole feed: one book, one market type, top 20
+        book = opps[0].target_book if opps else ""
+        page = FeedQuery.parse(books=book, markets="total", limit=20)
+        snapshot.query_json(page)
+        suite.add("serialize.snapshot_page", measure(lambda: snapshot.query_json(page), suite.repeat(10)), **params)
+        encoded = adapter.dump_json(opps)
+        suite.add("serialize.validate_json", measure(lambda: adapter.validate_json(encoded), suite.repeat(10)), **params)
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_stub_upstream(port: int, payload: bytes) -> ThreadingHTTPServer:
+    """Local stand-in for The Odds API: every /odds request gets `payload`"""
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header("content-type", "application/json")
+            self.send_header("content-length", str(len(payload)))
+            self.send_header("x-requests-remaining", "10000")
+            self.send_header("x-requests-used", "0")
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def bench_e2e(suite: Suite, payloads: Dict[str, list], api_port: int, upstream_port: int):
+    import httpx
+    import uvicorn
+    from app.main import app
+
+    config = uvicorn.Config(app, host="127.0.0.1", port=api_port, log_level="warning", lifespan="on")
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+
+    size = "large" if "large" in payloads else list(payloads)[-1]
+    upstream = start_stub_upstream(upstream_port, json.dumps(payloads[size]).encode())
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{api_port}", timeout=60) as client:
+            params = dict(size=size, games=len(payloads[size]))
+            # Cold: a sport with no snapshot yet (fetch + decode + scan + serialize)
+            sports = iter(f"bench_sport_{i}" for i in range(1000))
+            suite.add("e2e.ev_feed_cold", measure(
+                lambda: client.get("/ev/feed", params={"sport": next(sports)}).raise_for_status(),
+                suite.repeat(5), warmup=0,
+            ), **params)
+            # Warm: served from the published snapshot
+            client.get("/ev/feed", params={"sport": "bench_warm"}).raise_for_status()
+            suite.add("e2e.ev_feed_warm", measure(
+                lambda: client.get("/ev/feed", params={"sport": "bench_warm"}).raise_for_status(),
+                suite.repeat(20),
+            ), **params)
+            suite.add("e2e.ev_feed_warm_min_ev_2", measure(
+                lambda: client.get("/ev/feed", params={"sport": "bench_warm", "min_ev": 2}).raise_for_status(),
+                suite.repeat(20),
+            ), **params)
+            suite.add("e2e.ev_feed_warm_columns", measure(
+                lambda: client.get("/ev/feed", params={"sport": "bench_warm", "format": "columns"}).raise_for_status(),
+                suite.repeat(20),
+            ), **params)
+    finally:
+        upstream.shutdown()
+        server.should_exit = True
+        thread.join(timeout=10)
+
+
+def bench_startup(suite: Suite, payloads: Dict[str, list]):
+    def python(*args: str) -> Callable[[], Any]:
+        # A new interpreter per run: nothing is imported or cached yet
+        return lambda: subprocess.run(
+            [sys.executable, *args], cwd=BACKEND_DIR, stdout=subprocess.DEVNULL, check=True,
+        )
+
+    def add(name: str, stats: Dict[str, Any], **params):
+        budget = STARTUP_BUDGETS_MS[name]
+        suite.add(name, {**stats, "budget_ms": budget}, **params)
+        if stats["p50_ms"] > budget:
+            print(f"  ⚠️  {name} is over its {budget} ms budget", file=sys.stderr)
+
+    add("startup.import_core", measure(python("-c", "import app.core.scanner"), suite.repeat(5)))
+    add("startup.import_api", measure(python("-c", "import app.main"), suite.repeat(5)))
+    with tempfile.TemporaryDirectory() as directory:
+        # Start-up cost on a one-sport payload; the scan group covers large slates
+        for size, data in payloads.items():
+            if size == "large":
+                continue
+            path = os.path.join(directory, f"{size}.json")
+            with open(path, "w") as f:
+                json.dump(data, f)
+            add("startup.cli_scan", measure(python("-m", "app", "scan", path, "--json"), suite.repeat(5)), size=size, games=len(data))
+
+
+# --- Reporting ---
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current: List[Dict[str, Any]], baseline_path: str):
+    """Print p50 ratios against a previous results file (< 1.0 is faster)"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    key = lambda r: (r["name"], json.dumps(r["params"], sort_keys=True))
+    before = {key(r): r for r in baseline["results"]}
+    print(f"\nvs {baseline_path} ({baseline['meta'].get('commit')}):", file=sys.stderr)
+    for result in current:
+        old = before.get(key(result))
+        if old and old["p50_ms"]:
+            ratio = result["p50_ms"] / old["p50_ms"]
+            label = f"{result['name']} {' '.join(f'{k}={v}' for k, v in result['params'].items())}"
+            print(f"  {label:<60} {ratio:>6.2f}x", file=sys.stderr)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Benchmark the scan and API hot paths.")
+    parser.add_argument("--only", default="scan,math,serialize,e2e,startup", help="Comma-separated groups to run")
+    parser.add_argument("--sizes", default=",".join(SIZES), help="Comma-separated payload sizes")
+    parser.add_argument("--quick", action="store_true", help="Fewer repetitions")
+    parser.add_argument("--output", help="Write results JSON here (default: stdout)")
+    parser.add_argument("--compare", help="Previous results JSON to compare against")
+    args = parser.parse_args(argv)
+
+    # The app reads its settings at import: point it at the stub before importing
+    api_port, upstream_port = _free_port(), _free_port()
+    os.environ.update({
+        "ODDS_API_KEY": "benchmark-key-000000",
+        "ODDS_API_BASE_URL": f"http://127.0.0.1:{upstream_port}/v4/sports",
+        "DATABASE_URL": f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}",
+        "ENABLE_POLLER": "false",
+        "ENABLE_ODDS_STORE": "false",
+    })
+
+    groups = set(args.only.split(","))
+    payloads = {size: generate_odds(**SIZES[size]) for size in args.sizes.split(",")}
+    suite = Suite(quick=args.quick)
+
+    started = time.perf_counter()
+    if "scan" in groups:
+        print("scan", file=sys.stderr)
+        bench_scan(suite, payloads)
+    if "math" in groups:
+        print("math", file=sys.stderr)
+        bench_math(suite)
+    if "serialize" in groups:
+        print("serialize", file=sys.stderr)
+        bench_serialize(suite, payloads)
+    if "e2e" in groups:
+        print("e2e", file=sys.stderr)
+        bench_e2e(suite, payloads, api_port, upstream_port)
+    if "startup" in groups:
+        print("startup", file=sys.stderr)
+        bench_startup(suite, payloads)
+
+    import numpy
+    import pydantic
+    report = {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": datetime.now().isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "numpy": numpy.__version__,
+            "pydantic": pydantic.__version__,
+            "quick": args.quick,
+            "elapsed_seconds": round(time.perf_counter() - started, 2),
+        },
+        "results": suite.results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    else:
+        print(text)
+    if args.compare:
+        compare(suite.results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
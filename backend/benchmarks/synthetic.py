@@ -0,0 +1,194 @@
+"""
+Synthetic Odds API feed generator.
+
+Produces payloads shaped like `GET /v4/sports/{sport}/odds` (decimal odds):
+games -> bookmakers -> markets -> outcomes, with a sharp book posting low-vig
+prices around each game's true line and soft books adding margin and noise,
+so a realistic share of rows comes out +EV. Spreads/totals can carry
+alternate lines and props carry a player `description`.
+
+Usage:
+    python -m benchmarks.synthetic --games 200 --books 12 --props 6 > feed.json
+"""
+import argparse
+import json
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Sequence
+
+SOFT_BOOKS = [
+    ("fanduel", "FanDuel"), ("draftkings", "DraftKings"), ("betmgm", "BetMGM"),
+    ("caesars", "Caesars"), ("pointsbetus", "PointsBet (US)"), ("betrivers", "BetRivers"),
+    ("unibet_us", "Unibet"), ("wynnbet", "WynnBET"), ("superbook", "SuperBook"),
+    ("bovada", "Bovada"), ("betonlineag", "BetOnline.ag"), ("mybookieag", "MyBookie.ag"),
+    ("lowvig", "LowVig.ag"), ("betus", "BetUS"), ("espnbet", "ESPN BET"), ("fliff", "Fliff"),
+]
+SHARP_BOOKS = [("pinnacle", "Pinnacle"), ("circasports", "Circa Sports")]
+PROP_MARKETS = ["player_points", "player_rebounds", "player_assists", "player_threes"]
+
+
+def _price(prob: float, margin: float) -> float:
+    return round(max(1.01, 1 / (prob * (1 + margin))), 2)
+
+
+def _two_way(rng: random.Random, p: float, margin: float, noise: float):
+    q = min(max(p + rng.gauss(0, noise), 0.02), 0.98)
+    return _price(q, margin), _price(1 - q, margin)
+
+
+def generate_odds(
+    games: int = 50,
+    books: int = 10,
+    markets: Sequence[str] = ("h2h", "spreads", "totals"),
+    props: int = 0,
+    alt_lines: int = 0,
+    sharp_books: int = 1,
+    three_way: bool = False,
+    sport: str = "basketball_nba",
+    seed: int = 0,
+    start: Optional[datetime] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Generate one synthetic payload.
+
+    Args:
+        games: Number of events
+        books: Number of soft bookmakers per event (at most len(SOFT_BOOKS))
+        markets: Game markets to post ("h2h", "spreads", "totals")
+        props: Players per event with Over/Under props (one prop market each)
+        alt_lines: Extra alternate spread/total lines per market
+        sharp_books: How many sharp books (Pinnacle, then Circa) post every event
+        three_way: Post h2h with a Draw outcome (soccer style)
+        sport: `sport_key` of every event
+        seed: RNG seed; the same arguments always give the same payload
+        start: Commence time of the first event (default: tomorrow, UTC)
+
+    Returns:
+        List of games as returned by The Odds API
+    """
+    rng = random.Random(seed)
+    start = start or (datetime.now(timezone.utc) + timedelta(days=1)).replace(minute=0, second=0, microsecond=0)
+    updated = (start - timedelta(days=1)).strftime("%Y-%m-%dT%H:%M:%SZ")
+    book_pool = SHARP_BOOKS[:sharp_books] + SOFT_BOOKS[:books]
+    payload = []
+
+    for g in range(games):
+        home, away = f"Home Team {g}", f"Away Team {g}"
+        p_home = rng.uniform(0.25, 0.75)
+        p_draw = rng.uniform(0.2, 0.3) if three_way else 0.0
+        spread = round(rng.uniform(-12, 12) * 2) / 2
+        total = round(rng.uniform(195, 240) * 2) / 2
+        players = [(f"Player {g}-{i}", rng.choice(PROP_MARKETS), round(rng.uniform(5, 30)) + 0.5) for i in range(props)]
+
+        bookmakers = []
+        for b, (key, title) in enumerate(book_pool):
+            sharp = b < sharp_books
+            margin = rng.uniform(0.015, 0.025) if sharp else rng.uniform(0.03, 0.07)
+            noise = 0.005 if sharp else 0.03
+            book_markets = []
+
+            if "h2h" in markets:
+                if three_way:
+                    probs = [p_home * (1 - p_draw), (1 - p_home) * (1 - p_draw), p_draw]
+                    probs = [max(p + rng.gauss(0, noise / 2), 0.02) for p in probs]
+                    norm = sum(probs)
+                    names = [home, away, "Draw"]
+                    outcomes = [{"name": n, "price": _price(p / norm, margin)} for n, p in zip(names, probs)]
+                else:
+                    price_home, price_away = _two_way(rng, p_home, margin, noise)
+                    outcomes = [{"name": home, "price": price_home}, {"name": away, "price": price_away}]
+                book_markets.append({"key": "h2h", "last_update": updated, "outcomes": outcomes})
+
+            if "spreads" in markets:
+                # Soft books occasionally hang a half point off the sharp number
+                line = spread + (rng.choice([-0.5, 0.5]) if not sharp and rng.random() < 0.2 else 0.0)
+                for alt in range(alt_lines + 1):
+                    point = line + (alt - alt_lines // 2) * 1.5 if alt_lines else line
+                    price_home, price_away = _two_way(rng, 0.5, margin, noise)
+                    book_markets.append({"key": "spreads", "last_update": updated, "outcomes": [
+                        {"name": home, "price": price_home, "point": point},
+                        {"name": away, "price": price_away, "point": -point},
+                    ]})
+
+            if "totals" in markets:
+                line = total + (rng.choice([-0.5, 0.5]) if not sharp and rng.random() < 0.2 else 0.0)
+                for alt in range(alt_lines + 1):
+                    point = line + (alt - alt_lines // 2) * 2.0 if alt_lines else line
+                    o, u = _two_way(rng, 0.5, margin, noise)
+                    book_markets.append({"key": "totals", "last_update": updated, "outcomes": [
+                        {"name": "Over", "price": o, "point": point},
+                        {"name": "Under", "price": u, "point": point},
+                    ]})
+
+            by_market: Dict[str, List[Dict[str, Any]]] = {}
+            for player, market_key, point in players:
+                o, u = _two_way(rng, 0.5, margin, noise)
+                by_market.setdefault(market_key, []).extend([
+                    {"name": "Over", "description": player, "price": o, "point": point},
+                    {"name": "Under", "description": player, "price": u, "point": point},
+                ])
+            for market_key, outcomes in by_market.items():
+                book_markets.append({"key": market_key, "last_update": updated, "outcomes": outcomes})
+
+            bookmakers.append({"key": key, "title": title, "last_update": updated, "markets": book_markets})
+
+        payload.append({
+            "id": f"synthetic{seed}x{g:05d}",
+            "sport_key": sport,
+            "sport_title": sport,
+            "commence_time": (start + timedelta(minutes=30 * g)).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "home_team": home,
+            "away_team": away,
+            "bookmakers": bookmakers,
+        })
+    return payload
+
+
+def perturb(data: List[Dict[str, Any]], fraction: float = 0.1, seed: int = 1) -> List[Dict[str, Any]]:
+    """
+    Copy of a payload where `fraction` of the bookmaker entries moved their
+    prices (and `last_update`), as between two polls.
+    """
+    rng = random.Random(seed)
+    moved = []
+    for game in data:
+        bookmakers = []
+        for book in game["bookmakers"]:
+            if rng.random() < fraction:
+                book = {
+                    **book,
+                    "last_update": f"{book['last_update']}+{seed}",
+                    "markets": [
+                        {**market, "outcomes": [
+                            {**o, "price": round(max(1.01, o["price"] * rng.uniform(0.97, 1.03)), 2)}
+                            for o in market["outcomes"]
+                        ]}
+                        for market in book["markets"]
+                    ],
+                }
+            bookmakers.append(book)
+        moved.append({**game, "bookmakers": bookmakers})
+    return moved
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a synthetic Odds API payload to stdout.")
+    parser.add_argument("--games", type=int, default=50)
+    parser.add_argument("--books", type=int, default=10)
+    parser.add_argument("--markets", default="h2h,spreads,totals")
+    parser.add_argument("--props", type=int, default=0)
+    parser.add_argument("--alt-lines", type=int, default=0)
+    parser.add_argument("--sharp-books", type=int, default=1)
+    parser.add_argument("--three-way", action="store_true")
+    parser.add_argument("--sport", default="basketball_nba")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    print(json.dumps(generate_odds(
+        games=args.games, books=args.books, markets=args.markets.split(","), props=args.props,
+        alt_lines=args.alt_lines, sharp_books=args.sharp_books, three_way=args.three_way,
+        sport=args.sport, seed=args.seed,
+    )))
+
+
+if __name__ == "__main__":
+    main()
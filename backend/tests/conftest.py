@@ -0,0 +1,90 @@
+"""
+Test setup: the app is configured from the environment when it is imported,
+so it is pointed at a throwaway database and a local stub of the Odds API
+here, before any test module imports it.
+"""
+import os
+import socket
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import urlsplit
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[2]
+SAMPLE_ODDS = ROOT / "data" / "sample_odds.json"
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+UPSTREAM_PORT = _free_port()
+_tmp = tempfile.mkdtemp(prefix="value-bet-finder-tests-")
+os.environ.update({
+    "ODDS_API_BASE_URL": f"http://127.0.0.1:{UPSTREAM_PORT}/v4/sports",
+    "ODDS_API_KEY": "test-key-0123456789",
+    "DATABASE_URL": f"sqlite:///{_tmp}/bets.db",
+    "STATE_BACKEND": "memory",
+    "ENABLE_POLLER": "false",
+    "ENABLE_ODDS_STORE": "false",
+    "ENABLE_SETTLEMENT": "false",
+    "ENABLE_PROFILER": "false",
+})
+
+
+class StubOddsApi(BaseHTTPRequestHandler):
+    """Serves `/v4/sports/<sport>/odds` from `payloads` and records every request"""
+
+    payloads = {"basketball_nba": SAMPLE_ODDS.read_bytes()}
+    requests: list = []
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        StubOddsApi.requests.append((url.path, url.query))
+        parts = url.path.strip("/").split("/")
+        if len(parts) != 4 or parts[-1] != "odds":
+            self.send_error(404)
+            return
+        body = self.payloads.get(parts[2], b"[]")
+        self.send_response(200)
+        self.send_header("content-type", "application/json")
+        self.send_header("content-length", str(len(body)))
+        self.send_header("x-requests-remaining", "450")
+        self.send_header("x-requests-used", "50")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope="session")
+def upstream():
+    """The stub Odds API, running for the whole session"""
+    server = ThreadingHTTPServer(("127.0.0.1", UPSTREAM_PORT), StubOddsApi)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield StubOddsApi
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture()
+def client(upstream):
+    """The app with its lifespan (shared upstream client, database) running"""
+    from fastapi.testclient import TestClient
+
+    from app.core.db import wait_until_ready
+    from app.main import app
+
+    upstream.requests.clear()
+    with TestClient(app) as test_client:
+        yield test_client
+        # Shutdown cancels a database setup still running, which can leave
+        # its connection holding the SQLite write lock
+        test_client.portal.call(wait_until_ready)
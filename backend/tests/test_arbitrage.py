@@ -0,0 +1,71 @@
+import pytest
+
+from app.core.arbitrage import ARB, MIDDLE, scan_arbitrage
+
+
+def _book(key, markets):
+    return {"key": key, "title": key.title(), "markets": [
+        {"key": market, "outcomes": [
+            {"name": name, "price": price, **({"point": point} if point is not None else {})}
+            for name, price, point in outcomes
+        ]}
+        for market, outcomes in markets.items()
+    ]}
+
+
+NBA = {
+    "id": "nba1", "sport_key": "basketball_nba", "commence_time": "2024-03-15T23:00:00Z",
+    "home_team": "Boston Celtics", "away_team": "Phoenix Suns",
+    "bookmakers": [
+        _book("fanduel", {
+            "h2h": [("Boston Celtics", 2.1, None), ("Phoenix Suns", 1.8, None)],
+            "totals": [("Over", 1.95, 210.5), ("Under", 1.87, 210.5)],
+        }),
+        _book("draftkings", {
+            "h2h": [("Boston Celtics", 1.9, None), ("Phoenix Suns", 2.05, None)],
+            "totals": [("Over", 1.75, 213.5), ("Under", 1.95, 213.5)],
+        }),
+    ],
+}
+# Three-way moneyline without an arb: the best prices imply more than 100%
+EPL = {
+    "id": "epl1", "sport_key": "soccer_epl", "commence_time": "2024-03-15T20:00:00Z",
+    "home_team": "Arsenal", "away_team": "Chelsea",
+    "bookmakers": [
+        _book("fanduel", {"h2h": [("Arsenal", 2.0, None), ("Draw", 3.4, None), ("Chelsea", 4.0, None)]}),
+        _book("draftkings", {"h2h": [("Arsenal", 1.95, None), ("Draw", 3.5, None), ("Chelsea", 3.9, None)]}),
+    ],
+}
+
+
+def test_finds_the_moneyline_arb_across_books():
+    arbs = [opp for opp in scan_arbitrage([NBA, EPL], stake=100.0) if opp.kind == ARB]
+
+    assert len(arbs) == 1
+    arb = arbs[0]
+    assert arb.match_name == "Boston Celtics vs Phoenix Suns" and arb.market == "h2h"
+    assert {(leg.selection, leg.book) for leg in arb.legs} == {("Boston Celtics", "Fanduel"), ("Phoenix Suns", "Draftkings")}
+    implied = 1 / 2.1 + 1 / 2.05
+    assert arb.implied_sum == pytest.approx(implied, abs=1e-4)
+    assert arb.profit_percent == pytest.approx((1 / implied - 1) * 100, abs=0.01)
+    # Stakes split the total so every leg pays the same
+    assert sum(leg.stake for leg in arb.legs) == pytest.approx(100.0, abs=0.02)
+    payouts = [leg.stake * leg.odds_decimal for leg in arb.legs]
+    assert max(payouts) - min(payouts) < 0.05
+
+
+def test_finds_the_totals_middle():
+    middles = [opp for opp in scan_arbitrage([NBA, EPL]) if opp.kind == MIDDLE]
+
+    assert len(middles) == 1
+    middle = middles[0]
+    assert {(leg.selection, leg.point, leg.book) for leg in middle.legs} == {("Over", 210.5, "Fanduel"), ("Under", 213.5, "Draftkings")}
+    assert middle.middle_width == pytest.approx(3.0)
+    assert middle.profit_percent == pytest.approx((1 / (2 / 1.95) - 1) * 100, abs=0.01)
+    assert middle.middle_profit_percent > 0
+
+
+def test_thresholds_filter_arbs_and_middles():
+    assert scan_arbitrage([NBA, EPL], min_profit=5.0, include_middles=False) == []
+    assert [opp.kind for opp in scan_arbitrage([NBA, EPL], include_middles=False)] == [ARB]
+    assert [opp.kind for opp in scan_arbitrage([NBA, EPL], max_middle_loss=1.0)] == [ARB]
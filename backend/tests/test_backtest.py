@@ -0,0 +1,93 @@
+import json
+from datetime import datetime, timezone
+
+import pytest
+
+from app.core.backtest import BacktestConfig, run_backtest
+from app.core.grading import LOST, WON
+from app.core.math_logic import remove_vig
+
+KICKOFF = datetime(2024, 3, 15, 20, tzinfo=timezone.utc).timestamp()
+
+
+def _game(event_id, sport, home, away, sharp, soft):
+    """One game with a Pinnacle and a FanDuel moneyline (outcome name -> price)"""
+    def book(key, title, prices):
+        return {"key": key, "title": title, "markets": [
+            {"key": "h2h", "outcomes": [{"name": name, "price": price} for name, price in prices.items()]},
+        ]}
+
+    return {
+        "id": event_id, "sport_key": sport, "commence_time": "2024-03-15T20:00:00Z",
+        "home_team": home, "away_team": away,
+        "bookmakers": [book("pinnacle", "Pinnacle", sharp), book("fanduel", "FanDuel", soft)],
+    }
+
+
+SOCCER_OPEN = {"Arsenal": 2.0, "Draw": 3.5, "Chelsea": 4.2}
+SOCCER_CLOSE = {"Arsenal": 1.9, "Draw": 3.6, "Chelsea": 4.6}
+NBA_OPEN = {"Boston Celtics": 1.6, "Phoenix Suns": 2.45}
+NBA_CLOSE = {"Boston Celtics": 1.55, "Phoenix Suns": 2.55}
+
+
+def _snapshot(soccer_sharp, nba_sharp, soccer_price, nba_price):
+    return {
+        "soccer_epl": _game(
+            "epl1", "soccer_epl", "Arsenal", "Chelsea", soccer_sharp, {"Arsenal": soccer_price, "Draw": 3.2, "Chelsea": 3.9},
+        ),
+        "basketball_nba": _game(
+            "nba1", "basketball_nba", "Boston Celtics", "Phoenix Suns", nba_sharp,
+            {"Boston Celtics": nba_price, "Phoenix Suns": 2.1},
+        ),
+    }
+
+
+@pytest.fixture()
+def recorded(tmp_path):
+    """Two pre-kickoff snapshots and one in-play snapshot per sport"""
+    snapshots = [
+        (KICKOFF - 7200, _snapshot(SOCCER_OPEN, NBA_OPEN, 2.3, 1.8)),
+        (KICKOFF - 600, _snapshot(SOCCER_CLOSE, NBA_CLOSE, 2.4, 1.85)),
+        (KICKOFF + 600, _snapshot({"Arsenal": 5.0, "Draw": 1.5, "Chelsea": 9.0}, NBA_CLOSE, 9.0, 9.0)),
+    ]
+    for fetched_at, games in snapshots:
+        for sport, game in games.items():
+            path = tmp_path / sport / "2024-03-15" / f"{fetched_at:.0f}.json"
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(json.dumps({"fetched_at": fetched_at, "data": [game]}))
+    return tmp_path
+
+
+def test_backtest_bets_first_sightings_and_grades_them(recorded):
+    # 1-1 draw: a team bet on a three-way moneyline loses
+    scores = {"epl1": {"Arsenal": 1, "Chelsea": 1}, "nba1": {"Boston Celtics": 110, "Phoenix Suns": 100}}
+
+    report = run_backtest(str(recorded), scores, BacktestConfig(min_ev=0.0), workers=1)
+
+    bets = {bet.key[4]: bet for bet in report.bets}
+    assert set(bets) == {"Arsenal", "Boston Celtics"}
+    arsenal, celtics = bets["Arsenal"], bets["Boston Celtics"]
+    # First sighting: the opening price, not the better one seen later
+    assert (arsenal.placed_at, arsenal.odds) == (KICKOFF - 7200, 2.3)
+    assert (celtics.placed_at, celtics.odds) == (KICKOFF - 7200, 1.8)
+    # Closing line: the last fair price before kickoff
+    assert arsenal.closing_prob == pytest.approx(remove_vig(list(SOCCER_CLOSE.values()))[0])
+    assert celtics.closing_prob == pytest.approx(remove_vig(list(NBA_CLOSE.values()))[0])
+
+    assert arsenal.three_way and (arsenal.result, arsenal.profit) == (LOST, -arsenal.stake)
+    assert not celtics.three_way and celtics.result == WON
+    assert celtics.profit == pytest.approx(celtics.stake * 0.8)
+
+    summary = report.summary()
+    assert summary["snapshots"] == 6
+    assert summary["realized"]["won"] == 1 and summary["realized"]["lost"] == 1
+    assert summary["realized"]["profit"] == round(celtics.profit - arsenal.stake, 2)
+
+
+def test_backtest_report_does_not_depend_on_worker_count(recorded):
+    inline = run_backtest(str(recorded), workers=1)
+    parallel = run_backtest(str(recorded), workers=2)
+
+    assert [bet.key for bet in parallel.bets] == [bet.key for bet in inline.bets]
+    assert {k: v for k, v in parallel.summary().items() if k != "elapsed_seconds"} == \
+        {k: v for k, v in inline.summary().items() if k != "elapsed_seconds"}
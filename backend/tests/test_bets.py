@@ -0,0 +1,23 @@
+import pytest
+
+
+def _bet(odds):
+    return {
+        "match_name": "Home Test vs Away Test", "selection": "Home Test", "market": "Moneyline",
+        "odds": odds, "stake": 10.0, "potential_payout": 0, "ev_percent": 2.0, "book": "FanDuel",
+        "sport": "basketball_nba", "timestamp": "2024-03-15T12:00:00", "status": "Pending",
+    }
+
+
+@pytest.mark.parametrize("odds", [2.5, 1.01, -110, 150])
+def test_saves_decimal_and_american_odds(client, odds):
+    response = client.post("/bets", json=_bet(odds))
+
+    assert response.status_code == 200
+    assert response.json()["odds"] == odds
+
+
+@pytest.mark.parametrize("odds", [0, 1.0, 0.5, -99, 99.5 - 100])
+def test_rejects_odds_that_are_neither_american_nor_decimal(client, odds):
+    assert client.post("/bets", json=_bet(odds)).status_code == 422
+    assert client.post("/bets/bulk", json=[_bet(2.0), _bet(odds)]).status_code == 422
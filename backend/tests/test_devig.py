@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+from app.core.math_logic import DEVIG_METHODS, devig_implied, remove_vig
+
+MARKETS = [
+    [1.8, 2.1],           # two-way
+    [1.5, 2.7],
+    [2.4, 3.5, 3.1],      # three-way (soccer moneyline)
+    [3.0, 4.5, 6.0, 8.0, 9.0],
+]
+
+
+@pytest.mark.parametrize("method", DEVIG_METHODS)
+@pytest.mark.parametrize("odds", MARKETS)
+def test_fair_probabilities_sum_to_one(method, odds):
+    fair = remove_vig(odds, method)
+
+    assert sum(fair) == pytest.approx(1.0, abs=1e-9)
+    assert all(0 < p < 1 for p in fair)
+    # The favourite stays the favourite
+    assert np.argmax(fair) == np.argmin(odds)
+
+
+@pytest.mark.parametrize("odds", [m for m in MARKETS if len(m) == 2])
+def test_shin_equals_additive_for_two_way_markets(odds):
+    assert remove_vig(odds, "shin") == pytest.approx(remove_vig(odds, "additive"), abs=1e-9)
+
+
+@pytest.mark.parametrize("method", DEVIG_METHODS)
+def test_batched_devig_matches_one_market_at_a_time(method):
+    implied = np.array([1 / o for odds in MARKETS for o in odds])
+    groups = np.repeat(np.arange(len(MARKETS)), [len(odds) for odds in MARKETS])
+
+    batched = devig_implied(implied, groups, method)
+
+    assert batched == pytest.approx(np.concatenate([remove_vig(odds, method) for odds in MARKETS]), abs=1e-9)
+
+
+def test_invalid_markets_get_zero_and_unknown_methods_raise():
+    assert remove_vig([1.9], "power") == [0.0]
+    assert remove_vig([1.9, 0.0], "shin") == [0.0, 0.0]
+    with pytest.raises(ValueError):
+        remove_vig([1.9, 1.9], "proportional")
@@ -0,0 +1,34 @@
+from app.services import odds_api
+
+SPORTS = ("basketball_nba", "soccer_epl")
+
+
+def test_feed_all_scans_every_sport_through_the_shared_client(client, upstream):
+    shared = odds_api._client
+    assert shared is not None and not shared.is_closed
+
+    response = client.get("/ev/feed/all", params={"sports": ",".join(SPORTS)})
+
+    assert response.status_code == 200
+    feed = response.json()
+    assert feed
+    evs = [opp["ev_percent"] for opp in feed]
+    assert evs == sorted(evs, reverse=True)
+
+    # One upstream call per sport, made with the client opened at startup
+    assert sorted(path for path, _ in upstream.requests) == [f"/v4/sports/{sport}/odds" for sport in sorted(SPORTS)]
+    assert all("apiKey=test-key-0123456789" in query for _, query in upstream.requests)
+    assert odds_api._client is shared
+
+
+def test_feed_all_serves_repeat_requests_from_the_snapshots(client, upstream):
+    first = client.get("/ev/feed/all", params={"sports": ",".join(SPORTS)}).json()
+    calls = len(upstream.requests)
+
+    min_ev = first[len(first) // 2]["ev_percent"]
+    again = client.get("/ev/feed/all", params={"sports": ",".join(SPORTS), "min_ev": min_ev})
+    columns = client.get("/ev/feed/all", params={"sports": ",".join(SPORTS), "format": "columns"}).json()
+
+    assert len(upstream.requests) == calls
+    assert again.json() == [opp for opp in first if opp["ev_percent"] > min_ev]
+    assert columns["count"] == len(first)
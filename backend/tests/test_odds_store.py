@@ -0,0 +1,73 @@
+from datetime import datetime, timezone
+
+from app.services.odds_store import OddsStore
+
+SPORT = "basketball_nba"
+# 2024-03-15 22:00 UTC, an hour before kickoff
+T0 = datetime(2024, 3, 15, 22, tzinfo=timezone.utc).timestamp()
+
+
+def _game(home_price=1.6, total=210.5):
+    return {
+        "id": "g1", "sport_key": SPORT, "commence_time": "2024-03-15T23:00:00Z",
+        "home_team": "Boston Celtics", "away_team": "Phoenix Suns",
+        "bookmakers": [{"key": "fanduel", "title": "FanDuel", "markets": [
+            {"key": "h2h", "outcomes": [
+                {"name": "Boston Celtics", "price": home_price}, {"name": "Phoenix Suns", "price": 2.45},
+            ]},
+            {"key": "totals", "outcomes": [
+                {"name": "Over", "price": 1.91, "point": total}, {"name": "Under", "price": 1.91, "point": total},
+            ]},
+            {"key": "player_points", "outcomes": [
+                {"name": "Over", "description": "Jayson Tatum", "price": 1.87, "point": 28.5},
+            ]},
+        ]}],
+    }
+
+
+def test_round_trip_records_only_moved_prices(tmp_path):
+    store = OddsStore(str(tmp_path))
+
+    assert store.append(SPORT, [_game()], T0) == 5
+    assert store.append(SPORT, [_game()], T0 + 600) == 0
+    assert store.append(SPORT, [_game(home_price=1.5)], T0 + 1200) == 1
+
+    history = store.history(SPORT, "g1", "h2h", "fanduel")
+    assert history.to_records() == [
+        {"timestamp": "2024-03-15T22:00:00+00:00", "selection": "Boston Celtics", "description": None, "point": None, "price": 1.6},
+        {"timestamp": "2024-03-15T22:00:00+00:00", "selection": "Phoenix Suns", "description": None, "point": None, "price": 2.45},
+        {"timestamp": "2024-03-15T22:20:00+00:00", "selection": "Boston Celtics", "description": None, "point": None, "price": 1.5},
+    ]
+    assert len(store.history(SPORT, "g1", "h2h", "fanduel", start=T0 + 1)) == 1
+    assert [r["point"] for r in store.history(SPORT, "g1", "totals", "fanduel").to_records()] == [210.5, 210.5]
+    props = store.history(SPORT, "g1", "player_points", "fanduel").to_records()
+    assert [(r["selection"], r["description"], r["point"]) for r in props] == [("Over", "Jayson Tatum", 28.5)]
+    assert len(store.history(SPORT, "g2", "h2h", "fanduel")) == 0
+
+    data, fetched_at = store.latest(SPORT)
+    assert data == [_game(home_price=1.5)] and fetched_at == T0 + 1200
+
+
+def test_a_second_store_reads_what_the_first_one_wrote(tmp_path):
+    writer = OddsStore(str(tmp_path))
+    writer.append(SPORT, [_game()], T0)
+    reader = OddsStore(str(tmp_path))
+    assert len(reader.history(SPORT, "g1", "h2h", "fanduel")) == 2
+
+    writer.append(SPORT, [_game(home_price=1.5, total=211.5)], T0 + 600)
+
+    assert len(reader.history(SPORT, "g1", "h2h", "fanduel")) == 3
+    assert [r["point"] for r in reader.history(SPORT, "g1", "totals", "fanduel").to_records()] == [210.5, 210.5, 211.5, 211.5]
+
+
+def test_closing_price_is_the_last_price_before_kickoff(tmp_path):
+    store = OddsStore(str(tmp_path))
+    kickoff = T0 + 3600
+    store.append(SPORT, [_game()], T0)
+    store.append(SPORT, [_game(home_price=1.5)], kickoff - 600)
+    store.append(SPORT, [_game(home_price=1.2)], kickoff + 600)
+
+    assert store.closing_price(SPORT, "g1", "h2h", "FanDuel", "Boston Celtics", None, kickoff) == 1.5
+    assert store.closing_price(SPORT, "g1", "totals", "fanduel", "Over", 210.5, kickoff) == 1.91
+    assert store.closing_price(SPORT, "g1", "totals", "fanduel", "Over", 211.5, kickoff) is None
+    assert store.closing_price(SPORT, "g1", "h2h", "fanduel", "Boston Celtics", None, T0 - 1) is None
@@ -0,0 +1,72 @@
+import itertools
+import math
+import random
+
+import pytest
+
+from app.core.parlay import optimize_parlays
+from app.models.schemas import BetOpportunity
+
+
+def _leg(i, game, odds, fair_prob):
+    return BetOpportunity(
+        id=str(i), match_name=f"Game {game}", sport="test", market="Moneyline", selection=f"Leg {i}",
+        target_book="Book", target_odds_american=0, target_odds_decimal=odds, sharp_book="Pinnacle",
+        sharp_odds_decimal=[2.0, 2.0], fair_prob=fair_prob, ev_percent=0.0, kelly_fraction=0.0,
+        kelly_stake_suggested=0.0, timestamp="",
+    )
+
+
+def _slate(seed):
+    rng = random.Random(seed)
+    legs = []
+    for game in range(rng.randint(4, 8)):
+        for _ in range(rng.randint(1, 3)):
+            odds = rng.uniform(1.5, 4.0)
+            legs.append(_leg(len(legs), game, odds, min(0.95, rng.uniform(0.95, 1.15) / odds)))
+    min_odds = rng.uniform(5, 20)
+    return legs, min_odds, min_odds * 2, rng.randint(2, 5)
+
+
+def _brute_force(legs, min_odds, max_odds, max_legs):
+    """Best EV over every parlay with at most one leg per game"""
+    games = {}
+    for leg in legs:
+        games.setdefault(leg.match_name, []).append(leg)
+    best = None
+    for size in range(2, max_legs + 1):
+        for chosen in itertools.combinations(games.values(), size):
+            for combo in itertools.product(*chosen):
+                odds = math.prod(leg.target_odds_decimal for leg in combo)
+                if min_odds - 1e-9 <= odds <= max_odds + 1e-9:
+                    ev = math.prod(leg.fair_prob for leg in combo) * odds - 1
+                    best = ev if best is None else max(best, ev)
+    return best
+
+
+@pytest.mark.parametrize("exact_states", [50_000, 0], ids=["exact", "beam"])
+@pytest.mark.parametrize("seed", range(20))
+def test_best_parlay_matches_brute_force(seed, exact_states):
+    legs, min_odds, max_odds, max_legs = _slate(seed)
+
+    found = optimize_parlays(legs, min_odds, max_odds, max_legs, top_k=1, time_budget=10.0, exact_states=exact_states)
+
+    best = _brute_force(legs, min_odds, max_odds, max_legs)
+    if best is None:
+        assert found == []
+    else:
+        assert found[0].ev == pytest.approx(best, abs=1e-9)
+
+
+def test_parlays_respect_the_odds_bounds_and_one_leg_per_game():
+    legs, min_odds, max_odds, max_legs = _slate(0)
+
+    parlays = optimize_parlays(legs, min_odds, max_odds, max_legs, top_k=5, time_budget=10.0)
+
+    assert parlays
+    assert [p.ev for p in parlays] == sorted((p.ev for p in parlays), reverse=True)
+    for parlay in parlays:
+        assert 2 <= len(parlay.legs) <= max_legs
+        assert min_odds - 1e-9 <= parlay.odds_decimal <= max_odds + 1e-9
+        assert len({leg.match_name for leg in parlay.legs}) == len(parlay.legs)
+        assert parlay.odds_decimal == pytest.approx(math.prod(leg.target_odds_decimal for leg in parlay.legs))
@@ -0,0 +1,38 @@
+import asyncio
+
+from app.core.db import async_session, create_db_and_tables, engine
+from app.core.grading import WON
+from app.models.tables import SavedBet
+from app.services.portfolio import portfolio_stats, record_saved, record_settled
+
+SPORT = "test_portfolio"
+
+
+def test_won_bets_with_invalid_odds_book_no_profit_or_clv():
+    async def run():
+        await create_db_and_tables()
+        async with async_session() as session:
+            bets = [
+                SavedBet(
+                    match_name="Home vs Away", selection="Home", market="Moneyline", odds=odds, stake=10.0,
+                    potential_payout=0, ev_percent=2.0, book="FanDuel", sport=SPORT, timestamp="2024-03-15T12:00:00",
+                )
+                # Saved before /bets checked odds: 0 was stored for decimal feeds
+                for odds in (2.5, 0.0)
+            ]
+            session.add_all(bets)
+            await record_saved(session, bets)
+            await session.flush()
+            await record_settled(session, bets, WON, "2024-03-16T00:00:00", {bet.id: 2.0 for bet in bets})
+            await session.commit()
+            stats = await portfolio_stats(session)
+        await engine.dispose()
+        return stats
+
+    stats = asyncio.run(run())
+
+    sport = next(row for row in stats["by_sport"] if row["key"] == SPORT)
+    assert (sport["settled"], sport["won"], sport["pending"]) == (2, 2, 0)
+    assert sport["pnl"] == 15.0
+    assert sport["roi_percent"] == 150.0
+    assert sport["avg_clv_percent"] == 25.0
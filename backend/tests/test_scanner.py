@@ -0,0 +1,38 @@
+import json
+
+import pytest
+
+from app.core.scanner import scan_odds_data
+from app.main import process_odds_data
+
+from conftest import SAMPLE_ODDS
+
+SAMPLE = json.loads(SAMPLE_ODDS.read_text())
+
+
+def _rows(opportunities):
+    return [opp.model_dump(exclude={"timestamp", "id"}) for opp in opportunities]
+
+
+@pytest.mark.parametrize("min_ev", [-100.0, 0.0, 1.5])
+def test_columnar_scan_matches_the_reference_scan(min_ev):
+    reference = _rows(process_odds_data(SAMPLE, min_ev))
+    scanned = _rows(scan_odds_data(SAMPLE, min_ev))
+
+    assert reference
+    assert len(scanned) == len(reference)
+    for ref, row in zip(reference, scanned):
+        if ref["market"] == "Player Prop":
+            # The scan names the player and line ("Jayson Tatum Over 28.5")
+            assert ref["selection"] in row["selection"].split()
+            ref, row = dict(ref, selection=None), dict(row, selection=None)
+        assert row == ref
+
+
+def test_scan_is_sorted_by_ev_and_respects_the_threshold():
+    opportunities = scan_odds_data(SAMPLE, 1.5)
+
+    evs = [opp.ev_percent for opp in opportunities]
+    assert evs == sorted(evs, reverse=True)
+    assert all(ev > 1.5 for ev in evs)
+    assert len({opp.id for opp in opportunities}) == len(opportunities)
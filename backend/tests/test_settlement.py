@@ -0,0 +1,91 @@
+import asyncio
+import json
+
+import pytest
+from sqlmodel import select
+
+from app.core.db import async_session, create_db_and_tables, engine
+from app.core.grading import LOST, PUSH, WON
+from app.models.tables import SavedBet
+from app.services.settlement import FileScores, SettlementEngine
+
+NBA = ("test_nba_1", "basketball_nba", "Boston Celtics", "Phoenix Suns", 110, 100)
+EPL = ("test_epl_1", "soccer_epl", "Arsenal", "Chelsea", 1, 1)
+
+# (event, selection, market, point, expected status)
+BETS = [
+    (NBA, "Boston Celtics", "Moneyline", None, WON),
+    (NBA, "Phoenix Suns", "h2h", None, LOST),
+    (NBA, "Boston Celtics", "Spread -4.5", None, WON),
+    (NBA, "Phoenix Suns", "spreads", 4.5, LOST),
+    (NBA, "Boston Celtics", "Spread -10.0", None, PUSH),
+    (NBA, "Over", "Total 205.5", None, WON),
+    (NBA, "Under", "totals", 205.5, LOST),
+    (NBA, "Over", "Total 210.0", None, PUSH),
+    # A draw in a three-way moneyline loses both team bets
+    (EPL, "Arsenal", "Moneyline", None, LOST),
+    (EPL, "Chelsea", "h2h", None, LOST),
+    (EPL, "Draw", "Moneyline", None, WON),
+    (EPL, "Under", "Total 2.5", None, WON),
+    # Props cannot be graded from scores
+    (NBA, "Jayson Tatum Over 28.5", "player_points", 28.5, "Pending"),
+]
+
+
+def _scores(event_id, sport, home, away, home_score, away_score):
+    return {
+        "id": event_id,
+        "sport_key": sport,
+        "commence_time": "2024-03-15T23:00:00Z",
+        "completed": True,
+        "home_team": home,
+        "away_team": away,
+        "scores": [{"name": home, "score": str(home_score)}, {"name": away, "score": str(away_score)}],
+    }
+
+
+@pytest.fixture()
+def scores_file(tmp_path):
+    path = tmp_path / "scores.json"
+    path.write_text(json.dumps([_scores(*NBA), _scores(*EPL)]))
+    return path
+
+
+def test_settles_moneylines_spreads_totals_and_draws_from_files(scores_file):
+    async def run():
+        await create_db_and_tables()
+        async with async_session() as session:
+            saved = []
+            for i, ((event_id, sport, home, away, _, _), selection, market, point, _) in enumerate(BETS):
+                saved.append(SavedBet(
+                    match_name=f"{home} vs {away}", selection=selection, odds=1.9, stake=10.0,
+                    potential_payout=19.0, ev_percent=2.0, book="FanDuel", sport=sport,
+                    timestamp=f"2024-03-15T12:00:{i:02d}",
+                    # The NBA bets are matched on the match name
+                    event_id=event_id if sport == "soccer_epl" else None,
+                    market=market, point=point,
+                ))
+            session.add_all(saved)
+            await session.commit()
+            ids = [bet.id for bet in saved]
+
+        settler = SettlementEngine(FileScores(str(scores_file)))
+        summary = await settler.settle()
+        again = await settler.settle()
+
+        async with async_session() as session:
+            bets = (await session.exec(
+                select(SavedBet).where(SavedBet.id.in_(ids)).order_by(SavedBet.timestamp)
+            )).all()
+        await engine.dispose()
+        return summary, again, bets
+
+    summary, again, bets = asyncio.run(run())
+
+    assert [(bet.selection, bet.market, bet.status) for bet in bets] == [
+        (selection, market, status) for _, selection, market, _, status in BETS
+    ]
+    assert (summary["Won"], summary["Lost"], summary["Push"]) == (5, 5, 2)
+    assert all(bet.settled_at for bet in bets if bet.status != "Pending")
+    # Re-running grades nothing twice
+    assert again["settled"] == 0
@@ -0,0 +1,78 @@
+from collections import defaultdict
+
+import pytest
+
+from app.core.staking import OpenBet, line_key, optimize_stakes
+from app.models.schemas import BetOpportunity
+
+BANKROLL = 1000.0
+
+
+def _opp(game, selection, book, odds, fair_prob, market="Moneyline"):
+    return BetOpportunity(
+        match_name=f"Home {game} vs Away {game}", sport="test", market=market, selection=selection,
+        target_book=book, target_odds_american=0, target_odds_decimal=odds, sharp_book="Pinnacle",
+        sharp_odds_decimal=[2.0, 2.0], fair_prob=fair_prob, ev_percent=(fair_prob * odds - 1) * 100,
+        kelly_fraction=0.0, kelly_stake_suggested=0.0, timestamp="",
+    )
+
+
+# Large edges everywhere, so every cap binds
+CANDIDATES = [
+    _opp(game, f"Home {game}", book, 2.2, 0.6)
+    for game in range(6)
+    for book in ("FanDuel", "DraftKings")
+] + [_opp(0, "Away 0", "FanDuel", 1.8, 0.4)]  # -EV
+
+
+def _exposure(plan, candidates, key):
+    totals = defaultdict(float)
+    for opp, stake in zip(candidates, plan.stakes):
+        totals[key(opp)] += stake
+    return totals
+
+
+@pytest.mark.parametrize("kelly_fraction", [1.0, 0.25])
+def test_stakes_respect_the_game_book_and_total_caps(kelly_fraction):
+    plan = optimize_stakes(
+        CANDIDATES, bankroll=BANKROLL, kelly_fraction=kelly_fraction,
+        max_game_exposure=0.05, max_book_exposure=0.12, max_total_exposure=0.2, scenarios=2000,
+    )
+
+    tolerance = 1e-6 * BANKROLL
+    assert all(stake >= 0 for stake in plan.stakes)
+    assert plan.stakes[-1] == pytest.approx(0.0, abs=tolerance)
+    assert max(_exposure(plan, CANDIDATES, lambda o: o.match_name).values()) <= 0.05 * BANKROLL + tolerance
+    assert max(_exposure(plan, CANDIDATES, lambda o: o.target_book).values()) <= 0.12 * BANKROLL + tolerance
+    assert plan.total_stake <= 0.2 * BANKROLL + tolerance
+    if kelly_fraction == 1.0:
+        # The edges are large enough that the total cap binds
+        assert plan.total_stake == pytest.approx(0.2 * BANKROLL, rel=1e-3)
+
+
+def test_open_bets_count_against_the_caps():
+    open_bets = [
+        OpenBet("test", "Home 0 vs Away 0", "Moneyline", "Home 0", "FanDuel", 40.0, 2.2, 0.6),
+        OpenBet("test", "Home 1 vs Away 1", "Moneyline", "Home 1", "DraftKings", 60.0, 2.2, 0.6),
+    ]
+
+    plan = optimize_stakes(
+        CANDIDATES, open_bets, bankroll=BANKROLL, kelly_fraction=1.0,
+        max_game_exposure=0.05, max_book_exposure=0.12, max_total_exposure=0.2, scenarios=2000,
+    )
+
+    tolerance = 1e-6 * BANKROLL
+    games = _exposure(plan, CANDIDATES, lambda o: o.match_name)
+    assert games["Home 0 vs Away 0"] <= 10.0 + tolerance
+    assert games["Home 1 vs Away 1"] == pytest.approx(0.0, abs=tolerance)
+    assert plan.total_stake + plan.open_stake <= 0.2 * BANKROLL + tolerance
+    assert plan.open_stake == 100.0
+    assert plan.book_exposure["DraftKings"] <= 0.12 * BANKROLL + tolerance
+
+
+def test_both_sides_of_a_spread_share_a_line():
+    home = line_key("test", "Celtics vs Suns", "Spread -3.5", "Celtics")
+    away = line_key("test", "Celtics vs Suns", "Spread 3.5", "Suns")
+
+    assert home == away
+    assert line_key("test", "Celtics vs Suns", "Spread -4.5", "Celtics") != home
@@ -11,7 +11,8 @@ const EVTable: React.FC<EVTableProps> = ({ opportunities }) => {
             const savedBet = {
                 match_name: bet.match_name,
                 selection: bet.selection,
-                odds: bet.target_odds_american,
+                market: bet.market,
+                odds: bet.target_odds_decimal,
                 stake: bet.kelly_stake_suggested,
                 potential_payout: 0,
                 ev_percent: bet.ev_percent,